@@ -0,0 +1,600 @@
+import argparse, asyncio, contextlib, io, json, os, pickle, platform, subprocess, sys, tempfile, threading, time, tracemalloc
+import warnings, numpy as np, pandas as pd, requests
+import DataCleaner, Estimators, ML, Profiling, Synthetic, Utils, Webscraper
+from FixtureServer import FixtureServer
+from RateControl import AdaptiveRateController
+from PredictionService import PredictionService
+from IncrementalRidge import IncrementalRidge
+from sklearn.linear_model import Ridge
+
+SCRAPERS = [Webscraper.MVPScraper, Webscraper.PerGameScraper, Webscraper.TeamScraper]
+TESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+
+def cached_years(scraper_cls, html_root):
+    """
+    :param scraper_cls: class,
+        the Scraper subclass whose pages are being looked for
+    :param html_root: str,
+        directory containing the saved pages
+    :return: list,
+        the years (int) with a saved page for this scraper
+    """
+    directory = f"{html_root}/{scraper_cls([]).directory_name}"
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(file[:-5]) for file in os.listdir(directory) if file.endswith(".html"))
+
+def time_parse(scraper, years):
+    """
+    :param scraper: Scraper,
+        the scraper doing the parsing
+    :param years: list,
+        the years to parse
+    :return: tuple,
+        seconds taken (float), and the dataframe for each year (list)
+    """
+    # Keeps the "Processing {year} data..." messages out of the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        dfs = [scraper.dataframe_retriever(year) for year in years]
+    return time.perf_counter() - start, dfs
+
+def parse_throughput(html_root="../rawHTML"):
+    """
+    Parses the cached rawHTML corpus with both table extraction engines, checks they give
+    identical DataFrames and reports each engine's throughput
+    :param html_root: str,
+        directory containing the saved pages
+    """
+    print(f"{'Scraper':<16}{'Pages':>7}{'MB':>8}{'soup pages/s':>15}{'lxml pages/s':>15}{'Speedup':>10}")
+    for scraper_cls in SCRAPERS:
+        years = cached_years(scraper_cls, html_root)
+        if not years:
+            print(f"{scraper_cls.__name__:<16} no cached pages in {html_root}")
+            continue
+        soup_scraper = scraper_cls(years, html_root=html_root, parser="soup")
+        lxml_scraper = scraper_cls(years, html_root=html_root, parser="lxml")
+        megabytes = sum(os.path.getsize(soup_scraper.file_path(year)) for year in years) / 1e6
+
+        soup_time, soup_dfs = time_parse(soup_scraper, years)
+        lxml_time, lxml_dfs = time_parse(lxml_scraper, years)
+        for year, soup_df, lxml_df in zip(years, soup_dfs, lxml_dfs):
+            try:
+                pd.testing.assert_frame_equal(soup_df, lxml_df)
+            except AssertionError as e:
+                print(f"{scraper_cls.__name__} {year}: engines disagree\n{e}")
+        print(f"{scraper_cls.__name__:<16}{len(years):>7}{megabytes:>8.1f}{len(years) / soup_time:>15.1f}"
+              f"{len(years) / lxml_time:>15.1f}{soup_time / lxml_time:>9.1f}x")
+
+def parse_scaling(html_root="../rawHTML", parser="lxml", workers=(1, 2, 4)):
+    """
+    Re-parses every cached season with a growing pool of worker processes, checking
+    the output doesn't change and reporting how the wall time scales with core count
+    :param html_root: str,
+        directory containing the saved pages
+    :param parser: str,
+        the table extraction engine to use
+    :param workers: tuple,
+        the pool sizes (int) to try
+    """
+    print(f"{'Workers':>7}{'Seconds':>10}{'Speedup':>10}")
+    baseline_time, baseline_dfs = None, None
+    for count in workers:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            dfs = [scraper_cls(cached_years(scraper_cls, html_root), html_root=html_root, parser=parser)
+                   .parse_years(count) for scraper_cls in SCRAPERS]
+        seconds = time.perf_counter() - start
+        if baseline_dfs is None:
+            baseline_time, baseline_dfs = seconds, dfs
+        else:
+            for expected, actual in zip(baseline_dfs, dfs):
+                for expected_df, actual_df in zip(expected, actual):
+                    pd.testing.assert_frame_equal(expected_df, actual_df)
+        print(f"{count:>7}{seconds:>10.2f}{baseline_time / seconds:>9.1f}x")
+
+# The parsing phases each engine's spans are recorded under, in the order they run
+PARSE_PHASES = {"soup": ["fix mojibake", "build soup", "select table", "read_html"],
+                "lxml": ["build tree", "select table", "table_to_frame"]}
+
+def scrape_throughput(html_root="../rawHTML", parser="soup", latency=0.05, max_requests=None, window=1.0,
+                      page_size=None, requests_per_minute=6000, max_connections=10):
+    """
+    Scrapes every cached season end to end from a local FixtureServer, the same way run_concurrent scrapes
+    the real website, and reports each scraper's throughput and where its time went. Fetch time is the time
+    spent in requests, which overlap each other, so it can add up to more than the scraper's wall time
+    (the parsing phases run one page at a time). MB/page and Peak MB are the mean and largest memory
+    Python allocates to parse one page
+    :param html_root: str,
+        directory containing the saved pages the server serves
+    :param parser: str,
+        the table extraction engine to use
+    :param latency: float,
+        seconds the server delays every response by
+    :param max_requests: int,
+        requests the server allows per window before answering 429 (None never throttles)
+    :param window: float,
+        length of the server's throttling window, in seconds
+    :param page_size: int,
+        the least number of bytes each page is served with (None serves the pages as they're saved)
+    :param requests_per_minute: int,
+        the rate controller's starting (and highest) rate. It's far above the real website's limit,
+        so it's the scrapers being measured, not the pacing
+    :param max_connections: int,
+        the maximum number of pooled keep-alive connections to the server
+    """
+    years = {scraper_cls: cached_years(scraper_cls, html_root) for scraper_cls in SCRAPERS}
+    if not any(years.values()):
+        print(f"No cached pages in {html_root}")
+        return
+    server = FixtureServer(html_root, max_requests=max_requests, window=window, retry_after=window,
+                           latency=latency, page_size=page_size)
+    with server, tempfile.TemporaryDirectory() as out:
+        # Every scraper starts at once, so a throttled run always begins with a burst of 429s. The circuit
+        # breaker is there to stop us hammering the real website, here it would just end the run, so it's
+        # left closed, and backoffs are scaled to the server's window rather than the website's
+        controller = AdaptiveRateController(requests_per_minute, failure_threshold=float("inf"),
+                                            backoff_base=window / 2, backoff_cap=4 * window)
+        scrapers = []
+        for scraper_cls, scraper_years in years.items():
+            if scraper_years:
+                scraper = scraper_cls(scraper_years, base_url=server.url, html_root=f"{out}/rawHTML", csv_root=out,
+                                      rate_controller=controller, parser=parser)
+                # The saved pages are already rendered, so every scraper fetches them over plain HTTP
+                scraper.use_browser = False
+                scrapers.append(scraper)
+
+        with Profiling.Profiler() as profiler, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            asyncio.run(Webscraper.scrape_all(scrapers, max_connections))
+            total_seconds = time.perf_counter() - start
+
+        # Memory is measured in a second, sequential pass over the downloaded pages, as tracing
+        # allocations would slow down (and so distort) the timed run
+        memory = {scraper.directory_name: parse_memory(scraper) for scraper in scrapers}
+        throttled = sum(status == 429 for _, _, status in server.requests)
+
+        phases = PARSE_PHASES[parser]
+        print(f"{'Scraper':<16}{'Pages':>7}{'MB':>8}{'Pages/s':>9}{'MB/s':>8}{'Fetch s':>9}"
+              + "".join(f"{phase + ' s':>{max(len(phase) + 4, 9)}}" for phase in phases)
+              + f"{'MB/page':>9}{'Peak MB':>9}")
+        total_pages, total_bytes = 0, 0
+        for scraper in scrapers:
+            name = scraper.directory_name
+            pages = len(scraper.years)
+            size = sum(os.path.getsize(scraper.file_path(year)) for year in scraper.years)
+            total_pages, total_bytes = total_pages + pages, total_bytes + size
+
+            # A scraper's wall time runs from its first season starting to its last one being saved
+            seasons = [span for span in profiler.spans if span["category"] == name and span["name"] == "season"]
+            seconds = max(span["start"] + span["wall"] for span in seasons) - min(span["start"] for span in seasons)
+            url = scraper.URL.split("{}")[0]
+            fetch = sum(span["wall"] for span in profiler.spans
+                        if span["name"] == "request" and span["args"]["url"].startswith(url))
+            split = [sum(span["wall"] for span in profiler.spans if span["category"] == name and span["name"] == phase)
+                     for phase in phases]
+            print(f"{type(scraper).__name__:<16}{pages:>7}{size / 1e6:>8.2f}{pages / seconds:>9.1f}"
+                  f"{size / 1e6 / seconds:>8.2f}{fetch:>9.2f}"
+                  + "".join(f"{value:>{max(len(phase) + 4, 9)}.2f}" for phase, value in zip(phases, split))
+                  + f"{np.mean(memory[name]):>9.1f}{max(memory[name]):>9.1f}")
+        print(f"\n{total_pages} pages ({total_bytes / 1e6:.2f} MB) in {total_seconds:.2f}s: "
+              f"{total_pages / total_seconds:.1f} pages/s, {total_bytes / 1e6 / total_seconds:.2f} MB/s, "
+              f"{len(server.requests)} requests ({throttled} throttled)")
+
+def parse_memory(scraper):
+    """
+    :param scraper: Scraper,
+        a scraper whose pages are saved
+    :return: list,
+        the most memory (MB, float) Python allocated while parsing each of its years' pages
+    """
+    peaks = []
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for year in scraper.years:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                scraper.dataframe_retriever(year)
+                peaks.append((tracemalloc.get_traced_memory()[1] - before) / 2**20)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def enlarge(df, scale):
+    """
+    :param df: dataframe,
+        a dataset with "Player" and "year" columns
+    :param scale: int,
+        the number of copies wanted
+    :return: dataframe,
+        the dataset repeated scale times, each copy under its own block of (fake) seasons
+    """
+    copies = []
+    for copy in range(scale):
+        df_copy = df.copy()
+        df_copy["year"] += 100 * copy
+        copies.append(df_copy)
+    return pd.concat(copies, ignore_index=True)
+
+def time_call(function, df):
+    """
+    :param function: function,
+        the cleaning function being timed
+    :param df: dataframe,
+        its input (a copy is passed, as some cleaning functions modify their input)
+    :return: tuple,
+        seconds taken (float), and the function's output
+    """
+    df = df.copy()
+    start = time.perf_counter()
+    result = function(df)
+    return time.perf_counter() - start, result
+
+def cleaning_speed(scale=5, csv_root="../csvFiles"):
+    """
+    Runs the legacy and vectorized cleaning functions over an enlarged copy of the shipped
+    data and reports each one's time. tests/test_DataCleaner.py checks they give identical output
+    :param scale: int,
+        how many times larger than the shipped data the benchmark data is
+    :param csv_root: str,
+        directory containing the clean .csv files
+    """
+    if not os.path.exists(f"{csv_root}/mvp-pg-team (clean).csv"):
+        print(f"No merged data in {csv_root}, run DataCleaner.clean() first")
+        return
+    # The row-by-row functions DataCleaner used before it was vectorized are kept with the tests that check
+    # the vectorized versions against them
+    sys.path.append(TESTS_DIR)
+    import legacy
+
+    Per_game = enlarge(pd.read_csv(f"{csv_root}/Per-game (clean).csv"), scale)
+    merged = enlarge(pd.read_csv(f"{csv_root}/mvp-pg-team (clean).csv"), scale)
+
+    # The legacy add_ratios() only lines its ratios up with the right rows when they're sorted by year
+    by_year = merged.sort_values("year", kind="stable").reset_index(drop=True)
+    cases = [("pg_clean", legacy.pg_clean, DataCleaner.pg_clean, Synthetic.split_traded(Per_game)),
+             ("MVP_label", legacy.MVP_label, DataCleaner.MVP_label, merged),
+             ("add_ratios", legacy.add_ratios, DataCleaner.add_ratios, by_year)]
+
+    print(f"{'Function':<12}{'Rows':>9}{'Legacy s':>11}{'Vectorized s':>14}{'Speedup':>10}")
+    for name, legacy, vectorized, df in cases:
+        # Silences pandas' warnings about the legacy code's chained assignment and apply() on grouping columns
+        with pd.option_context("mode.chained_assignment", None), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            legacy_time, _ = time_call(legacy, df)
+        vectorized_time, _ = time_call(vectorized, df)
+        print(f"{name:<12}{len(df):>9}{legacy_time:>11.3f}{vectorized_time:>14.3f}{legacy_time / vectorized_time:>9.1f}x")
+
+def ridge_speed(scale=1, alpha=1.0, csv_root="../csvFiles"):
+    """
+    Backtests sklearn's Ridge and the expanding-window IncrementalRidge over an enlarged copy of the
+    merged data, checking their coefficients agree on every fold and reporting each one's time
+    :param scale: int,
+        how many times more seasons than the shipped data the benchmark data has
+    :param alpha: float,
+        regularization strength
+    :param csv_root: str,
+        directory containing the clean .csv files
+    """
+    if not os.path.exists(f"{csv_root}/mvp-pg-team (clean).csv"):
+        print(f"No merged data in {csv_root}, run DataCleaner.clean() first")
+        return
+    df = enlarge(pd.read_csv(f"{csv_root}/mvp-pg-team (clean).csv"), scale)
+    model = ML.Model(int(df["year"].min()), int(df["year"].max()), Ridge(alpha=alpha), df=df)
+    test_years = sorted(model.offsets)[5:]
+
+    # Coefficients of both models on every fold
+    incremental = IncrementalRidge(alpha=alpha)
+    seen, worst = 0, 0.0
+    for year in test_years:
+        start = model.offsets[year][0]
+        model.model.fit(model.features[:start], model.share[:start])
+        incremental.extend(model.features[seen:start], model.share[seen:start]).solve()
+        seen = start
+        worst = max(worst, np.abs(incremental.coef_ - model.model.coef_).max() / np.abs(model.model.coef_).max())
+    print(f"{len(test_years)} folds, largest coefficient difference {worst:.1e} (relative to the largest coefficient)")
+
+    # The enlarged data skips seasons between its copies
+    model.years = sorted(model.offsets)
+    timings = []
+    for estimator in (Ridge(alpha=alpha), IncrementalRidge(alpha=alpha)):
+        model.model = estimator
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            mean_ap, _, _ = model.backtest(workers=1)
+        timings.append(time.perf_counter() - start)
+        print(f"{type(estimator).__name__:<18}{timings[-1]:>8.2f}s   mean AP {mean_ap}")
+    print(f"Speedup {timings[0] / timings[1]:.1f}x")
+
+def estimator_speed(names=None, scale=1, csv_root="../csvFiles"):
+    """
+    Backtests each estimator, with its usual settings (see Estimators.DEFAULT_PARAMS), over an enlarged copy
+    of the merged data, reporting its wall time, the most memory Python allocated fitting the largest fold
+    (every season but the last), the size of that fold's fitted model and the mean AP. Memory allocated by
+    compiled code outside of numpy (e.g. the random forest's trees) isn't traced, but shows in the model's size
+    :param names: list,
+        the estimators (str) to backtest, or None for every one
+    :param scale: int,
+        how many times more seasons than the shipped data the benchmark data has
+    :param csv_root: str,
+        directory containing the clean .csv files
+    """
+    if not os.path.exists(f"{csv_root}/mvp-pg-team (clean).csv"):
+        print(f"No merged data in {csv_root}, run DataCleaner.clean() first")
+        return
+    df = enlarge(pd.read_csv(f"{csv_root}/mvp-pg-team (clean).csv"), scale)
+    model = ML.Model(int(df["year"].min()), int(df["year"].max()), None, df=df)
+
+    # The enlarged data skips seasons between its copies
+    model.years = sorted(model.offsets)
+    print(f"{len(model.years[5:])} folds, up to {model.offsets[model.years[-1]][0]} training rows")
+    print(f"{'Estimator':<24}{'Seconds':>9}{'Peak MB':>10}{'Model MB':>10}{'Mean AP':>10}")
+    for name in names or Estimators.ESTIMATORS:
+        model.model = Estimators.estimator(name)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            mean_ap, _, _ = model.backtest(workers=1)
+        seconds = time.perf_counter() - start
+
+        # Traced separately, so tracing doesn't slow the timed backtest down
+        tracemalloc.start()
+        try:
+            model.train_fold(model.years[-1])
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+        size = len(pickle.dumps(model.model)) / 2**20
+        print(f"{name:<24}{seconds:>9.2f}{peak:>10.1f}{size:>10.2f}{mean_ap:>10.4f}")
+
+def service_latency(clients=16, queries=200, window=0.002, start_yr=1996, end_yr=2024):
+    """
+    Loads a PredictionService with concurrent what-if queries, and reports the latency the clients
+    saw, the throughput and how many requests each batch of predictions served
+    :param clients: int,
+        the number of clients sending queries at once
+    :param queries: int,
+        the number of queries each client sends
+    :param window: float,
+        how long a batch of predictions waits for more requests, in seconds
+    :param start_yr: int,
+        the first season of data used
+    :param end_yr: int,
+        the last season of data used
+    """
+    with contextlib.redirect_stdout(io.StringIO()), PredictionService(start_yr, end_yr, Ridge(alpha=1.0),
+                                                                      window=window) as service:
+        # What-if queries for random players, each with their points changed
+        rng = np.random.default_rng(0)
+        seasons = rng.choice(service.seasons, clients * queries)
+        bodies = []
+        for season in seasons:
+            start, stop = service.data.offsets[season]
+            bodies.append({"season": int(season), "player": service.players[rng.integers(start, stop)],
+                           "stats": {"PTS": float(rng.uniform(5, 35))}})
+        latencies = [[] for _ in range(clients)]
+
+        def client(number):
+            with requests.Session() as session:
+                for body in bodies[number::clients]:
+                    start = time.perf_counter()
+                    session.post(f"{service.url}/what-if", json=body).raise_for_status()
+                    latencies[number].append(time.perf_counter() - start)
+
+        requests.get(f"{service.url}/predict", params={"season": service.seasons}).raise_for_status()
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+        stats = service.stats()
+
+    latencies = np.concatenate(latencies) * 1000
+    print(f"{clients} clients x {queries} what-if queries, {window * 1000:g}ms batch window")
+    print(f"p50 {np.percentile(latencies, 50):.2f}ms   p99 {np.percentile(latencies, 99):.2f}ms   "
+          f"{len(latencies) / seconds:.0f} requests/s   {stats['mean_batch_requests']:.1f} requests per batch")
+
+def startup_time(runs=5):
+    """
+    Times how long the command line takes to start, against importing every module up front as
+    main.py used to. Each command is run in a fresh interpreter, and the fastest run is reported
+    :param runs: int,
+        the number of times each command is run
+    """
+    commands = {"main.py --help": ["main.py", "--help"],
+                "main.py predict --help": ["main.py", "predict", "--help"],
+                "eager imports (old main.py)": ["-c", "import DataCleaner, Webscraper, ML"]}
+    for name, command in commands.items():
+        seconds = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *command], check=True, stdout=subprocess.DEVNULL)
+            seconds.append(time.perf_counter() - start)
+        print(f"{name:<30} {min(seconds) * 1000:7.0f}ms")
+
+BASELINE_PATH = "../benchmarks/baseline.json"
+
+def best_time(function, repeats=1):
+    """
+    :param function: function,
+        the work being timed, taking no arguments
+    :param repeats: int,
+        how many times to run it
+    :return: float,
+        the fastest run, in seconds
+    """
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+def suite_stages(scale, repeats=3, csv_root="../csvFiles"):
+    """
+    Generates synthetic data at a scale, and times every cleaning and backtesting stage on it
+    :param scale: int,
+        how many copies of the shipped seasons the data has
+    :param repeats: int,
+        how many times each single function is run (the fastest counts). Whole pipeline runs are timed once
+    :param csv_root: str,
+        directory containing the shipped .csv files the data is generated from
+    :return: dict,
+        the seconds (float) each stage (str) took, and the number of per-game rows
+    """
+    csv_root = os.path.abspath(csv_root)
+    cwd = os.getcwd()
+    times = {}
+    with tempfile.TemporaryDirectory() as root, contextlib.redirect_stdout(io.StringIO()):
+        rows = Synthetic.generate(scale, root, csv_root=csv_root)
+
+        # DataCleaner and ML read "../csvFiles", so they're run from the generated tree's Scripts directory
+        os.chdir(f"{root}/Scripts")
+        try:
+            Per_game, Teams = pd.read_csv("../csvFiles/Per-game.csv"), pd.read_csv("../csvFiles/Team-stats.csv")
+            times["pg_clean"] = best_time(lambda: DataCleaner.pg_clean(Per_game), repeats)
+            times["tm_clean"] = best_time(lambda: DataCleaner.tm_clean(Teams), repeats)
+
+            # At 100x every copy of the data counts, so each is dropped as soon as it's been used
+            del Per_game, Teams
+            times["clean (full build)"] = best_time(DataCleaner.clean)
+            times["clean (nothing changed)"] = best_time(DataCleaner.clean)
+
+            merged = pd.read_csv(DataCleaner.MERGED_PATH)
+            times["add_ratios"] = best_time(lambda: DataCleaner.add_ratios(merged.copy()), repeats)
+            times["MVP_label"] = best_time(lambda: DataCleaner.MVP_label(merged.copy()), repeats)
+            times["pos_tm_cat"] = best_time(lambda: DataCleaner.pos_tm_cat(merged.copy()), repeats)
+            del merged
+
+            first_yr, last_yr = Utils.unique_yrs()
+            times["load data"] = best_time(lambda: ML.Model(first_yr, last_yr, Ridge(alpha=1.0)), repeats)
+            model = ML.Model(first_yr, last_yr, Ridge(alpha=1.0))
+            predictions = model.train(last_yr)
+            times["Model.train"] = best_time(lambda: model.train(last_yr), repeats)
+            times["Model.error_met"] = best_time(lambda: model.error_met(predictions), repeats)
+
+            # The last 25 seasons, each trained on every season before it, then the whole history incrementally.
+            # Both reuse the loaded model's data rather than loading another copy
+            model.years = list(range(last_yr - 29, last_yr + 1))
+            times["backtest ridge (25 seasons)"] = best_time(lambda: model.backtest(workers=1))
+            model.model, model.years = IncrementalRidge(alpha=1.0), list(range(first_yr, last_yr + 1))
+            times["backtest incremental-ridge (all seasons)"] = best_time(lambda: model.backtest(workers=1))
+        finally:
+            os.chdir(cwd)
+    return {"rows": rows["Per-game"], "seconds": times}
+
+def benchmark_suite(scales=(1, 10), repeats=3, baseline_path=BASELINE_PATH, save=False, tolerance=1.5, floor=0.05):
+    """
+    Times every cleaning and backtesting stage over synthetic data at each scale, and compares the
+    times with the stored baseline
+    :param scales: tuple,
+        the scales (int) to run at
+    :param repeats: int,
+        how many times each single function is run
+    :param baseline_path: str,
+        .json file of the baseline times
+    :param save: boolean,
+        whether to save these times as the baseline for their scales
+    :param tolerance: float,
+        how many times slower than the baseline a stage can be before it counts as a regression
+    :param floor: float,
+        seconds a stage must slow down by to count as a regression, so tiny stages' noise doesn't
+    :return: list,
+        the (scale, stage) tuples that regressed
+    """
+    baseline = {"results": {}}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    regressions = []
+    results = {}
+    print(f"{'Scale':>6}{'Rows':>10}  {'Stage':<42}{'Seconds':>10}{'Baseline':>10}{'Ratio':>8}")
+    for scale in scales:
+        results[str(scale)] = suite_stages(scale, repeats)
+        expected = baseline["results"].get(str(scale), {}).get("seconds", {})
+        for stage, seconds in results[str(scale)]["seconds"].items():
+            line = f"{scale:>5}x{results[str(scale)]['rows']:>10}  {stage:<42}{seconds:>10.3f}"
+            if stage in expected:
+                ratio = seconds / expected[stage]
+                line += f"{expected[stage]:>10.3f}{ratio:>7.2f}x"
+                if ratio > tolerance and seconds - expected[stage] > floor:
+                    regressions.append((scale, stage))
+                    line += "  REGRESSION"
+            print(line)
+
+    if save:
+        baseline["results"].update(results)
+        baseline["machine"] = {"python": platform.python_version(), "platform": platform.platform(),
+                               "cpus": os.cpu_count()}
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=1)
+        print(f"\nSaved as the baseline in {baseline_path}")
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) more than {tolerance}x slower than the baseline")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the NBA MVP pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parse = commands.add_parser("parse", help="table extraction throughput over the cached rawHTML corpus")
+    parse.add_argument("--html-root", default="../rawHTML")
+    scaling = commands.add_parser("parse-scaling", help="multi-core re-parse of every cached season")
+    scaling.add_argument("--html-root", default="../rawHTML")
+    scaling.add_argument("--parser", default="lxml", choices=["soup", "lxml"])
+    scaling.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    scrape = commands.add_parser("scrape", help="end-to-end scraping throughput against a local stand-in for the website")
+    scrape.add_argument("--html-root", default="../rawHTML")
+    scrape.add_argument("--parser", default="soup", choices=["soup", "lxml"])
+    scrape.add_argument("--latency", type=float, default=0.05, help="seconds each response is delayed by")
+    scrape.add_argument("--max-requests", type=int, default=None, help="requests allowed per window before a 429")
+    scrape.add_argument("--window", type=float, default=1.0)
+    scrape.add_argument("--page-size", type=int, default=None, help="bytes each page is padded out to")
+    scrape.add_argument("--rpm", type=int, default=6000, help="requests per minute the scrapers start at")
+    scrape.add_argument("--connections", type=int, default=10)
+    cleaning = commands.add_parser("clean", help="legacy vs vectorized cleaning over an enlarged dataset")
+    cleaning.add_argument("--scale", type=int, default=5)
+    ridge = commands.add_parser("ridge", help="sklearn Ridge vs the expanding-window IncrementalRidge backtest")
+    ridge.add_argument("--scale", type=int, default=1)
+    ridge.add_argument("--alpha", type=float, default=1.0)
+    estimators = commands.add_parser("estimators", help="backtest time, memory and AP of every estimator in the registry")
+    estimators.add_argument("--estimators", nargs="+", choices=list(Estimators.ESTIMATORS), help="defaults to every one")
+    estimators.add_argument("--scale", type=int, default=1)
+    service = commands.add_parser("service", help="latency of the prediction service under concurrent what-if queries")
+    service.add_argument("--clients", type=int, default=16)
+    service.add_argument("--queries", type=int, default=200)
+    service.add_argument("--window", type=float, default=0.002)
+    startup = commands.add_parser("startup", help="cold start of the command line vs importing everything up front")
+    startup.add_argument("--runs", type=int, default=5)
+    suite = commands.add_parser("suite", help="every cleaning and backtesting stage over synthetic data, against a baseline")
+    suite.add_argument("--scales", type=int, nargs="+", default=[1, 10], help="e.g. 1 10 100")
+    suite.add_argument("--repeats", type=int, default=3)
+    suite.add_argument("--baseline", default=BASELINE_PATH)
+    suite.add_argument("--save-baseline", action="store_true")
+    suite.add_argument("--tolerance", type=float, default=1.5, help="slowdown (x) that counts as a regression")
+    args = parser.parse_args()
+    if args.command == "parse":
+        parse_throughput(args.html_root)
+    elif args.command == "parse-scaling":
+        parse_scaling(args.html_root, args.parser, args.workers)
+    elif args.command == "scrape":
+        scrape_throughput(args.html_root, args.parser, args.latency, args.max_requests, args.window, args.page_size,
+                          args.rpm, args.connections)
+    elif args.command == "clean":
+        cleaning_speed(args.scale)
+    elif args.command == "ridge":
+        ridge_speed(args.scale, args.alpha)
+    elif args.command == "estimators":
+        estimator_speed(args.estimators, args.scale)
+    elif args.command == "service":
+        service_latency(args.clients, args.queries, args.window)
+    elif args.command == "startup":
+        startup_time(args.runs)
+    elif args.command == "suite":
+        # A non-zero exit status fails the CI job when a stage has regressed
+        if benchmark_suite(args.scales, args.repeats, args.baseline, args.save_baseline, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,186 @@
+import os, queue, threading
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+# Configured through the environment, so the same code runs on Windows and Linux boxes.
+# When CHROMEDRIVER_PATH isn't set, Selenium Manager finds (or downloads) a matching driver
+CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH")
+CHROME_BINARY = os.environ.get("CHROME_BINARY")
+
+class BrowserPool:
+    """
+    A pool of reusable headless Chrome sessions, shared by every scraper that needs rendered pages
+
+    Launching Chrome is most of the cost of rendering a page, so sessions are kept alive between
+    pages (and years, and scrapers) instead of being launched and quit for each one.
+    - Sessions are launched lazily, up to the pool size
+    - A session is health-checked before every page, and replaced if it has died
+    - A session is recycled after max_pages pages, so a leaking browser can't grow forever
+    - close() quits every session
+
+    Usage:
+        with BrowserPool(size=2) as pool:
+            html = pool.render(url)
+    """
+    def __init__(self, size=2, max_pages=50, driver_path=CHROMEDRIVER_PATH, chrome_binary=CHROME_BINARY,
+                 headless=True):
+        """
+        :param size: int,
+            the maximum number of browser sessions running at once
+        :param max_pages: int,
+            the number of pages a session renders before it's recycled
+        :param driver_path: str,
+            path to the chromedriver executable
+        :param chrome_binary: str,
+            path to the Chrome executable, if it isn't installed in the default location
+        :param headless: boolean,
+            whether to run Chrome without a window
+        """
+        self.size = size
+        self.max_pages = max_pages
+        self.driver_path = driver_path
+        self.chrome_binary = chrome_binary
+        self.headless = headless
+        self.closed = False
+        self.lock = threading.Lock()
+        self.sessions = [] # Every session launched and not yet quit, so close() can reach busy ones
+
+        # Idle slots. None is a slot whose session hasn't been launched yet
+        self.idle = queue.Queue()
+        for _ in range(size):
+            self.idle.put(None)
+
+    def launch(self):
+        """
+        :return: dict,
+            a new browser session, and the number of pages it has rendered
+        """
+        options = Options()
+        if self.headless:
+            options.add_argument("--headless=new")
+
+        # Required when running as root/inside containers on Linux
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        if self.chrome_binary:
+            options.binary_location = self.chrome_binary
+        service = Service(executable_path=self.driver_path) if self.driver_path else Service()
+        session = {"driver": webdriver.Chrome(service=service, options=options), "pages": 0}
+        with self.lock:
+            self.sessions.append(session)
+        return session
+
+    def retire(self, session):
+        """
+        Quits a session, ignoring errors from a browser that has already died
+        :param session: dict,
+            the session being quit
+        """
+        with self.lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+        try:
+            session["driver"].quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def healthy(session):
+        """
+        :param session: dict,
+            the session being checked
+        :return: boolean,
+            whether the browser still responds
+        """
+        try:
+            return session["driver"].execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def acquire(self):
+        """
+        Waits for an idle session, launching or replacing it if needed
+        :return: dict,
+            a healthy browser session
+        """
+        if self.closed:
+            raise RuntimeError("BrowserPool has been closed")
+        session = self.idle.get()
+        try:
+            if session is not None and not self.healthy(session):
+                self.retire(session)
+                session = None
+            if session is None:
+                session = self.launch()
+        except Exception:
+            self.idle.put(None) # Gives the slot back, so a failed launch doesn't shrink the pool
+            raise
+        return session
+
+    def release(self, session):
+        """
+        Returns a session to the pool, recycling it if it has rendered enough pages
+        :param session: dict,
+            the session being returned
+        """
+        if self.closed or session["pages"] >= self.max_pages:
+            self.retire(session)
+            session = None
+        self.idle.put(session)
+
+    def render(self, url):
+        """
+        :param url: str,
+            URL of the page to render (http(s):// or file://)
+        :return: str,
+            HTML of the fully rendered webpage
+        """
+        session = self.acquire()
+        try:
+            driver = session["driver"]
+            driver.get(url)
+
+            # Scrolls down in the explorer to render lazy HTML content
+            driver.execute_script("window.scrollTo(1, 10000)")
+
+            # Captures the HTML of our page after content is loaded
+            html = driver.page_source
+            session["pages"] += 1
+        except Exception:
+            # A session that errored mid-page can't be trusted, so it's replaced
+            self.retire(session)
+            self.idle.put(None)
+            raise
+        self.release(session)
+        return html
+
+    def close(self):
+        """
+        Quits every browser session
+        """
+        self.closed = True
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            self.retire(session)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    # Test mode: renders the saved Per-game pages through a local FixtureServer,
+    # so the pool can be checked on a machine without hitting the real website
+    import sys, time
+    from FixtureServer import FixtureServer
+
+    years = sys.argv[1:] or ["2024"]
+    with FixtureServer("../rawHTML") as server, BrowserPool(size=2) as pool:
+        for year in years:
+            start = time.perf_counter()
+            html = pool.render(f"{server.url}/leagues/NBA_{year}_per_game.html")
+            print(f"{year}: rendered {len(html)} characters in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,91 @@
+import numpy as np, pandas as pd
+
+# The least a player needs to be a plausible MVP candidate. Every top-5 vote-getter since 1996 has played
+# 46+ games, 30+ minutes a game, scored 1.5x the league's average points (PTS_R) and played for a team
+# winning at least 49% of its games, so these leave a margin below all of them
+THRESHOLDS = {"G": 30, "MP": 28.0, "PTS_R": 1.2, "W/L%": 0.4}
+
+def first_pass_score(df):
+    """
+    A cheap score of how plausible a candidate each player is: their points, assists and rebounds
+    a game, times their team's winning percentage. It doesn't use any of the voting columns
+    :param df: dataframe,
+        the merged dataset
+    :return: series,
+        each row's score
+    """
+    return (df["PTS"] + df["AST"] + df["TRB"]) * df["W/L%"]
+
+class Candidates:
+    """
+    Picks each season's plausible MVP candidates, so the model is only trained on, and scores, a few dozen
+    players a season rather than every player who got on the court
+
+    - Players below any of the thresholds (e.g. bench players) are dropped
+    - The rest are ranked within their season by a cheap first-pass score, and only the best per_season kept
+
+    recall() reports how many of each season's actual top-5 vote-getters were kept, which should be all
+    of them: one that's dropped can't be predicted, and the season's metrics are then scored without them
+
+    Usage:
+        candidates = Candidates(per_season=40)
+        keep = candidates.mask(df)
+        print(candidates.recall(df, keep))
+    """
+    def __init__(self, thresholds=THRESHOLDS, per_season=40, score=first_pass_score):
+        """
+        :param thresholds: dict,
+            the least (float) a candidate needs in each column (str)
+        :param per_season: int,
+            the most candidates kept each season, or None to keep everyone who meets the thresholds
+        :param score: function,
+            takes the dataset and returns each row's first-pass score (series), higher being more plausible
+        """
+        self.thresholds = thresholds
+        self.per_season = per_season
+        self.score = score
+
+    def mask(self, df):
+        """
+        :param df: dataframe,
+            the merged dataset
+        :return: numpy array,
+            whether (bool) each row is a candidate
+        """
+        keep = np.ones(len(df), dtype=bool)
+        for col, least in self.thresholds.items():
+            keep &= df[col].to_numpy() >= least
+        if self.per_season is not None:
+            # Players who didn't meet the thresholds are ranked below everyone who did
+            score = self.score(df).to_numpy(dtype="float64")
+            score = np.where(keep, score, -np.inf)
+            rank = pd.Series(score).groupby(df["year"].to_numpy()).rank(method="first", ascending=False)
+            keep &= rank.to_numpy() <= self.per_season
+        return keep
+
+    @staticmethod
+    def recall(df, keep, top=5):
+        """
+        :param df: dataframe,
+            the merged dataset
+        :param keep: numpy array,
+            whether (bool) each row is a candidate
+        :param top: int,
+            the number of vote-getters each season that must be kept
+        :return: dataframe,
+            for each season: the number of players and candidates, the fraction of its top vote-getters and
+            of every vote-getter that were kept, and the top vote-getters (str) that weren't
+        """
+        years = df["year"].to_numpy()
+        share = df["Share"].to_numpy(dtype="float64")
+        rank = pd.Series(share).groupby(years).rank(method="first", ascending=False).to_numpy()
+        voted = share > 0
+        leaders = voted & (rank <= top)
+        seasons = pd.DataFrame({"year": years, "Players": 1, "Candidates": keep, "leaders": leaders,
+                                "leaders kept": leaders & keep, "voted": voted, "voted kept": voted & keep})
+        seasons = seasons.groupby("year").sum()
+        missed = pd.Series(df["Player"].to_numpy()[leaders & ~keep]).groupby(years[leaders & ~keep]).agg(", ".join)
+        return pd.DataFrame({"Players": seasons["Players"], "Candidates": seasons["Candidates"],
+                             f"Top-{top} recall": seasons["leaders kept"] / seasons["leaders"],
+                             "Vote recall": seasons["voted kept"] / seasons["voted"],
+                             "Missed": missed.reindex(seasons.index).fillna("")})
@@ -1,192 +1,503 @@
-import pandas as pd, Utils, os
-
-def clean():
-    """
-    Creates a dataframe containing MVP, per-game and team data, then saves to a .csv
-    """
-    if not Utils.data_exists("../csvFiles/mvp-pg-team (clean).csv"):
-        # Initialises necessary dataframes from .csv files
-        MVP_df, Pg_df, team_df = df_initializer()
-
-        # Merges the per-game and MVP dataframes, and matches rows
-        # based on the "Player" and "year" columns in an outer join
-        pg_mvp_df = Pg_df.merge(MVP_df, how="outer", on=["Player", "year"])
-
-        # Maps the return of nkname_dict() to values in the "Team" column
-        pg_mvp_df["Team"] = pg_mvp_df["Team"].map(nkname_dict())
-        complete_df = pg_mvp_df.merge(team_df, how="outer", on=["Team", "year"]).fillna(0)
-        complete_df = col_d_type(complete_df)
-        complete_df = diagnostics(complete_df)
-        complete_df.to_csv("../csvFiles/mvp-pg-team (clean).csv", index=False)
-        print("\nFinished cleaning")
-    else:
-        print("\nmvp-pg-team.csv already exists - this will be used for training")
-
-
-def col_d_type(df):
-    """
-    Reassigns incorrect column data types
-    :param df: Dataframe,
-        The dataframe being modified
-    :return: dataframe,
-        The corrected dataframe
-    """
-    # Replaces "—" with "0" in the "GB" column
-    df["GB"] = df["GB"].str.replace("—", "0")
-
-    # Making the "GB" column a numeric column, rather than an object column
-    df["GB"] = pd.to_numeric(df["GB"])
-    return df
-
-
-def diagnostics(df):
-    """
-    Adds diagnostic columns to our dataframe, for to help train the ML model
-    :param df: Dataframe,
-        the dataframe being modifying
-    :return:
-        The modified dataframe
-    """
-    df = add_ratios(df)
-    df = pos_tm_cat(df)
-    df = MVP_label(df)
-    return df
-
-def pos_tm_cat(df):
-    """
-    Adds a column which assigns a numerical value for position (str) and team (str)
-    :param df: Dataframe,
-        the dataframe being modified
-    :return:
-        the modified dataframe
-    """
-
-    # Converts the "Pos" and "Team" columns into a "categorical" d-type, then gets the
-    # numerical codes associated with each unique value/category in that column
-    df["NPos"] = df["Pos"].astype("category").cat.codes
-    df["NTm"] = df["Team"].astype("category").cat.codes
-    return df
-
-def add_ratios(df):
-    """
-    Adds the ratio of, the value in the specified column to the mean of its column (for that year),
-    to the dataframe.
-    :param df: dataframe,
-        The dataframe having the ratio column added to it
-    :return: dataframe,
-        the modified dataframe
-    """
-    # Groups the columns by year, then divides each value in each column by the mean of that column
-    ratios = df[["PTS", "AST", "STL", "BLK", "3P", "year"]].groupby("year").apply(lambda x: x / x.mean())
-    ratios = ratios.reset_index(drop=True)
-
-    # Adds the ratio columns for each row to the main dataframe
-    df[["PTS_R", "AST_R", "STL_R", "BLK_R", "3P_R"]] = ratios[["PTS", "AST", "STL", "BLK", "3P"]]
-    return df
-
-def MVP_label(df):
-    """
-    Adds an MVP column, defining whether a player won MVP (1 = MVP, 0 = Non-MVP)
-    :param df: dataframe,
-        the dataframe having the MVP column added to it
-    :return: dataframe,
-        the modified dataframe
-    """
-
-    # Getting only those who won MVP in a given year
-    MVPs = df.sort_values('Share', ascending=False).groupby('year').first().reset_index()
-
-    # Creating an MVP column, defining whether a player won MVP (1 = MVP, 0 = Non-MVP)
-    df['MVP'] = df.apply(lambda x: 1 if x['Player'] in MVPs['Player'].unique().tolist() \
-                and x['Age'] in MVPs.loc[(MVPs.Player == x['Player'])]['Age'].unique().tolist() else 0, axis=1)
-    return df
-
-def df_initializer():
-    """
-    :return: dataframe,
-        Initialises dataframes for MVP, per-game and team data
-    """
-
-    # Initialising MVP dataframe - but only need these columns
-    MVPs = pd.read_csv("../csvFiles/MVPs.csv")[["Player", "year", "First", "Pts Won", "Pts Max", "Share", "WS", "WS/48"]]
-
-    # Reads the Per-game data file, then cleans it
-    if not Utils.data_exists("../csvFiles/Per-game (clean).csv"):
-        print("\nCleaning Per-game data...")
-        Per_game = pg_clean(pd.read_csv("../csvFiles/Per-game.csv"))
-        os.remove("../csvFiles/Per-game.csv")
-    else:
-        print("\nPer-game data already clean")
-        Per_game = pd.read_csv("../csvFiles/Per-game (clean).csv")
-
-    # Normalises all the team names
-    if not Utils.data_exists("../csvFiles/Team-stats (clean).csv"):
-        print("\nCleaning team data...")
-        Teams = tm_clean(pd.read_csv("../csvFiles/Team-stats.csv"))
-        os.remove("../csvFiles/Team-stats.csv")
-    else:
-        print("\nTeam data already clean")
-        Teams = pd.read_csv("../csvFiles/Team-stats (clean).csv")
-
-    return MVPs, Per_game, Teams
-
-def nkname_dict():
-    """
-    :return: dict,
-        Creates a dictionary mapping team abbreviations (str) to the teams full name (str)
-    """
-    nicknames = {}
-    with open("../csvFiles/nicknames.csv") as f:
-
-        # Outputs the file as:
-        # ['Abbreviation,Name\n', 'ATL,Atlanta Hawks\n', 'BRK,Brooklyn Nets\n', ...]
-        lines = f.readlines()
-        for line in lines[1:]:
-
-            # Creating a tuple of team abbreviation, with team name
-            abbrev, team = line.replace("\n", "").split(",")
-            nicknames[abbrev] = team
-    return nicknames
-
-
-def tm_clean(df):
-    """
-    Reformats team names in the "team" column (series) using regex
-    :param df: dataframe,
-        team dataframe we're cleaning.
-    :return: clean dataframe
-    """
-    # replaces ("*") values in team names, e.g. "Orlando Magic*", with ""
-    df["Team"] = (df["Team"].str.replace(r"\*", "", regex=True)
-                  # replaces suffixes indicating team seed that season ("*\xao(int)"), e.g. "Orlando Magic*\xa0(7)"
-                  .str.replace(r"\u00A0\(\d{1,2}\)", "",  regex=True))
-    df.to_csv("../csvFiles/Team-stats (clean).csv")
-    return df
-
-def pg_clean(df):
-
-    # Cleans pg df by applying row_combiner() to each row, then resets the index
-    Per_game = df.groupby(["Player", "year"]).apply(row_combiner).reset_index(drop=True)
-    del Per_game["Rk"]
-    Per_game.to_csv("../csvFiles/Per-game (clean).csv", index=False)
-    return Per_game
-
-
-def row_combiner(df):
-    """
-    Combines rows (dataframe), where a player has multiple rows for a single year, into one row
-    :param df: dataframe,
-        dataframe containing per-game/mvp data
-    :return: dataframe,
-        a single row for a players season, either unchanged or combined depending on if they played for multiple teams
-    """
-    if df.shape[0] == 1: # If number of rows of the current dataframe is just 1
-        return df
-    else:
-
-        # Gets the row from the current dataframe which has the players averages for that season
-        row = df[df['Team'] == '2TM']
-
-        # Sets the value of the "Team" column, to the last "Team" the player played for that year
-        row["Team"] = df.iloc[-1]["Team"]
-        return row
\ No newline at end of file
+import pandas as pd, Utils, os, Storage, Schema, Profiling
+from Manifest import Manifest, file_hash, frame_hash
+from Entities import EntityDictionary
+from SeasonPartitions import SeasonPartitions
+from Pipeline import Pipeline
+
+MERGED_PATH = "../csvFiles/mvp-pg-team (clean).csv"
+PARTITIONS = "../csvFiles/partitions" # Each build step's output for each season, e.g. "Per-game/2024.csv"
+
+# The cleaned datasets, which are also saved in a columnar format (see Storage), and their .csv files
+DATASETS = {"Per-game": "../csvFiles/Per-game (clean).csv",
+            "Team-stats": "../csvFiles/Team-stats (clean).csv",
+            "MVPs": "../csvFiles/MVPs.csv",
+            "mvp-pg-team": MERGED_PATH}
+
+def clean(workers=2):
+    """
+    Creates a dataframe containing MVP, per-game and team data, then saves to a .csv
+
+    Each season is cleaned and merged on its own, and the manifest records the content hash of
+    everything each step was built from. Only seasons whose inputs have changed are rebuilt,
+    so adding a new season costs one season of work rather than a full rebuild
+    :param workers: int,
+        the number of stages run at once: the per-game and team data are cleaned side by side
+    :return: dataframe,
+        the cleaned dataset, compacted exactly (see Schema)
+    """
+    with Profiling.span("clean"):
+        pipeline = Pipeline(workers)
+        add_stages(pipeline)
+        return pipeline.run()["combine"]
+
+def add_stages(pipeline, after=()):
+    """
+    Adds the cleaning stages to a pipeline: reading the sources, cleaning the per-game and the team data
+    (which don't depend on each other), merging each season, then combining the seasons. Each stage hands
+    the partitions it builds to the next in memory, and the "combine" stage's output is the cleaned dataset.
+    The two cleaning stages run side by side, so each keeps what it builds to itself until "merge" starts
+    :param pipeline: Pipeline,
+        the pipeline being built
+    :param after: list,
+        the stages (str) that must finish before the sources are read, e.g. "scrape"
+    """
+    pipeline.add("read sources", lambda *_: read_sources(), after=after)
+    for name in ("Per-game", "Team-stats"):
+        pipeline.add(f"clean {name}", lambda sources, name=name: source_builder(sources, name), after=["read sources"])
+    pipeline.add("merge", merge_seasons, inputs=["read sources", "clean Per-game", "clean Team-stats"])
+    pipeline.add("combine", combine, after=["merge"], inputs=["read sources", "merge"])
+
+def read_sources():
+    """
+    :return: dict,
+        everything the cleaning stages share: the manifest, every season (list) in the data, the reader of each
+        source, the entity dictionary, the partitions built so far this run (dataframe, by key e.g. "Per-game/2024"),
+        and the cleaned datasets saved this run (compacted dataframe and its uncompacted size in MB, by name)
+    """
+    manifest = Manifest("../csvFiles/manifest.json")
+
+    # Initialises a reader for each season of the necessary data
+    years, MVP_years, Pg_years, pg_cleaner, team_years, tm_cleaner = df_initializer()
+
+    # Players, teams and positions are given integer IDs once, which the joins run on
+    entities = EntityDictionary()
+    entities.link_franchises("../csvFiles/nicknames.csv")
+    return {"manifest": manifest, "years": years, "MVPs": MVP_years, "Per-game": (Pg_years, pg_cleaner),
+            "Team-stats": (team_years, tm_cleaner), "entities": entities,
+            "nicknames": file_hash("../csvFiles/nicknames.csv"), "built": {}, "datasets": {}}
+
+def source_builder(sources, name):
+    """
+    Splits the per-game or team data into seasons, cleaning each season that has changed
+    :param sources: dict,
+        from read_sources()
+    :param name: str,
+        "Per-game" or "Team-stats"
+    :return: tuple,
+        the partitions built (dataframe, by key e.g. "Per-game/2024"), and the cleaned dataset saved, if it was
+        (compacted dataframe and its uncompacted size in MB, by name)
+    """
+    manifest, years = sources["manifest"], sources["years"]
+    reader, cleaner = sources[name]
+    built, datasets = {}, {}
+    rebuilt = 0
+    for year in years:
+        df = reader(year)
+
+        # Data that's already clean is just split into seasons
+        rebuilt += build_step(manifest, f"{name}/{year}",
+                              {name: frame_hash(df), "HTML": file_hash(f"../rawHTML/{name}/{year}.html")},
+                              lambda: cleaner(df) if cleaner else df, built)
+
+    # Freshly scraped data also gets its clean version saved, like it always has
+    if cleaner and rebuilt:
+        df = partition_reader(name, years, built)
+        df.to_csv(DATASETS[name], index=False)
+
+        # Kept for its columnar copy, compacted so it takes a fraction of the memory while the seasons are merged
+        datasets[name] = Schema.compact(df, exact=True), Schema.memory_mb(df)
+    return built, datasets
+
+def merge_seasons(sources, *cleaned):
+    """
+    Merges each season's clean per-game, MVP and team data, for the seasons where any of them changed
+    :param sources: dict,
+        from read_sources()
+    :param cleaned: tuple,
+        the output of each source_builder(), i.e. the per-game and team partitions and datasets built this run
+    :return: int,
+        the number of seasons rebuilt
+    """
+    manifest, built = sources["manifest"], sources["built"]
+    for cleaned_built, cleaned_datasets in cleaned:
+        built.update(cleaned_built)
+        sources["datasets"].update(cleaned_datasets)
+    rebuilt = 0
+    for year in sources["years"]:
+        with Profiling.span("season", "clean", year=year):
+            MVP_year = sources["MVPs"](year)
+            rebuilt += build_step(manifest, f"merged/{year}",
+                                  {"Per-game": manifest.output(f"Per-game/{year}"),
+                                   "Team-stats": manifest.output(f"Team-stats/{year}"),
+                                   "MVPs": frame_hash(MVP_year),
+                                   "MVP HTML": file_hash(f"../rawHTML/MVPs/{year}.html"),
+                                   "nicknames": sources["nicknames"]},
+                                  lambda: season_merger(year, MVP_year, sources["entities"], built), built)
+
+        # The season's per-game and team partitions aren't needed once it's merged
+        built.pop(f"Per-game/{year}", None)
+        built.pop(f"Team-stats/{year}", None)
+    return rebuilt
+
+def combine(sources, merged_rebuilt):
+    """
+    Combines every season's merged data into the cleaned dataset, adds the diagnostic columns, and saves
+    it (and the other cleaned datasets) as .csv files and typed columnar copies
+    :param sources: dict,
+        from read_sources()
+    :param merged_rebuilt: int,
+        the number of merged seasons rebuilt
+    :return: dataframe,
+        the cleaned dataset, compacted exactly (see Schema)
+    """
+    manifest, years, datasets = sources["manifest"], sources["years"], sources["datasets"]
+
+    # The full dataset depends on every season's merged data
+    inputs = {f"merged/{year}": manifest.output(f"merged/{year}") for year in years}
+    if not manifest.fresh("mvp-pg-team", inputs, MERGED_PATH):
+        with Profiling.span("combine", "clean"):
+            complete_df = partition_reader("merged", years, sources["built"])
+        sources["built"].clear()
+
+        # Puts the rows back in the order a single outer merge over every season gives them
+        complete_df = complete_df.sort_values(["Team", "year", "Player"], kind="stable")
+        complete_df = Schema.fill_missing(complete_df.reset_index(drop=True))
+        complete_df = col_d_type(complete_df)
+        with Profiling.span("diagnostics", "clean"):
+            complete_df = diagnostics(complete_df, sources["entities"])
+        with Profiling.span("save", "clean"):
+            complete_df.to_csv(MERGED_PATH, index=False)
+        manifest.record("mvp-pg-team", inputs, MERGED_PATH)
+        datasets["mvp-pg-team"] = Schema.compact(complete_df, exact=True), Schema.memory_mb(complete_df)
+        del complete_df
+        print(f"\nFinished cleaning ({merged_rebuilt} of {len(years)} seasons rebuilt)")
+    else:
+        print("\nmvp-pg-team.csv is up to date - this will be used for training")
+
+    # The .csv files stay for humans, but the pipeline loads the typed columnar copies, each column
+    # stored in the smallest type that holds it exactly (see Schema). Datasets saved this run are still in
+    # memory, so only the others are read back from their .csv files
+    for name, csv_path in DATASETS.items():
+        inputs = {"csv": file_hash(csv_path), "schema": "compact-exact"}
+        if not manifest.fresh(f"columnar/{name}", inputs, Storage.dataset_path(name)):
+            with Profiling.span("columnar", "clean", dataset=name):
+                if name in datasets:
+                    compacted, csv_mb = datasets[name]
+                else:
+                    df = pd.read_csv(csv_path)
+                    compacted, csv_mb = Schema.compact(df, exact=True), Schema.memory_mb(df)
+                    del df
+                Storage.write_dataset(compacted, name)
+            print(f"\n{name}: {csv_mb:.1f} MB in memory as read from the .csv file, "
+                  f"{Schema.memory_mb(compacted):.1f} MB compacted")
+            manifest.record(f"columnar/{name}", inputs, Storage.dataset_path(name))
+
+        # Only the cleaned dataset itself is handed on
+        if name != "mvp-pg-team":
+            datasets.pop(name, None)
+
+    # Forgets seasons that are no longer in the source data
+    manifest.prune({"mvp-pg-team"} | {f"{stage}/{year}" for stage in ("Per-game", "Team-stats", "merged")
+                                      for year in years} | {f"columnar/{name}" for name in DATASETS})
+    manifest.save()
+    sources["entities"].save()
+
+    # The dataset is handed on as it's stored in the columnar copy, which is only read when it wasn't just written
+    if "mvp-pg-team" in datasets:
+        return datasets.pop("mvp-pg-team")[0].sort_values("year", kind="stable").reset_index(drop=True)
+    return Storage.read_dataset("mvp-pg-team")
+
+def season_splitter(df):
+    """
+    :param df: dataframe,
+        a dataframe containing a "year" column
+    :return: function,
+        returns the rows (dataframe) for a given season, which is empty if there are none
+    """
+    seasons = dict(tuple(df.groupby("year")))
+    return lambda year: seasons.get(year, df.iloc[0:0])
+
+def partition_splitter(partitions, columns=None):
+    """
+    :param partitions: SeasonPartitions,
+        the scraper's saved seasons of a type of data
+    :param columns: list,
+        the columns to read, or None for all of them
+    :return: function,
+        returns the rows (dataframe) for a given season, read from its partition only when it's
+        needed, which is empty if there are none
+    """
+    years = set(partitions.years())
+    empty = partitions.read(min(years), columns).iloc[0:0]
+    return lambda year: partitions.read(year, columns) if year in years else empty
+
+def build_step(manifest, key, inputs, build, built=None):
+    """
+    Builds a season's partition, unless the manifest shows it's still valid
+    :param manifest: Manifest,
+        the record of what every partition was built from
+    :param key: str,
+        name of the partition, e.g. "Per-game/2024"
+    :param inputs: dict,
+        the current hash (str) of each input of the partition
+    :param build: function,
+        returns the partition's dataframe
+    :param built: dict,
+        where the partition is kept (by key) once it's built, so the next step doesn't read it back
+    :return: boolean,
+        whether the partition was rebuilt
+    """
+    path = f"{PARTITIONS}/{key}.csv"
+    if manifest.fresh(key, inputs, path):
+        return False
+    print(f"\nBuilding {key} data...")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    stage, year = key.split("/")
+    with Profiling.span(stage, "build", year=int(year)):
+        df = build()
+        df.to_csv(path, index=False)
+    if built is not None:
+        built[key] = df
+    manifest.record(key, inputs, path)
+    return True
+
+def partition_reader(stage, years, built=None):
+    """
+    :param stage: str,
+        the build step, e.g. "merged"
+    :param years: list,
+        the seasons to read
+    :param built: dict,
+        partitions built this run, which are used rather than read back from their files
+    :return: dataframe,
+        the step's partitions for every season, concatenated in year order
+    """
+    return pd.concat([partition_frame(stage, year, built) for year in years], ignore_index=True)
+
+def partition_frame(stage, year, built=None):
+    """
+    :param stage: str,
+        the build step, e.g. "Per-game"
+    :param year: int,
+        the season
+    :param built: dict,
+        partitions built this run
+    :return: dataframe,
+        the step's partition for the season, from memory if it was built this run, otherwise from its file
+    """
+    key = f"{stage}/{year}"
+    if built is not None and key in built:
+        return built[key]
+    return pd.read_csv(f"{PARTITIONS}/{key}.csv")
+
+def season_merger(year, MVP_df, entities, built=None):
+    """
+    Merges a season's clean per-game, MVP and team data
+    :param year: int,
+        the season being merged
+    :param MVP_df: dataframe,
+        the season's MVP data
+    :param entities: EntityDictionary,
+        the IDs of every player, team and franchise
+    :param built: dict,
+        partitions built this run
+    :return: dataframe,
+        the merged season
+    """
+    # An empty partition reads back with an object "year" column, which can't be merged on
+    Pg_df = partition_frame("Per-game", year, built).astype({"year": "int64"})
+    team_df = partition_frame("Team-stats", year, built).astype({"year": "int64"})
+
+    # Merges the per-game and MVP dataframes, and matches rows based on the "Player" and "year"
+    # columns in an outer join. The names are swapped for their IDs while joining, then swapped back
+    Pg_df["Player"] = entities.intern("player", Pg_df["Player"])
+    MVP_df = MVP_df.assign(Player=entities.intern("player", MVP_df["Player"]))
+    pg_mvp_df = Pg_df.merge(MVP_df, how="outer", on=["Player", "year"])
+    pg_mvp_df["Player"] = entities.lookup("player", pg_mvp_df["Player"])
+
+    # Per-game data names teams by abbreviation and team data by full name, so both are
+    # matched on the ID of the franchise they belong to
+    pg_mvp_df["Team"] = entities.franchises(entities.intern("team", pg_mvp_df["Team"]))
+    team_df["Team"] = entities.intern("franchise", team_df["Team"])
+    merged_df = pg_mvp_df.merge(team_df, how="outer", on=["Team", "year"])
+    merged_df["Team"] = entities.lookup("franchise", merged_df["Team"])
+    return merged_df
+
+
+def col_d_type(df):
+    """
+    Reassigns incorrect column data types
+    :param df: Dataframe,
+        The dataframe being modified
+    :return: dataframe,
+        The corrected dataframe
+    """
+    # Replaces "—" with "0" in the "GB" column
+    df["GB"] = df["GB"].str.replace("—", "0")
+
+    # Making the "GB" column a numeric column, rather than an object column
+    df["GB"] = pd.to_numeric(df["GB"])
+    return df
+
+
+def diagnostics(df, entities=None):
+    """
+    Adds diagnostic columns to our dataframe, for to help train the ML model
+    :param df: Dataframe,
+        the dataframe being modifying
+    :param entities: EntityDictionary,
+        the IDs of every team and position (defaults to the saved dictionary)
+    :return:
+        The modified dataframe
+    """
+    df = add_ratios(df)
+    df = pos_tm_cat(df, entities)
+    df = MVP_label(df)
+    return df
+
+def pos_tm_cat(df, entities=None):
+    """
+    Adds a column which assigns a numerical value for position (str) and team (str)
+    :param df: Dataframe,
+        the dataframe being modified
+    :param entities: EntityDictionary,
+        the IDs of every team and position (defaults to the saved dictionary)
+    :return:
+        the modified dataframe
+    """
+    if entities is None:
+        entities = EntityDictionary()
+
+    # The values are each position's and franchise's ID, which never change once given, so a new
+    # season (e.g. with a new franchise) doesn't change the codes the model was trained on
+    df["NPos"] = entities.intern("position", df["Pos"])
+    df["NTm"] = entities.intern("franchise", df["Team"])
+    return df
+
+def add_ratios(df):
+    """
+    Adds the ratio of, the value in the specified column to the mean of its column (for that year),
+    to the dataframe.
+    :param df: dataframe,
+        The dataframe having the ratio column added to it
+    :return: dataframe,
+        the modified dataframe
+    """
+    stats = ["PTS", "AST", "STL", "BLK", "3P"]
+
+    # Broadcasts each year's column means back onto that year's rows, then divides. Both frames share
+    # the dataframe's index, so each ratio lands on its own row whatever order the rows are in
+    year_means = df.groupby("year")[stats].transform("mean")
+    df[["PTS_R", "AST_R", "STL_R", "BLK_R", "3P_R"]] = (df[stats] / year_means).to_numpy()
+    return df
+
+def MVP_label(df):
+    """
+    Adds an MVP column, defining whether a player won MVP (1 = MVP, 0 = Non-MVP)
+    :param df: dataframe,
+        the dataframe having the MVP column added to it
+    :return: dataframe,
+        the modified dataframe
+    """
+
+    # Getting only those who won MVP in a given year
+    MVPs = df.sort_values('Share', ascending=False).groupby('year').first().reset_index()
+
+    # Creating an MVP column, defining whether a player won MVP (1 = MVP, 0 = Non-MVP):
+    # a row is an MVP season when its (Player, Age) pair matches one of the winners'
+    winners = pd.MultiIndex.from_frame(MVPs[['Player', 'Age']])
+    df['MVP'] = pd.MultiIndex.from_frame(df[['Player', 'Age']]).isin(winners).astype('int64')
+    return df
+
+def df_initializer():
+    """
+    Initialises a reader for each season of the MVP, per-game and team data
+
+    Freshly scraped data is read a season at a time from the scraper's saved seasons, so the seasons
+    that have finished can be cleaned while the rest are still being scraped (or from e.g. "Per-game.csv"
+    when there aren't any). Freshly scraped per-game and team data is cleaned season by season as part
+    of the build. Otherwise the previously cleaned data is used as it is
+    :return: tuple,
+        every season (list) in the data, then the MVP, per-game and team readers (function), each
+        returning a season's rows (dataframe). The per-game and team readers are each followed by the
+        function that cleans a season of them (None if the data is already clean)
+    """
+
+    # Initialising MVP data - but only need these columns
+    MVPs = source_reader("MVPs", ["Player", "year", "First", "Pts Won", "Pts Max", "Share", "WS", "WS/48"])
+
+    # Reads the Per-game data
+    Per_game, pg_cleaner = source_reader("Per-game"), pg_clean
+    if Per_game is None:
+        print("\nPer-game data already clean")
+        Per_game, pg_cleaner = csv_reader("../csvFiles/Per-game (clean).csv"), None
+
+    # Reads the team data
+    Teams, tm_cleaner = source_reader("Team-stats"), tm_clean
+    if Teams is None:
+        print("\nTeam data already clean")
+        Teams, tm_cleaner = csv_reader("../csvFiles/Team-stats (clean).csv"), None
+
+    years = sorted(set(MVPs[0]) | set(Per_game[0]) | set(Teams[0]))
+    return years, MVPs[1], Per_game[1], pg_cleaner, Teams[1], tm_cleaner
+
+def source_reader(name, columns=None):
+    """
+    :param name: str,
+        the type of scraped data, e.g. "Per-game"
+    :param columns: list,
+        the columns to read, or None for all of them
+    :return: tuple,
+        the seasons (list) of the freshly scraped data, and a function returning a season's rows
+        (dataframe), or None if there isn't any freshly scraped data
+    """
+    partitions = SeasonPartitions(name)
+    if partitions.years():
+        return partitions.years(), partition_splitter(partitions, columns)
+    if Utils.data_exists(f"../csvFiles/{name}.csv"):
+        return csv_reader(f"../csvFiles/{name}.csv", columns)
+    return None
+
+def csv_reader(path, columns=None):
+    """
+    :param path: str,
+        path of a .csv file with a "year" column
+    :param columns: list,
+        the columns to read, or None for all of them
+    :return: tuple,
+        the seasons (list) in the file, and a function returning a season's rows (dataframe)
+    """
+    df = pd.read_csv(path)
+    if columns is not None:
+        df = df[columns]
+    return sorted(set(df["year"])), season_splitter(df)
+
+def tm_clean(df):
+    """
+    Reformats team names in the "team" column (series) using regex
+    :param df: dataframe,
+        team dataframe we're cleaning.
+    :return: clean dataframe
+    """
+    df = df.copy()
+
+    # replaces ("*") values in team names, e.g. "Orlando Magic*", with ""
+    df["Team"] = (df["Team"].str.replace(r"\*", "", regex=True)
+                  # replaces suffixes indicating team seed that season ("*\xao(int)"), e.g. "Orlando Magic*\xa0(7)"
+                  .str.replace(r"\u00A0\(\d{1,2}\)", "",  regex=True))
+    return df
+
+def pg_clean(df):
+    """
+    Combines rows, where a player has multiple rows for a single year, into one row
+    :param df: dataframe,
+        raw per-game data
+    :return: dataframe,
+        a single row for each player's season, sorted by player and year
+    """
+    seasons = df.groupby(["Player", "year"], sort=False)
+
+    # The number of rows each player's season has, and the position of its last row
+    rows = seasons["Team"].transform("size")
+    last = pd.Series(range(len(df)), index=df.index).groupby([df["Player"], df["year"]], sort=False).transform("max")
+
+    # A player who played for multiple teams keeps only the row with their averages for the season
+    # ("2TM"), which takes the "Team" of the last team they played for that year
+    traded = rows > 1
+    Per_game = df[(rows == 1) | (traded & (df["Team"] == "2TM"))].copy()
+    last_team = df["Team"].to_numpy()[last[Per_game.index].to_numpy()]
+    Per_game["Team"] = Per_game["Team"].where(~traded[Per_game.index], last_team)
+
+    Per_game = Per_game.sort_values(["Player", "year"], kind="stable").reset_index(drop=True)
+    del Per_game["Rk"]
+    return Per_game
\ No newline at end of file
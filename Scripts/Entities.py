@@ -0,0 +1,113 @@
+import json, os, numpy as np, pandas as pd
+
+ENTITIES_PATH = "../csvFiles/entities.json"
+
+# The kinds of entity that get IDs: players, teams as per-game data names them (abbreviations, e.g. "BRK"),
+# franchises as team data names them (e.g. "Brooklyn Nets") and positions
+KINDS = ("player", "team", "franchise", "position")
+
+class EntityDictionary:
+    """
+    Interns each player, team, franchise and position to an integer ID, and keeps the IDs between builds
+
+    IDs are handed out in order and never changed or reused: a name gets the next free ID the first time
+    it's seen, and keeps it from then on. So the IDs stay the same across seasons and rebuilds, and new
+    seasons only ever add IDs. The names seen in a single call are given IDs in sorted order, so a
+    dictionary built from scratch gives the same IDs as pandas' category codes over the same data
+
+    Missing names (NaN) get the ID -1, which never matches a real entity
+
+    Usage:
+        entities = EntityDictionary()
+        df["Player"] = entities.intern("player", df["Player"])
+        entities.save()
+    """
+    def __init__(self, path=ENTITIES_PATH):
+        """
+        :param path: str,
+            file the dictionary is saved to
+        """
+        self.path = path
+        self.names = {kind: [] for kind in KINDS} # Each kind's names, in ID order
+        self.franchise_of = {} # The franchise (int) each team (int) belongs to
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self.names.update(saved["names"])
+            self.franchise_of = {int(team): franchise for team, franchise in saved["franchise_of"].items()}
+        self.ids = {kind: {name: i for i, name in enumerate(names)} for kind, names in self.names.items()}
+        self.arrays = {} # Each kind's names as an array, for lookup(), built when first needed
+        self.changed = False
+
+    def intern(self, kind, names):
+        """
+        :param kind: str,
+            the kind of entity, e.g. "player"
+        :param names: series,
+            names of the entities (str), or NaN where there isn't one
+        :return: numpy array,
+            the ID (int32) of each name, with names that haven't been seen before given new IDs
+        """
+        ids = self.ids[kind]
+        codes, uniques = pd.factorize(names)
+        new = sorted(name for name in uniques if name not in ids)
+        if new:
+            for name in new:
+                ids[name] = len(self.names[kind])
+                self.names[kind].append(name)
+            self.arrays.pop(kind, None)
+            self.changed = True
+
+        # Missing names have the code -1, which picks the -1 added to the end
+        return np.append(np.fromiter((ids[name] for name in uniques), "int32", len(uniques)), -1)[codes]
+
+    def lookup(self, kind, ids):
+        """
+        :param kind: str,
+            the kind of entity, e.g. "player"
+        :param ids: array-like,
+            IDs (int) of the entities, or -1 where there isn't one
+        :return: numpy array,
+            the name (str) of each ID, or NaN for -1
+        """
+        if kind not in self.arrays:
+            self.arrays[kind] = np.append(np.array(self.names[kind], dtype=object), np.nan)
+        return self.arrays[kind][np.asarray(ids)]
+
+    def link_franchises(self, path="../csvFiles/nicknames.csv"):
+        """
+        Records which franchise each team belongs to, e.g. that "BRK" and "BKN" are both the "Brooklyn Nets"
+        :param path: str,
+            .csv file of team abbreviations and the full name of their franchise
+        """
+        nicknames = pd.read_csv(path)
+        teams = self.intern("team", nicknames["Abbreviation"])
+        franchises = self.intern("franchise", nicknames["Name"])
+        franchise_of = dict(zip(teams.tolist(), franchises.tolist()))
+        if franchise_of != self.franchise_of:
+            self.franchise_of = franchise_of
+            self.changed = True
+
+    def franchises(self, team_ids):
+        """
+        :param team_ids: numpy array,
+            IDs (int) of teams, or -1 where there isn't one
+        :return: numpy array,
+            the ID (int32) of each team's franchise, or -1 for teams that don't belong to a known one
+        """
+        # The extra entry at the end is what -1 picks
+        lookup = np.full(len(self.names["team"]) + 1, -1, dtype="int32")
+        lookup[list(self.franchise_of)] = list(self.franchise_of.values())
+        return lookup[team_ids]
+
+    def save(self):
+        """
+        Saves the dictionary, if any IDs were added. It's written under a temporary name first, so an
+        interrupted run can't leave half a dictionary behind
+        """
+        if not self.changed:
+            return
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"names": self.names, "franchise_of": self.franchise_of}, f, ensure_ascii=False)
+        os.replace(f"{self.path}.tmp", self.path)
+        self.changed = False
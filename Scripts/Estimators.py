@@ -0,0 +1,37 @@
+from sklearn.linear_model import Ridge
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from IncrementalRidge import IncrementalRidge
+from LambdaRanker import LambdaRanker
+
+# The estimators Model can backtest, by name. Any sklearn-style regressor can be added here; models that
+# rank within seasons (LambdaRanker) are also given each season's size when they're fitted (see ML.fit_rows)
+ESTIMATORS = {"ridge": Ridge,
+              "incremental-ridge": IncrementalRidge,
+              "random-forest": RandomForestRegressor,
+              "hist-gradient-boosting": HistGradientBoostingRegressor,
+              "lambda-rank": LambdaRanker}
+
+# The settings each estimator is used with when none are given
+DEFAULT_PARAMS = {"ridge": {"alpha": 1.0},
+                  "incremental-ridge": {"alpha": 1.0},
+                  "random-forest": {"n_estimators": 50, "min_samples_split": 5, "random_state": 1},
+                  "hist-gradient-boosting": {"random_state": 1},
+                  "lambda-rank": {}}
+
+def estimator(name, params=None):
+    """
+    :param name: str,
+        name of the estimator
+    :param params: dict,
+        its parameters, or None for its defaults (see DEFAULT_PARAMS)
+    :return: sklearn estimator,
+        an unfitted estimator. Models that can use several cores are limited to one, as backtests and
+        sweeps already run one fold per core
+    """
+    if name not in ESTIMATORS:
+        raise ValueError(f"Unknown estimator '{name}', pick from {', '.join(ESTIMATORS)}")
+    params = DEFAULT_PARAMS.get(name, {}) if params is None else params
+    model = ESTIMATORS[name](**params)
+    if "n_jobs" in model.get_params() and "n_jobs" not in params:
+        model.set_params(n_jobs=1)
+    return model
@@ -0,0 +1,174 @@
+import re, threading, time, random
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib2 import Path
+
+# Maps basketball-reference URL paths to the rawHTML directory holding the saved page
+ROUTES = [
+    (re.compile(r"^/awards/awards_(\d{4})\.html$"), "MVPs"),
+    (re.compile(r"^/leagues/NBA_(\d{4})_per_game\.html$"), "Per-game"),
+    (re.compile(r"^/leagues/NBA_(\d{4})_standings\.html$"), "Team-stats"),
+]
+
+class FixtureServer:
+    """
+    A local stand-in for basketball-reference.com, which serves the pages saved in rawHTML/
+
+    Used to run the scrapers end to end without sending a single request to the real website.
+    Every request's arrival time is recorded, so the rate the scrapers actually send at can be checked.
+
+    It can also misbehave like the real website: answering 429 + Retry-After when more than
+    max_requests arrive within a window, and failing a fraction of requests with a 503.
+    For benchmarks, every response can be delayed by a fixed latency, and pages can be padded
+    out to a minimum size (the real pages carry a lot more markup than the tables we keep)
+
+    Usage:
+        with FixtureServer("../rawHTML") as server:
+            MVPScraper(years, base_url=server.url, ...)
+    """
+    def __init__(self, html_root="../rawHTML", port=0, max_requests=None, window=60.0, retry_after=None,
+                 error_rate=0.0, seed=None, latency=0.0, page_size=None):
+        """
+        :param html_root: str,
+            directory containing the saved pages, laid out as <directory name>/<year>.html
+        :param port: int,
+            port to listen on (0 picks a free port)
+        :param max_requests: int,
+            requests allowed per window before answering 429 (None never throttles)
+        :param window: float,
+            length of the throttling window, in seconds
+        :param retry_after: float,
+            value of the Retry-After header sent with a 429 (None sends no header)
+        :param error_rate: float,
+            fraction of requests answered with a 503
+        :param seed: int,
+            seed for the injected errors, so runs can be repeated
+        :param latency: float,
+            seconds every response is delayed by, like the round trip to the real website
+        :param page_size: int,
+            the least number of bytes each page is served with: shorter pages get an HTML comment
+            added to the end (None serves the pages as they're saved)
+        """
+        self.html_root = Path(html_root)
+        self.max_requests = max_requests
+        self.window = window
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.latency = latency
+        self.page_size = page_size
+        self.requests = [] # (arrival time, path, status) for every request served
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def handler(self):
+        """
+        :return: class,
+            a request handler bound to this server
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Allows keep-alive connections to be reused
+
+            def do_GET(self):
+                # Each request has its own thread, so delayed responses overlap like they would over the network
+                if server.latency:
+                    time.sleep(server.latency)
+                status, body = server.respond(self.path)
+                self.send_response(status)
+                if status == 429 and server.retry_after is not None:
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass # Keeps the console free of per-request logging
+
+        return Handler
+
+    def respond(self, path):
+        """
+        :param path: str,
+            the requested URL path
+        :return: tuple,
+            the status code (int) and body (bytes) to send back
+        """
+        if self.throttled():
+            self.record(path, 429)
+            return 429, b"<html><body>Too Many Requests</body></html>"
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+        if failed:
+            self.record(path, 503)
+            return 503, b"<html><body>Service Unavailable</body></html>"
+
+        status, body = 404, b"Not found"
+        for pattern, directory_name in ROUTES:
+            match = pattern.match(path)
+            if match:
+                file = self.html_root / directory_name / f"{match.group(1)}.html"
+                if file.exists():
+                    status, body = 200, self.padded(file.read_bytes())
+                break
+        self.record(path, status)
+        return status, body
+
+    def padded(self, page):
+        """
+        :param page: bytes,
+            a saved page
+        :return: bytes,
+            the page, with a comment added to the end to make it page_size bytes long if it's shorter
+        """
+        if self.page_size is None or len(page) >= self.page_size:
+            return page
+        filler = self.page_size - len(page) - len(b"<!--\n-->")
+        return page + b"<!--" + b"x" * max(filler, 0) + b"\n-->"
+
+    def throttled(self):
+        """
+        :return: boolean,
+            whether the requests accepted in the current window have used up the allowance
+        """
+        if self.max_requests is None:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            accepted = [t for t, _, status in self.requests if now - t < self.window and status != 429]
+        return len(accepted) >= self.max_requests
+
+    def record(self, path, status):
+        with self.lock:
+            self.requests.append((time.monotonic(), path, status))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    with FixtureServer(port=8000) as server:
+        print(f"Serving rawHTML/ on {server.url} (Ctrl+C to stop)")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
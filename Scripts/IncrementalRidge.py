@@ -0,0 +1,109 @@
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+
+class IncrementalRidge(BaseEstimator, RegressorMixin):
+    """
+    Ridge regression (with an intercept, like sklearn's Ridge) that can be grown one batch of rows at a time
+
+    Only the sufficient statistics of the rows seen so far are kept - their count, sums, XᵀX and Xᵀy -
+    so adding a season costs O(rows in the season * p²), and solving costs O(p³), however much
+    history there is. The walk-forward backtest's training sets are nested, so each fold just
+    extends the previous one by a season instead of refitting on the whole history.
+
+    Usage:
+        model = IncrementalRidge(alpha=1.0)
+        model.extend(X_1996, y_1996)
+        model.extend(X_1997, y_1997)
+        predictions = model.predict(X_1998)
+    """
+    def __init__(self, alpha=1.0):
+        """
+        :param alpha: float,
+            regularization strength, as in sklearn's Ridge
+        """
+        self.alpha = alpha
+
+    def reset(self):
+        """
+        Forgets every row seen so far
+        """
+        self.n_rows_ = 0
+        self.shift_ = None
+        self.solved_ = False
+
+    def fit(self, X, y):
+        """
+        Fits on X and y alone, like sklearn's Ridge.fit
+        :param X: numpy array,
+            the predictor matrix
+        :param y: numpy array,
+            the target
+        :return: IncrementalRidge,
+            the fitted model
+        """
+        self.reset()
+        return self.extend(X, y)
+
+    def extend(self, X, y):
+        """
+        Adds rows to the ones the model has already seen
+        :param X: numpy array,
+            the new rows' predictors
+        :param y: numpy array,
+            the new rows' target
+        :return: IncrementalRidge,
+            the model
+        """
+        if not hasattr(self, "n_rows_"):
+            self.reset()
+        X = np.asarray(X, dtype="float64")
+        y = np.asarray(y, dtype="float64")
+        if not len(X):
+            return self
+
+        # The sums are taken around the first batch's means rather than zero, so the large, similar values
+        # of columns like "year" don't cancel each other out when the sums are centered in solve()
+        if self.shift_ is None:
+            self.shift_ = X.mean(axis=0)
+            self.y_shift_ = y.mean()
+            p = X.shape[1]
+            self.x_sum_, self.y_sum_ = np.zeros(p), 0.0
+            self.xx_, self.xy_ = np.zeros((p, p)), np.zeros(p)
+        X = X - self.shift_
+        y = y - self.y_shift_
+        self.n_rows_ += len(X)
+        self.x_sum_ += X.sum(axis=0)
+        self.y_sum_ += y.sum()
+        self.xx_ += X.T @ X
+        self.xy_ += X.T @ y
+        self.solved_ = False
+        return self
+
+    def solve(self):
+        """
+        Solves for the coefficients of every row seen so far
+        """
+        if not self.n_rows_:
+            raise ValueError("IncrementalRidge has not seen any rows")
+        x_mean = self.x_sum_ / self.n_rows_
+        y_mean = self.y_sum_ / self.n_rows_
+
+        # Centers the statistics, which is the same as sklearn's Ridge centering X and y before fitting
+        xx = self.xx_ - self.n_rows_ * np.outer(x_mean, x_mean)
+        xy = self.xy_ - self.n_rows_ * x_mean * y_mean
+        xx[np.diag_indices_from(xx)] += self.alpha
+
+        self.coef_ = np.linalg.solve(xx, xy)
+        self.intercept_ = self.y_shift_ + y_mean - (self.shift_ + x_mean) @ self.coef_
+        self.solved_ = True
+
+    def predict(self, X):
+        """
+        :param X: numpy array,
+            the rows being predicted
+        :return: numpy array,
+            the predictions
+        """
+        if not self.solved_:
+            self.solve()
+        return np.asarray(X, dtype="float64") @ self.coef_ + self.intercept_
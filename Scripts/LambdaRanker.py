@@ -0,0 +1,258 @@
+import numpy as np
+from scipy.special import expit
+from sklearn.base import BaseEstimator, RegressorMixin
+
+class LambdaRanker(BaseEstimator, RegressorMixin):
+    """
+    Gradient-boosted trees that learn the ranking within each season directly (LambdaMART), rather than
+    regressing "Share" across every player-season
+
+    - Every pair of players in the same season whose "Share" differs pulls the better one up and the other
+      down, weighted by how much swapping them would change the season's NDCG (LambdaRank). So getting
+      the top of each season right counts for more than the order of the players nobody voted for
+    - Like HistGradientBoostingRegressor, each feature is binned into at most max_bins quantiles once, and
+      the trees are grown level by level from histograms of the bins' gradients, rather than by sorting
+      every feature at every node
+
+    fit() needs the number of rows in each season (group), with the rows sorted by season. Model passes
+    them (see ML.fit_rows). The predictions are scores, which only mean something as a ranking
+
+    Usage:
+        model = LambdaRanker(n_estimators=50)
+        model.fit(X, y, group=[450, 460, 470])
+        scores = model.predict(X_2024)
+    """
+    def __init__(self, n_estimators=50, learning_rate=0.1, max_depth=4, min_samples_leaf=20, max_bins=64,
+                 l2_regularization=0.0):
+        """
+        :param n_estimators: int,
+            the number of trees
+        :param learning_rate: float,
+            factor each tree's output is multiplied by
+        :param max_depth: int,
+            the depth of each tree, so it has at most 2 ** max_depth leaves
+        :param min_samples_leaf: int,
+            the fewest rows a leaf may have
+        :param max_bins: int,
+            the most bins each feature is split into (at most 256)
+        :param l2_regularization: float,
+            added to the sum of each leaf's second derivatives, shrinking its value
+        """
+        self.n_estimators = n_estimators
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.max_bins = max_bins
+        self.l2_regularization = l2_regularization
+
+    def fit(self, X, y, group):
+        """
+        :param X: numpy array,
+            the predictor matrix, with rows sorted by season
+        :param y: numpy array,
+            the target, e.g. "Share"
+        :param group: array-like,
+            the number of rows (int) in each season, in order
+        :return: LambdaRanker,
+            the fitted model
+        """
+        X = np.asarray(X, dtype="float64")
+        y = np.asarray(y, dtype="float64")
+        group = np.asarray(group, dtype="int64")
+        self.edges_ = bin_edges(X, self.max_bins)
+        binned = bin_features(X, self.edges_)
+        pairs = season_pairs(y, group)
+
+        # Where each value falls in a node's (feature, bin) histogram, worked out once for every tree
+        slots = (np.arange(X.shape[1]) * self.max_bins + binned).astype("intp")
+
+        self.trees_ = []
+        scores = np.zeros(len(X))
+        for _ in range(self.n_estimators):
+            gradient, hessian = lambdas(scores, group, *pairs)
+            tree, leaves = self.grow(binned, slots, gradient, hessian)
+            self.trees_.append(tree)
+            scores += self.learning_rate * tree["value"][leaves]
+        return self
+
+    def grow(self, binned, slots, gradient, hessian):
+        """
+        Grows a tree level by level, splitting every node on the bin that most reduces its Newton loss
+        :param binned: numpy array,
+            the binned predictor matrix (uint8)
+        :param slots: numpy array,
+            the (feature, bin) histogram slot (int) of every value
+        :param gradient: numpy array,
+            each row's negative gradient
+        :param hessian: numpy array,
+            each row's second derivative
+        :return: tuple,
+            the tree (dict of arrays, indexed by node, whose children are 2n+1 and 2n+2), and the leaf (int) of each row
+        """
+        n, p = binned.shape
+        bins, size = self.max_bins, 2 ** (self.max_depth + 1) - 1
+        tree = {"feature": np.full(size, -1), "threshold": np.zeros(size, dtype="uint8"), "value": np.zeros(size)}
+        node = np.zeros(n, dtype="int64")
+        histograms = None
+        for depth in range(self.max_depth + 1):
+            first, width = 2 ** depth - 1, 2 ** depth # The nodes on this level
+
+            # Rows that reached a leaf on an earlier level stay there
+            rows = np.flatnonzero(node >= first)
+            level = node[rows] - first
+            G = np.bincount(level, gradient[rows], width)
+            H = np.bincount(level, hessian[rows], width) + self.l2_regularization
+            tree["value"][first:first + width] = np.divide(G, H, out=np.zeros(width), where=H > 0)
+            if depth == self.max_depth:
+                break
+
+            # Histograms of the gradients, second derivatives and rows of every node on the level, as
+            # (node, feature, bin). Only the left children's are counted: a right child's is its parent's
+            # minus its sibling's, and children of nodes that weren't split have none
+            left = rows if depth == 0 else rows[level % 2 == 0]
+            parent = node[left] - first if depth == 0 else (node[left] - first) // 2
+            keys = (parent[:, None] * (p * bins) + slots[left]).ravel()
+            length = max(width // 2, 1) * p * bins
+            counted = [np.bincount(keys, np.repeat(weights[left], p), length) for weights in (gradient, hessian)]
+            counted.append(np.bincount(keys, minlength=length).astype("float64"))
+            counted = np.stack(counted).reshape(3, -1, p, bins)
+            if depth == 0:
+                histograms = counted
+            else:
+                split = (tree["feature"][2 ** (depth - 1) - 1:first] >= 0)[:, None, None]
+                siblings = np.where(split, histograms - counted, 0)
+                histograms = np.stack([counted, siblings], axis=2).reshape(3, width, p, bins)
+
+            # Splitting after a bin sends it, and every bin below it, to the left child
+            G_left, H_left, N_left = histograms.cumsum(axis=3)
+            G_right = G[:, None, None] - G_left
+            H_right = H[:, None, None] - H_left - self.l2_regularization
+            N_right = N_left[:, :, -1:] - N_left
+            H_left = H_left + self.l2_regularization
+
+            # The reduction in each node's Newton loss from each split
+            with np.errstate(divide="ignore", invalid="ignore"):
+                gain = G_left ** 2 / H_left + G_right ** 2 / (H_right + self.l2_regularization) - (G ** 2 / H)[:, None, None]
+            gain[(N_left < self.min_samples_leaf) | (N_right < self.min_samples_leaf)
+                 | (H_left <= 0) | (H_right <= 0)] = -np.inf
+            gain = np.nan_to_num(gain.reshape(width, -1), nan=-np.inf)
+            best = gain.argmax(axis=1)
+            splits = np.flatnonzero(gain[np.arange(width), best] > 1e-12)
+
+            # Nodes that no split improves are leaves
+            if not len(splits):
+                break
+            tree["feature"][first + splits] = best[splits] // bins
+            tree["threshold"][first + splits] = best[splits] % bins
+            node = descend(tree, binned, node)
+        return tree, node
+
+    def predict(self, X):
+        """
+        :param X: numpy array,
+            the predictor matrix
+        :return: numpy array,
+            each row's score, higher being ranked better
+        """
+        binned = bin_features(np.asarray(X, dtype="float64"), self.edges_)
+        scores = np.zeros(len(binned))
+        for tree in self.trees_:
+            node = np.zeros(len(binned), dtype="int64")
+            for _ in range(self.max_depth):
+                node = descend(tree, binned, node)
+            scores += self.learning_rate * tree["value"][node]
+        return scores
+
+def bin_edges(X, max_bins):
+    """
+    :param X: numpy array,
+        the predictor matrix
+    :param max_bins: int,
+        the most bins each feature is split into
+    :return: list,
+        the upper edges (numpy array) of each feature's bins but the last, at its quantiles
+    """
+    quantiles = np.linspace(0, 1, max_bins + 1)[1:-1]
+    edges = []
+    for col in X.T:
+        values = np.unique(col)
+        if len(values) <= max_bins:
+            # Few enough values for each to have its own bin, split halfway between them
+            edges.append((values[:-1] + values[1:]) / 2)
+        else:
+            edges.append(np.unique(np.quantile(col, quantiles)))
+    return edges
+
+def bin_features(X, edges):
+    """
+    :param X: numpy array,
+        the predictor matrix
+    :param edges: list,
+        each feature's bin edges, from bin_edges()
+    :return: numpy array,
+        the bin (uint8) of every value
+    """
+    binned = np.empty(X.shape, dtype="uint8")
+    for i, feature_edges in enumerate(edges):
+        binned[:, i] = np.searchsorted(feature_edges, X[:, i], side="left")
+    return binned
+
+def descend(tree, binned, node):
+    """
+    :return: numpy array,
+        each row's node (int) one level down, or the node it's in if that's a leaf
+    """
+    feature = tree["feature"][node]
+    internal = feature >= 0
+    rows = np.flatnonzero(internal)
+    right = binned[rows, feature[rows]] > tree["threshold"][node[rows]]
+    node = node.copy()
+    node[rows] = 2 * node[rows] + 1 + right
+    return node
+
+def season_pairs(y, group):
+    """
+    :param y: numpy array,
+        the target, with rows sorted by season
+    :param group: numpy array,
+        the number of rows (int) in each season
+    :return: tuple,
+        the better (int) and worse (int) row of every pair in the same season whose targets differ, how much
+        their gains differ as a fraction of the season's best possible DCG, and the season (int) of every row
+    """
+    starts = np.cumsum(group) - group
+    better, worse, gain = [np.zeros(0, dtype="int64")], [np.zeros(0, dtype="int64")], [np.zeros(0)]
+    for start, size in zip(starts, group):
+        season = y[start:start + size]
+        i, j = np.nonzero(season[:, None] > season[None, :])
+        if not len(i):
+            continue # Nobody got a vote, so the season has no order to learn
+        ideal_dcg = (np.sort(season)[::-1] / np.log2(np.arange(2, size + 2))).sum()
+        better.append(i + start)
+        worse.append(j + start)
+        gain.append((season[i] - season[j]) / ideal_dcg)
+    return np.concatenate(better), np.concatenate(worse), np.concatenate(gain), np.repeat(np.arange(len(group)), group)
+
+def lambdas(scores, group, better, worse, gain, season):
+    """
+    :param scores: numpy array,
+        the current score of every row
+    :return: tuple,
+        the negative gradient and second derivative of every row's LambdaRank loss
+    """
+    n = len(scores)
+
+    # Each row's position (0 = best) in its season's current ranking
+    order = np.lexsort((-scores, season))
+    position = np.empty(n, dtype="int64")
+    position[order] = np.arange(n) - np.repeat(np.cumsum(group) - group, group)
+    discount = 1 / np.log2(position + 2)
+
+    # How much swapping each pair would change its season's NDCG, times how likely the model is to order it wrongly
+    delta = gain * np.abs(discount[better] - discount[worse])
+    wrong = expit(scores[worse] - scores[better])
+    pull = wrong * delta
+    curvature = wrong * (1 - wrong) * delta
+    gradient = np.bincount(better, pull, n) - np.bincount(worse, pull, n)
+    hessian = np.bincount(better, curvature, n) + np.bincount(worse, curvature, n)
+    return gradient, hessian
@@ -1,56 +1,229 @@
-import pandas as pd, Utils
-from sklearn.linear_model import Ridge
-from sklearn.ensemble import RandomForestRegressor
+import pandas as pd, numpy as np, Utils, Storage, Schema, Metrics, Profiling, os, tempfile
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.base import clone
+from IncrementalRidge import IncrementalRidge
+from LambdaRanker import LambdaRanker
+from Estimators import estimator
+from ModelCache import fold_key, season_hash
 
-def predict():
+# The feature matrix and "Share" array, as read-only memory maps, and the season offsets, in each backtest worker process
+SHARED = {}
+
+def predict(cache=None):
+    """
+    The interactive program: asks for a model and the seasons to train on, then backtests it
+    :param cache: ModelCache,
+        where fitted folds are saved and reused, or None to always retrain
+    """
     ML_alg = int(input("\nPick model: \n"
                    "'1': linear regression\n"
-                   "'2': random forest \n "))
+                   "'2': random forest \n"
+                   "'3': linear regression (expanding-window solver, faster over many seasons)\n"
+                   "'4': histogram gradient boosting (much faster than the random forest)\n"
+                   "'5': gradient boosting that learns each season's ranking directly\n "))
     if ML_alg == 1:
-        ML_alg = Ridge(alpha=input("Pick an alpha value: "))
+        ML_alg = estimator("ridge", {"alpha": float(input("Pick an alpha value: "))})
+    elif ML_alg == 3:
+        ML_alg = estimator("incremental-ridge", {"alpha": float(input("Pick an alpha value: "))})
+    elif ML_alg == 4:
+        ML_alg = estimator("hist-gradient-boosting")
+    elif ML_alg == 5:
+        ML_alg = estimator("lambda-rank")
     else:
-        ML_alg = RandomForestRegressor(n_estimators=50, random_state=1, min_samples_split=5)
+        ML_alg = estimator("random-forest")
     start_yr, end_yr = Utils.year_input("training")
-    Predictor = Model(start_yr, end_yr, ML_alg)
+    Predictor = Model(start_yr, end_yr, ML_alg, cache=cache)
     mean_ap, aps, predictions_df = Predictor.backtest()
     print(f"\nMean Average Precision: {mean_ap}")
 
+    # The other ranking metrics, averaged over every season tested on
+    for metric, value in Predictor.metrics.drop(columns="AP").mean().items():
+        print(f"Mean {metric}: {value:.4f}")
+
 class Model:
     """
     A Class which initiates a machine learning model for predicting the NBA MVP
     """
-    def __init__(self, start_yr, end_yr, model):
+    def __init__(self, start_yr, end_yr, model, df=None, cache=None, compact=False, candidates=None):
+        """
+        :param start_yr: int,
+            the first season of data used
+        :param end_yr: int,
+            the last season of data used
+        :param model: sklearn estimator,
+            the model being backtested
+        :param df: dataframe,
+            the data to use instead of the cleaned dataset, e.g. for benchmarks
+        :param cache: ModelCache,
+            where fitted folds are saved and reused, or None to always retrain
+        :param compact: boolean,
+            memory-budget mode: the data's floats are rounded to float32 (the columnar copy keeps them as
+            float64, see Schema), and so is the predictor matrix, half the size. sklearn's Ridge solves in float32 then,
+            and may warn that a fold is ill-conditioned; the rankings were the same on our data
+        :param candidates: Candidates,
+            picks each season's plausible MVP candidates, which are the only players trained on and scored,
+            or None to use every player. How many of each season's top-5 vote-getters were kept is in candidate_recall
+        """
+        # Initializes our the core dataframe from the memory-mapped columnar copy when there is one
+        with Profiling.span("load data", "model"):
+            if df is not None:
+                self.df = df
+            elif Storage.dataset_exists("mvp-pg-team"):
+                self.df = Storage.read_dataset("mvp-pg-team")
+            else:
+                self.df = pd.read_csv("../csvFiles/mvp-pg-team (clean).csv")
+
+        # Seasons are kept in order, so each season's rows, and every row before them, are consecutive.
+        # Where each row was before sorting is kept too, see fit_rows
+        self.order = np.argsort(self.df["year"].to_numpy(), kind="stable")
+        self.df = self.df.iloc[self.order]
+        if compact:
+            self.df = Schema.compact(self.df)
 
-        # Initializes our the core dataframe, and then adds additional columns for diagnostics
-        self.df = pd.read_csv("../csvFiles/mvp-pg-team (clean).csv")
+        # Only the candidates are kept, so every fold trains on and scores a fraction of the rows
+        self.candidate_recall = None
+        if candidates is not None:
+            with Profiling.span("candidates", "model"):
+                keep = candidates.mask(self.df)
+                self.candidate_recall = candidates.recall(self.df, keep)
+                self.df = self.df[keep]
+                self.order = self.order[keep]
+
+        # Data that was already sorted by year is trained on in place
+        if np.all(self.order[1:] > self.order[:-1]):
+            self.order = None
 
         #  The predictors we'll use to train our model
         self.predictors = self.predictors()
+
+        # Built once: the predictors as a contiguous float matrix, the "Share" column, and the row range of each season.
+        # A season's training rows are then the slice before its range, so no fold masks the data
+        self.features = np.ascontiguousarray(self.df[self.predictors].to_numpy(dtype="float32" if compact else "float64"))
+        self.share = self.df["Share"].to_numpy(dtype="float64")
+        self.offsets = Storage.year_offsets(self.df["year"].to_numpy())
         self.years = list(range(start_yr, end_yr+1))
 
         # The type of model we will use for our ML procedure
         self.model = model
 
+        # The ranking metrics of each season in the last backtest
+        self.metrics = None
+
+        self.cache = cache
+        self.season_hashes = None
+
 
-    def backtest(self):
+    def backtest(self, workers=None):
         """
         Backtests on previous years' worth of data for predicting the NBA MVP
+        :param workers: int,
+            the number of processes training seasons at once (1 trains in this process, None uses every core)
         :return: the model's mean precision (int), a list of all average precisions and a dataframe of the top 5 predicted players for each season
         """
-        print("\nProcessing prediciton...")
+        with Profiling.span("backtest", model=type(self.model).__name__):
+            print("\nProcessing prediciton...")
 
-        all_predictions = []
-        aps =  []
+            # We start at the 5th earliest year, so we can have at least 5 years' of data for training
+            test_years = self.years[5:]
+
+            # Folds whose data, predictors and model settings haven't changed are loaded rather than retrained
+            predictions = {}
+            if self.cache is not None:
+                with Profiling.span("cache lookup", "backtest"):
+                    for year in test_years:
+                        cached = self.cache.load_predictions(self.fold_key(year))
+                        if cached is not None:
+                            predictions[year] = cached
+                print(f"{len(predictions)} of {len(test_years)} seasons loaded from the model cache")
+
+            missing = [year for year in test_years if year not in predictions]
+            if missing:
+                workers, n_jobs = core_split(self.model, len(missing), workers)
+                if isinstance(self.model, IncrementalRidge):
+                    trained = self.expanding_train(missing)
+                elif workers <= 1:
+                    trained = [self.train_fold(year) for year in missing]
+                else:
+                    trained = self.parallel_train(missing, workers, n_jobs)
+                predictions.update(zip(missing, trained))
 
-        # We start at the 5th earliest year, so we can have at least 5 years' of data for training
-        for year in self.years[5:]:
+            # Every season is ranked and scored together, in one pass
+            with Profiling.span("score", "backtest"):
+                predictions_df, self.metrics = self.predictions_frame(test_years, [predictions[year] for year in test_years])
+            aps = self.metrics["AP"].tolist()
+            return sum(aps) / len (aps), aps, predictions_df
 
-            # A dataframe for all the predictions made for that year
-            predictions_df = self.train(year)
-            all_predictions.append(predictions_df)
-            aps.append(self.error_met(predictions_df))
-        return sum(aps) / len (aps), aps, pd.concat(all_predictions)
+    def parallel_train(self, test_years, workers, n_jobs):
+        """
+        Trains a model for each test year in a pool of worker processes
+        :param test_years: list,
+            the years (int) being tested on
+        :param workers: int,
+            the number of worker processes
+        :param n_jobs: int,
+            the number of cores each worker's model may use, or None if the model can't use more than one
+        :return: list,
+            the predictions (numpy array) for each test year, in year order
+        """
+        model = clone(self.model)
+        if n_jobs is not None:
+            model.set_params(n_jobs=n_jobs)
+
+        # The arrays are saved once and memory-mapped by every worker, rather than pickling the dataframe to each one
+        with tempfile.TemporaryDirectory() as directory:
+            np.save(f"{directory}/features.npy", self.features)
+            np.save(f"{directory}/share.npy", self.share)
+            with ProcessPoolExecutor(max_workers=workers, initializer=open_shared,
+                                     initargs=(directory, self.offsets, self.order)) as executor:
+                # Futures are collected in submission order, so the output doesn't depend on
+                # which worker finishes first
+                # Fitted models are only sent back when they're going to be cached
+                return_model = self.cache is not None
+                futures = [executor.submit(shared_fold, model, year, return_model) for year in test_years]
+                all_predictions = []
+                for year, future in zip(test_years, futures):
+                    predictions, fitted, timing = future.result()
+                    Profiling.record("fold", "backtest", timing, year=year)
+                    self.cache_fold(year, predictions, fitted)
+                    all_predictions.append(predictions)
+                return all_predictions
 
+    def expanding_train(self, test_years):
+        """
+        Trains an IncrementalRidge model for each test year, by adding the seasons since the
+        previous test year to it rather than refitting on every season before the test year
+        :param test_years: list,
+            the years (int) being tested on, in order
+        :return: list,
+            the predictions (numpy array) for each test year, in year order
+        """
+        self.model.reset()
+        all_predictions = []
+        seen = 0
+        for year in test_years:
+            with Profiling.span("fold", "backtest", year=year):
+                start, stop = self.offsets[year]
+                self.model.extend(self.features[seen:start], self.share[seen:start])
+                seen = start
+                all_predictions.append(self.model.predict(self.features[start:stop]))
+            self.cache_fold(year, all_predictions[-1])
+        return all_predictions
+
+    def season_ranking(self, year, top=5):
+        """
+        :param year: int,
+            The year of data being predicted
+        :param top: int,
+            the number of players to list
+        :return: Dataframe,
+            the players the model (trained on every season before that year) predicts highest, best first
+        """
+        with Profiling.span("season ranking", "predict", year=year):
+            start, stop = self.offsets[year]
+            predictions = self.fitted_model(year).predict(self.features[start:stop])
+        ranking = self.df.iloc[start:stop][["Player", "Share"]].assign(Predictions=predictions)
+        ranking["Predicted Rk"] = Metrics.season_ranks(np.zeros(stop - start, dtype="int64"), predictions)
+        return ranking.sort_values("Predicted Rk").head(top).set_index("Predicted Rk")
 
     def predictors(self):
         """
@@ -73,21 +246,91 @@ class Model:
         :return: Dataframe,
             A dataframe containing the predictions, actual rank, predicted rank and difference between them
         """
+        return self.predictions_frame([year], [self.train_fold(year)])[0]
 
-        # Creates the training and test dataframe to use
-        train_df = self.df[self.df["year"] < year]
-        test_df = self.df[self.df["year"] == year]
+    def train_fold(self, year):
+        """
+        :param year: int,
+            The current year of data we're testing on
+        :return: numpy array,
+            the predictions for that year's rows
+        """
+        with Profiling.span("fold", "backtest", year=year):
+            predictions = fit_fold(self.model, year, self.features, self.share, self.offsets, self.order)
+        self.cache_fold(year, predictions)
+        return predictions
 
-        # Trains model being used, using the predictors from the training dataset, to predict the "Share" column
-        self.model.fit(train_df[self.predictors], train_df["Share"])
+    def fold_key(self, year):
+        """
+        :param year: int,
+            The year of data being tested on
+        :return: str,
+            the cache key of the model trained on every season before that year, and tested on it
+        """
+        # Each season is hashed once, and a fold's key only covers the seasons up to its test year,
+        # so adding a new season doesn't invalidate the folds before it
+        if self.season_hashes is None:
+            self.season_hashes = {season: season_hash(self.features[start:stop], self.share[start:stop])
+                                  for season, (start, stop) in self.offsets.items()}
+        first_year = min(self.offsets)
+        hashes = [self.season_hashes[season] for season in sorted(self.offsets) if season <= year]
+        return fold_key(self.model, self.predictors, first_year, year, hashes)
 
-        # Use our regression model to make predictions for the "Share" column using test data
-        predictions = self.model.predict(test_df[self.predictors])
-        predictions_df = pd.DataFrame(predictions, columns=["Predictions"], index=test_df.index)
+    def cache_fold(self, year, predictions, model=None):
+        """
+        Saves a fold's predictions and fitted model, if the Model has a cache
+        :param year: int,
+            The year of data tested on
+        :param predictions: numpy array,
+            the predictions for that year's rows
+        :param model: sklearn estimator,
+            the fitted model, if it isn't self.model
+        """
+        if self.cache is not None:
+            self.cache.store(self.fold_key(year), predictions, self.model if model is None else model)
+
+    def fitted_model(self, year):
+        """
+        :param year: int,
+            The year of data being predicted
+        :return: sklearn estimator,
+            the model trained on every season before that year, from the cache when it's there
+        """
+        if self.cache is not None:
+            model = self.cache.load_model(self.fold_key(year))
+            if model is not None:
+                return model
+        model = clone(self.model)
+        start, _ = self.offsets[year]
+        fit_rows(model, self.features, self.share, self.offsets, start, self.order)
+        if self.cache is not None:
+            self.cache.store(self.fold_key(year), model.predict(self.features[slice(*self.offsets[year])]), model)
+        return model
+
+    def predictions_frame(self, test_years, predictions):
+        """
+        :param test_years: list,
+            The years (int) of data the predictions are for
+        :param predictions: list,
+            the predicted "Share" (numpy array) of each year's rows, in dataframe order
+        :return: tuple,
+            A dataframe containing the predictions, actual rank, predicted rank and difference between them,
+            with each year's rows ordered by prediction, and a dataframe of each year's ranking metrics
+        """
+        rows = np.concatenate([np.arange(*self.offsets[year]) for year in test_years])
+        test_df = self.df.iloc[rows]
+        years = test_df["year"].to_numpy()
+        share = self.share[rows]
+        predictions = np.concatenate(predictions)
 
-        # concatenates the test "Player" and "Share" columns from the test dataframe, with the predictions dataframe
-        Sh_predictions = pd.concat([test_df[["Player", "Share"]], predictions_df], axis=1)
-        return self.rk_add(Sh_predictions)
+        # The test "Player" and "Share" columns, with the predictions, ranks and the difference between them
+        Sh_predictions = test_df[["Player", "Share"]].assign(Predictions=predictions)
+        Sh_predictions["Rk"] = Metrics.season_ranks(years, share)
+        Sh_predictions["Predicted Rk"] = Metrics.season_ranks(years, predictions)
+        Sh_predictions["Difference"] = Sh_predictions["Rk"] - Sh_predictions["Predicted Rk"]
+
+        metrics = Metrics.season_metrics(years, test_df["Player"].to_numpy(), share, predictions)
+        return Sh_predictions.iloc[Metrics.season_order(years, predictions)], metrics
 
 
     @staticmethod
@@ -99,18 +342,18 @@ class Model:
         :return: dataframe,
             The modified dataframe
         """
-        df = df.sort_values("Share", ascending=False)
+        season = np.zeros(df.shape[0], dtype="int64")
+        df = df.copy()
 
         # Adds a rank column, for the actual MVP rankings in that year
-        df["Rk"] = list(range(1, df.shape[0]+1))
-        df = df.sort_values("Predictions", ascending=False)
+        df["Rk"] = Metrics.season_ranks(season, df["Share"].to_numpy(dtype="float64"))
 
         # Adds a column for the models ranking predictions
-        df["Predicted Rk"] = list(range(1, df.shape[0]+1))
+        df["Predicted Rk"] = Metrics.season_ranks(season, df["Predictions"].to_numpy(dtype="float64"))
 
         # Gets the difference between the actual ranking and the predicted ranking
         df["Difference"] = df["Rk"] - df["Predicted Rk"]
-        return df
+        return df.sort_values("Predicted Rk")
 
     @staticmethod
     def error_met(df):
@@ -122,22 +365,106 @@ class Model:
             the mean error metric
         """
 
-        # A dataframe of the players that ranked top 5 in the final MVP voting results
-        actual = df.sort_values("Share", ascending=False).head(5)
+        # Scores how close the model's ranking came to putting the players that ranked top 5 in the
+        # final MVP voting results first
+        season = np.zeros(df.shape[0], dtype="int64")
+        return Metrics.average_precisions(season, df["Player"].to_numpy(), df["Share"].to_numpy(dtype="float64"),
+                                          df["Predictions"].to_numpy(dtype="float64")).iloc[0]
+
+def core_split(model, folds, workers=None):
+    """
+    Splits the machine's cores between training seasons at once and each model's own parallelism.
+    Seasons come first, as they're independent and scale almost perfectly; any cores left over
+    go to models that take an n_jobs parameter (e.g. RandomForestRegressor)
+    :param model: sklearn estimator,
+        the model being backtested
+    :param folds: int,
+        the number of seasons being tested on
+    :param workers: int,
+        the number of worker processes wanted, or None for one per core
+    :return: tuple,
+        the number of worker processes (int), and the n_jobs (int) for each model, or None if it has no n_jobs
+    """
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, folds))
+    n_jobs = max(1, cores // workers) if "n_jobs" in model.get_params() else None
+    return workers, n_jobs
+
+def fit_fold(model, year, features, share, offsets, order=None):
+    """
+    Trains a model on every season before a year, and predicts that year's "Share" column
+    :param model: sklearn estimator,
+        the model being trained
+    :param year: int,
+        The year of data being tested on
+    :param features: numpy array,
+        the predictor matrix, with rows sorted by year
+    :param share: numpy array,
+        the "Share" column, sorted the same way
+    :param offsets: dict,
+        the row range (list) of each season (int)
+    :param order: numpy array,
+        the position (int) of each row before sorting by year, or None if it was already sorted
+    :return: numpy array,
+        the predictions for that year's rows
+    """
+    start, stop = offsets[year]
+    fit_rows(model, features, share, offsets, start, order)
+    return model.predict(features[start:stop])
+
+def fit_rows(model, features, share, offsets, stop, order=None):
+    """
+    Trains a model on the rows before a season. Models that rank within seasons are also given the
+    number of rows in each season, which are consecutive as the rows are sorted by year.
+    Other models are given the rows in their order before sorting, as models that sample rows
+    (e.g. RandomForestRegressor's bootstrap) would otherwise train on different rows than before
+    :param model: sklearn estimator,
+        the model being trained
+    :param features: numpy array,
+        the predictor matrix, with rows sorted by year
+    :param share: numpy array,
+        the "Share" column, sorted the same way
+    :param offsets: dict,
+        the row range (list) of each season (int)
+    :param stop: int,
+        the first row not trained on
+    :param order: numpy array,
+        the position (int) of each row before sorting by year, or None if it was already sorted
+    :return: sklearn estimator,
+        the fitted model
+    """
+    # Both slices are views, not copies
+    if isinstance(model, LambdaRanker):
+        group = [end - begin for begin, end in sorted(offsets.values()) if end <= stop]
+        return model.fit(features[:stop], share[:stop], group=group)
+    if order is None:
+        return model.fit(features[:stop], share[:stop])
 
-        # A dataframe sorted by players our model predicted highest in the MVP voting results
-        predicted = df.sort_values("Predictions", ascending=False)
-        ps = []
-        found = 0
-        seen = 1
+    # The rows before the season are the same either way, only their order is restored
+    rows = np.argsort(order[:stop])
+    return model.fit(features[rows], share[rows])
 
-        # index references the rows index (int) and row is the row itself (pd.Series)
-        for index, row in predicted.iterrows():
+def open_shared(directory, offsets, order=None):
+    """
+    Memory-maps the arrays saved by Model.parallel_train, once per worker process
+    :param directory: str,
+        directory the arrays were saved to
+    :param offsets: dict,
+        the row range (list) of each season (int)
+    :param order: numpy array,
+        the position (int) of each row before sorting by year, or None if it was already sorted
+    """
+    for name in ("features", "share"):
+        SHARED[name] = np.load(f"{directory}/{name}.npy", mmap_mode="r")
+    SHARED["offsets"] = offsets
+    SHARED["order"] = order
 
-            # if the value in a rows "player" column is in the actual top 5 rankings
-            # Add a score to the ps list describing how close the models prediction was
-            if row["Player"] in actual["Player"].values:
-                found+=1
-                ps.append(found/seen)
-            seen +=1
-        return sum(ps) / len(ps)
\ No newline at end of file
+def shared_fold(model, year, return_model=False):
+    """
+    :return: tuple,
+        the predictions for the year (numpy array), the fitted model if return_model, else None,
+        and how long the fold took (see Profiling.elapsed)
+    """
+    started = Profiling.timer()
+    predictions = fit_fold(model, year, SHARED["features"], SHARED["share"], SHARED["offsets"], SHARED["order"])
+    return predictions, model if return_model else None, Profiling.elapsed(started)
@@ -0,0 +1,106 @@
+import hashlib, json, os, threading, pandas as pd
+
+class Manifest:
+    """
+    Records the content hashes of every build step's inputs and output, so a step is only
+    re-run when something it depends on has actually changed
+
+    Each step is stored under a key, e.g. "Per-game/2024", as:
+        {"inputs": {name: hash, ...}, "output": hash of the file the step wrote}
+
+    A step is fresh when its inputs hash the same as last time, AND its output file still
+    hashes to what was recorded - so outputs that were edited, truncated or deleted are rebuilt
+
+    Steps are recorded from several threads at once (e.g. DataCleaner's per-game and team stages), so
+    every access to the steps holds a lock
+    """
+    def __init__(self, path="../csvFiles/manifest.json"):
+        """
+        :param path: str,
+            file the manifest is saved to
+        """
+        self.path = path
+        self.lock = threading.RLock()
+        self.steps = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.steps = json.load(f)
+
+    def fresh(self, key, inputs, output_path):
+        """
+        :param key: str,
+            name of the build step
+        :param inputs: dict,
+            the current hash (str) of each of the step's inputs
+        :param output_path: str,
+            file the step writes
+        :return: boolean,
+            whether the step's output is still valid
+        """
+        with self.lock:
+            step = self.steps.get(key)
+        return (step is not None and step["inputs"] == inputs and os.path.exists(output_path)
+                and file_hash(output_path) == step["output"])
+
+    def record(self, key, inputs, output_path):
+        """
+        Records a step that has just been (re)built
+        :param key: str,
+            name of the build step
+        :param inputs: dict,
+            the hash (str) of each input the step was built from
+        :param output_path: str,
+            file the step wrote
+        """
+        output = file_hash(output_path)
+        with self.lock:
+            self.steps[key] = {"inputs": inputs, "output": output}
+
+    def output(self, key):
+        """
+        :param key: str,
+            name of the build step
+        :return: str,
+            hash of the step's output, used as an input hash by the steps that depend on it
+        """
+        with self.lock:
+            return self.steps[key]["output"]
+
+    def prune(self, keys):
+        """
+        Forgets steps that are no longer part of the build, e.g. seasons removed from the sources
+        :param keys: set,
+            the keys (str) still in use
+        """
+        with self.lock:
+            self.steps = {key: step for key, step in self.steps.items() if key in keys}
+
+    def save(self):
+        with self.lock, open(self.path, "w") as f:
+            json.dump(self.steps, f, indent=1, sort_keys=True)
+
+def file_hash(path):
+    """
+    :param path: str,
+        path of file
+    :return: str,
+        SHA-256 of the file's contents, or None if it doesn't exist
+    """
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def frame_hash(df):
+    """
+    :param df: dataframe,
+        the dataframe being hashed, e.g. one season's rows of a source .csv
+    :return: str,
+        SHA-256 of the dataframe's column names and values (its index is ignored)
+    """
+    digest = hashlib.sha256("\x1f".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,128 @@
+import numpy as np, pandas as pd
+
+# Ranking metrics for MVP predictions, computed for every season at once.
+#
+# Every function takes plain arrays with one element per player season: the "year" each row belongs
+# to, and the values being ranked (e.g. the actual "Share" or the predictions). Rows are ranked
+# high to low within their season, and rows with equal values keep the order they were given in
+
+def season_order(years, values):
+    """
+    :param years: numpy array,
+        the season of each row
+    :param values: numpy array,
+        the values being ranked
+    :return: numpy array,
+        the row order that sorts by season, then by value from highest to lowest
+    """
+    return np.lexsort((-values, years))
+
+def season_positions(sorted_years):
+    """
+    :param sorted_years: numpy array,
+        the season of each row, sorted
+    :return: tuple,
+        each row's position (int) within its season, counting from 0,
+        and each row's season number (int), counting from 0
+    """
+    new_season = np.r_[True, sorted_years[1:] != sorted_years[:-1]]
+    season = np.cumsum(new_season) - 1
+    starts = np.flatnonzero(new_season)
+    return np.arange(len(sorted_years)) - starts[season], season
+
+def season_ranks(years, values):
+    """
+    :param years: numpy array,
+        the season of each row
+    :param values: numpy array,
+        the values being ranked
+    :return: numpy array,
+        each row's rank within its season (1 = highest value)
+    """
+    order = season_order(years, values)
+    positions, _ = season_positions(years[order])
+    ranks = np.empty(len(order), dtype="int64")
+    ranks[order] = positions + 1
+    return ranks
+
+def average_precisions(years, players, share, predictions, top=5):
+    """
+    The average precision of each season's predicted order, at finding the players
+    who finished in that season's top few of the MVP voting
+    :param years: numpy array,
+        the season of each row
+    :param players: numpy array,
+        the player (str) of each row
+    :param share: numpy array,
+        the actual MVP vote share of each row
+    :param predictions: numpy array,
+        the predicted MVP vote share of each row
+    :param top: int,
+        how far down the actual voting counts as a hit
+    :return: series,
+        the average precision (float) of each season (int)
+    """
+    # A row is a hit when its player is one of the season's top players in the actual voting
+    actual_top = season_ranks(years, share) <= top
+    top_players = pd.MultiIndex.from_arrays([years[actual_top], players[actual_top]])
+    hits = pd.MultiIndex.from_arrays([years, players]).isin(top_players)
+
+    # Walks each season in predicted order: the precision at a hit is the hits found so far over the rows seen so far
+    order = season_order(years, predictions)
+    sorted_years, sorted_hits = years[order], hits[order]
+    positions, season = season_positions(sorted_years)
+    found = np.cumsum(sorted_hits)
+    found -= (found - sorted_hits)[positions == 0][season]
+    precision = np.where(sorted_hits, found / (positions + 1), 0.0)
+
+    aps = np.bincount(season, weights=precision) / np.bincount(season, weights=sorted_hits)
+    return pd.Series(aps, index=sorted_years[positions == 0], name="AP")
+
+def season_metrics(years, players, share, predictions, top=5, k=5):
+    """
+    Ranking metrics for each season's predictions
+    - AP: average precision at finding the actual top players (see average_precisions)
+    - Top-1: whether the player predicted highest actually won (1) or not (0)
+    - NDCG@k: discounted gain of the vote share in the predicted top k, over the best possible
+    - Spearman: rank correlation between the actual and predicted vote shares
+    :param years: numpy array,
+        the season of each row
+    :param players: numpy array,
+        the player (str) of each row
+    :param share: numpy array,
+        the actual MVP vote share of each row
+    :param predictions: numpy array,
+        the predicted MVP vote share of each row
+    :param top: int,
+        how far down the actual voting counts as a hit, for AP
+    :param k: int,
+        how many of the predicted top players count, for NDCG
+    :return: dataframe,
+        a row of metrics for each season (int)
+    """
+    metrics = average_precisions(years, players, share, predictions, top).to_frame()
+
+    predicted_order = season_order(years, predictions)
+    positions, season = season_positions(years[predicted_order])
+    first = positions == 0
+    metrics["Top-1"] = (share[predicted_order][first] == pd.Series(share).groupby(years).max().to_numpy()).astype("int64")
+
+    # The discounted gain of the predicted top k, and of the actual top k (the best possible)
+    discount = np.where(positions < k, 1 / np.log2(positions + 2), 0.0)
+    dcg = np.bincount(season, weights=share[predicted_order] * discount)
+    actual_order = season_order(years, share)
+    ideal_positions, ideal_season = season_positions(years[actual_order])
+    ideal_discount = np.where(ideal_positions < k, 1 / np.log2(ideal_positions + 2), 0.0)
+    ideal = np.bincount(ideal_season, weights=share[actual_order] * ideal_discount)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        metrics[f"NDCG@{k}"] = dcg / ideal
+
+    # Pearson correlation of the tie-averaged ranks, within each season
+    ranks = pd.DataFrame({"share": share, "predictions": predictions}).groupby(years).rank()
+    centered = ranks - ranks.groupby(years).transform("mean")
+    sums = pd.DataFrame({"cov": centered["share"] * centered["predictions"], "share": centered["share"] ** 2,
+                         "predictions": centered["predictions"] ** 2}).groupby(years).sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        metrics["Spearman"] = (sums["cov"] / np.sqrt(sums["share"] * sums["predictions"])).to_numpy()
+    metrics.index.name = "year"
+    return metrics
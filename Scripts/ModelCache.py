@@ -0,0 +1,157 @@
+import hashlib, json, os, pickle, numpy as np
+
+CACHE_DIR = "../csvFiles/model-cache"
+
+# Parameters that change how a model is trained, but not the model it ends up with
+IGNORED_PARAMS = {"n_jobs", "verbose"}
+
+class ModelCache:
+    """
+    An on-disk cache of each backtest fold's fitted model and predictions
+
+    A fold is stored under a key made from everything its result depends on (see fold_key), so a
+    backtest only retrains folds whose data, predictors or model settings have changed.
+    Each fold is saved as "{key}.npy" (its predictions) and "{key}.pkl" (its fitted model).
+
+    The cache is capped at max_bytes. Reading a fold marks it as recently used, and the least
+    recently used folds are deleted whenever a new one takes the cache over its cap
+    """
+    def __init__(self, directory=CACHE_DIR, max_bytes=500 * 2**20):
+        """
+        :param directory: str,
+            directory the cache is kept in
+        :param max_bytes: int,
+            the most disk space the cache may use
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key, extension):
+        return f"{self.directory}/{key}.{extension}"
+
+    def load_predictions(self, key):
+        """
+        :param key: str,
+            the fold's key
+        :return: numpy array,
+            the fold's predictions, or None if they aren't cached
+        """
+        try:
+            predictions = np.load(self.path(key, "npy"))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.touch(key)
+        self.hits += 1
+        return predictions
+
+    def load_model(self, key):
+        """
+        :param key: str,
+            the fold's key
+        :return: sklearn estimator,
+            the fold's fitted model, or None if it isn't cached
+        """
+        try:
+            with open(self.path(key, "pkl"), "rb") as f:
+                model = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        self.touch(key)
+        return model
+
+    def store(self, key, predictions, model=None):
+        """
+        Saves a fold, then evicts the least recently used folds if the cache is over its cap
+        :param key: str,
+            the fold's key
+        :param predictions: numpy array,
+            the fold's predictions
+        :param model: sklearn estimator,
+            the fold's fitted model
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Written under a temporary name first, so an interrupted run can't leave a truncated file behind
+        if model is not None:
+            with open(self.path(key, "pkl.tmp"), "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(self.path(key, "pkl.tmp"), self.path(key, "pkl"))
+        with open(self.path(key, "npy.tmp"), "wb") as f:
+            np.save(f, predictions)
+        os.replace(self.path(key, "npy.tmp"), self.path(key, "npy"))
+        self.evict()
+
+    def touch(self, key):
+        """
+        Marks a fold as recently used
+        """
+        for extension in ("npy", "pkl"):
+            if os.path.exists(self.path(key, extension)):
+                os.utime(self.path(key, extension))
+
+    def evict(self):
+        """
+        Deletes the least recently used folds until the cache fits in max_bytes
+        """
+        folds = {}
+        for file in os.listdir(self.directory):
+            key, extension = file.split(".", 1)
+            if extension not in ("npy", "pkl"):
+                continue
+            stat = os.stat(f"{self.directory}/{file}")
+            last_used, size = folds.get(key, (0, 0))
+            folds[key] = (max(last_used, stat.st_mtime), size + stat.st_size)
+
+        total = sum(size for _, size in folds.values())
+        for key, (_, size) in sorted(folds.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            for extension in ("npy", "pkl"):
+                if os.path.exists(self.path(key, extension)):
+                    os.remove(self.path(key, extension))
+            total -= size
+
+    def clear(self):
+        """
+        Deletes every cached fold
+        """
+        if os.path.isdir(self.directory):
+            for file in os.listdir(self.directory):
+                os.remove(f"{self.directory}/{file}")
+
+def season_hash(features, share):
+    """
+    :param features: numpy array,
+        a season's rows of the predictor matrix
+    :param share: numpy array,
+        the season's "Share" column
+    :return: str,
+        SHA-256 of the season's data
+    """
+    digest = hashlib.sha256(np.ascontiguousarray(features).tobytes())
+    digest.update(np.ascontiguousarray(share).tobytes())
+    return digest.hexdigest()
+
+def fold_key(model, predictors, first_year, year, season_hashes):
+    """
+    :param model: sklearn estimator,
+        the model being trained
+    :param predictors: list,
+        the predictor columns (str) it's trained on
+    :param first_year: int,
+        the first season it's trained on
+    :param year: int,
+        the season being tested on (it's trained on every season from first_year up to it)
+    :param season_hashes: list,
+        the hash (str) of each season from first_year to year, so a fold is only invalidated
+        by changes to the seasons it actually uses
+    :return: str,
+        the fold's key
+    """
+    params = {name: repr(value) for name, value in model.get_params().items() if name not in IGNORED_PARAMS}
+    fold = {"model": f"{type(model).__module__}.{type(model).__name__}", "params": params,
+            "predictors": list(predictors), "years": [first_year, year], "data": season_hashes}
+    return hashlib.sha256(json.dumps(fold, sort_keys=True).encode()).hexdigest()
@@ -0,0 +1,93 @@
+import Profiling
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+class Pipeline:
+    """
+    Runs the stages of a run (e.g. scrape -> clean -> features -> backtest) as a graph, where each stage
+    waits only for the stages it depends on
+
+    - Each stage's output (e.g. a dataframe) is handed to the stages that depend on it in memory, so a stage
+      never re-reads what the stage before it already had. Stages still save their outputs where they're
+      checkpoints (e.g. the cleaned .csv files), but nothing is read back within a run
+    - Stages whose dependencies have all finished run at the same time, in a pool of threads
+    - A stage can say its output is still valid (e.g. every season has already been scraped), in which
+      case it's skipped, and its output loaded instead if it has a loader
+
+    Stages must be added after the stages they depend on, so the graph can't have a cycle
+
+    Usage:
+        pipeline = Pipeline()
+        pipeline.add("data", load_data)
+        pipeline.add("model", train, after=["data"])
+        outputs = pipeline.run()
+    """
+    def __init__(self, workers=2):
+        """
+        :param workers: int,
+            the most stages run at once
+        """
+        self.workers = workers
+        self.stages = {}
+
+    def add(self, name, run, after=(), inputs=None, fresh=None, load=None):
+        """
+        :param name: str,
+            name of the stage, e.g. "backtest"
+        :param run: function,
+            runs the stage, taking the outputs of its inputs (in order) and returning its own output
+        :param after: list,
+            the stages (str) that must finish before this one starts
+        :param inputs: list,
+            the stages (str) whose outputs are passed to run, defaults to every stage in after
+        :param fresh: function,
+            takes the same inputs as run, and returns whether the stage's saved output is still valid
+        :param load: function,
+            takes the same inputs as run, and returns the stage's saved output, used when it's skipped
+        """
+        inputs = list(after) if inputs is None else list(inputs)
+        unknown = [stage for stage in list(after) + inputs if stage not in self.stages]
+        if unknown:
+            raise ValueError(f"Stage '{name}' depends on stages that haven't been added: {', '.join(unknown)}")
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' has already been added")
+        self.stages[name] = {"run": run, "after": list(dict.fromkeys(list(after) + inputs)), "inputs": inputs,
+                             "fresh": fresh, "load": load}
+
+    def run(self):
+        """
+        Runs every stage, each as soon as the stages it depends on have finished. If a stage fails,
+        no more stages are started, and its error is raised once the running ones have finished
+        :return: dict,
+            the output of each stage (str)
+        """
+        outputs = {}
+        pending = dict(self.stages) # Stages are added in an order they can run in, so ties start in that order
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = {}
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dependency in outputs for dependency in stage["after"]):
+                        del pending[name]
+                        running[executor.submit(self.run_stage, name, stage, outputs)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        pending.clear()
+                        wait(running)
+                        raise future.exception()
+                    outputs[name] = future.result()
+        return outputs
+
+    @staticmethod
+    def run_stage(name, stage, outputs):
+        """
+        :return:
+            the stage's output, either from running it or, when it's still valid, loading it
+        """
+        inputs = [outputs[dependency] for dependency in stage["inputs"]]
+        if stage["fresh"] is not None and stage["fresh"](*inputs):
+            print(f"\n{name} is up to date, skipping it")
+            return stage["load"](*inputs) if stage["load"] is not None else None
+        with Profiling.span(name, "pipeline"):
+            return stage["run"](*inputs)
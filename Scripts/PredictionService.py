@@ -0,0 +1,393 @@
+import argparse, json, queue, threading, time, numpy as np, ML, Estimators, Utils
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from ModelCache import ModelCache
+from LambdaRanker import LambdaRanker
+
+# Stats whose "{stat}_R" column is the stat over the season's mean (see DataCleaner.add_ratios)
+RATIO_STATS = ["PTS", "AST", "STL", "BLK", "3P"]
+
+class RequestError(Exception):
+    """
+    A request that can't be answered, and the HTTP status to answer it with
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Batcher:
+    """
+    Collects the rows concurrent requests want predicted, and predicts them together
+
+    The first request to arrive opens a batch, which stays open for window seconds (or until it holds
+    max_rows rows). Every request queued meanwhile joins it, and each season's rows in the batch are
+    predicted with a single vectorized call to that season's model
+    """
+    def __init__(self, predict, window=0.002, max_rows=4096):
+        """
+        :param predict: function,
+            takes a season (int) and a feature matrix, and returns the predictions for its rows
+        :param window: float,
+            how long a batch waits for more requests, in seconds
+        :param max_rows: int,
+            the most rows a batch holds
+        """
+        self.predict = predict
+        self.window = window
+        self.max_rows = max_rows
+        self.queue = queue.Queue()
+        self.batch_sizes = deque(maxlen=100000) # Number of requests in each batch
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, season, rows):
+        """
+        Waits for rows to be predicted as part of a batch
+        :param season: int,
+            the season whose model predicts the rows
+        :param rows: numpy array,
+            the feature matrix of the rows
+        :return: numpy array,
+            the predictions for the rows
+        """
+        job = {"season": season, "rows": rows, "done": threading.Event()}
+        self.queue.put(job)
+        job["done"].wait()
+        if "error" in job:
+            raise job["error"]
+        return job["predictions"]
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            job = self.queue.get()
+            if job is None:
+                return
+            jobs, rows = [job], len(job["rows"])
+            deadline = time.monotonic() + self.window
+            while rows < self.max_rows:
+                try:
+                    job = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                jobs.append(job)
+                rows += len(job["rows"])
+            self.run_batch(jobs)
+
+    def run_batch(self, jobs):
+        """
+        Predicts every job in a batch, with one call per season
+        :param jobs: list,
+            the jobs (dict) in the batch
+        """
+        by_season = {}
+        for job in jobs:
+            by_season.setdefault(job["season"], []).append(job)
+        for season, season_jobs in by_season.items():
+            try:
+                predictions = self.predict(season, np.vstack([job["rows"] for job in season_jobs]))
+                splits = np.cumsum([len(job["rows"]) for job in season_jobs])[:-1]
+                for job, job_predictions in zip(season_jobs, np.split(predictions, splits)):
+                    job["predictions"] = job_predictions
+            except Exception as e:
+                for job in season_jobs:
+                    job["error"] = e
+            for job in season_jobs:
+                job["done"].set()
+        self.batch_sizes.append(len(jobs))
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+
+class PredictionService:
+    """
+    A local HTTP service answering "who wins MVP in season X", with the data and models loaded once
+
+    Each season is predicted by the model trained on every season before it (the same model the
+    backtest scores for that season), so loading goes through the model cache when there is one.
+
+    Endpoints (JSON responses):
+        GET  /predict?season=2024&season=2023&top=5   ranked predictions for each season
+        POST /what-if   {"season": 2024, "player": "...", "stats": {"PTS": 35.0}}, or a list of them:
+                        the player's predicted share and rank with their stat line edited
+
+    Rankers (e.g. LambdaRanker) predict scores that only mean something as a ranking, not a share of
+    the vote, so their predictions are answered as "predicted_score" rather than "predicted_share"
+        GET  /stats     request counts, p50/p99 latency and batch sizes
+        GET  /health
+
+    Usage:
+        with PredictionService(1996, 2024, Ridge(alpha=1.0)) as service:
+            requests.get(f"{service.url}/predict?season=2024")
+    """
+    def __init__(self, start_yr, end_yr, model, port=0, cache=None, window=0.002, df=None):
+        """
+        :param start_yr: int,
+            the first season of data used
+        :param end_yr: int,
+            the last season of data used
+        :param model: sklearn estimator,
+            the model to train for each season
+        :param port: int,
+            port to listen on (0 picks a free port)
+        :param cache: ModelCache,
+            where fitted models are loaded from and saved to, or None to always train them
+        :param window: float,
+            how long a batch of predictions waits for more requests, in seconds
+        :param df: dataframe,
+            the data to use instead of the cleaned dataset
+        """
+        self.data = ML.Model(start_yr, end_yr, model, df=df, cache=cache)
+        self.players = self.data.df["Player"].to_numpy()
+        self.share = self.data.share
+        self.output = "score" if isinstance(model, LambdaRanker) else "share" # What the predictions are
+
+        # We start at the 5th earliest year, so each model has at least 5 years' of data to be trained on
+        self.seasons = [year for year in self.data.years[5:] if year in self.data.offsets]
+        self.models = {season: self.data.fitted_model(season) for season in self.seasons}
+        self.season_predictions = {}
+
+        self.batcher = Batcher(self.predict_rows, window)
+        self.latencies = {"predict": deque(maxlen=100000), "what-if": deque(maxlen=100000)}
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def predict_rows(self, season, rows):
+        return self.models[season].predict(rows)
+
+    def season_rows(self, season):
+        """
+        :param season: int,
+            the season requested
+        :return: tuple,
+            the season's first and last row (int, exclusive)
+        """
+        if season not in self.models:
+            raise RequestError(404, f"No model for season {season}, pick from {self.seasons[0]} to {self.seasons[-1]}")
+        return self.data.offsets[season]
+
+    def predictions(self, season):
+        """
+        :param season: int,
+            the season requested
+        :return: numpy array,
+            the predicted share of each of the season's rows, predicted once and then kept
+        """
+        if season not in self.season_predictions:
+            start, stop = self.season_rows(season)
+            self.season_predictions[season] = self.batcher.submit(season, self.data.features[start:stop])
+        return self.season_predictions[season]
+
+    def rankings(self, seasons, top=5):
+        """
+        :param seasons: list,
+            the seasons (int) requested
+        :param top: int,
+            the number of players to list for each season
+        :return: dict,
+            the predicted top players (list) of each season (str), with their predicted share (or score)
+        """
+        response = {}
+        for season in seasons:
+            start, _ = self.season_rows(season)
+            predictions = self.predictions(season)
+            order = np.argsort(-predictions, kind="stable")[:top]
+            response[str(season)] = [{"rank": rank, "player": self.players[start + row],
+                                      f"predicted_{self.output}": float(predictions[row]),
+                                      "share": float(self.share[start + row])}
+                                     for rank, row in enumerate(order, start=1)]
+        return response
+
+    def what_if(self, queries):
+        """
+        :param queries: list,
+            the queries (dict), each with a "season", a "player" and the "stats" (dict) to change
+        :return: list,
+            each player's predicted share (or score) and rank, before and after their stats are changed
+        """
+        edited = {}
+        for query in queries:
+            if not isinstance(query, dict) or not isinstance(query.get("stats", {}), dict):
+                raise RequestError(400, 'Each query must be an object with a "season", a "player" and "stats" (object)')
+            try:
+                season, player, stats = int(query["season"]), query["player"], query.get("stats", {})
+            except (KeyError, TypeError, ValueError):
+                raise RequestError(400, 'Each query needs a "season" (int), a "player" and "stats"')
+            start, stop = self.season_rows(season)
+            matches = np.flatnonzero(self.players[start:stop] == player)
+            if not len(matches):
+                raise RequestError(404, f"No player called {player} in {season}")
+            row = start + matches[0]
+
+            features = self.data.features[row].copy()
+            for column, value in stats.items():
+                if column not in self.data.predictors:
+                    raise RequestError(400, f"{column} isn't one of the model's predictors")
+                try:
+                    features[self.data.predictors.index(column)] = float(value)
+                except (TypeError, ValueError):
+                    raise RequestError(400, f"The new {column} must be a number")
+
+            # A changed stat changes its ratio to the season's mean too, unless the ratio was given as well
+            for stat in RATIO_STATS:
+                if stat in stats and f"{stat}_R" not in stats and f"{stat}_R" in self.data.predictors:
+                    season_mean = self.data.df[stat].to_numpy()[start:stop].mean()
+                    features[self.data.predictors.index(f"{stat}_R")] = float(stats[stat]) / season_mean
+            edited.setdefault(season, []).append((query, row, features))
+
+        # Every query for a season is predicted in one call, alongside whatever else is in the batch
+        answers = {}
+        for season, season_queries in edited.items():
+            start, _ = self.season_rows(season)
+            baseline = self.predictions(season)
+            new_predictions = self.batcher.submit(season, np.vstack([features for _, _, features in season_queries]))
+            for (query, row, _), prediction in zip(season_queries, new_predictions):
+                others = np.delete(baseline, row - start)
+                answers[id(query)] = {"season": season, "player": query["player"],
+                                      f"predicted_{self.output}": float(prediction),
+                                      "rank": int((others > prediction).sum()) + 1,
+                                      f"baseline_{self.output}": float(baseline[row - start]),
+                                      "baseline_rank": int((others > baseline[row - start]).sum()) + 1}
+        return [answers[id(query)] for query in queries]
+
+    def stats(self):
+        """
+        :return: dict,
+            the number of requests, and their p50/p99 latency in milliseconds, for each endpoint,
+            and the mean number of requests in each batch of predictions
+        """
+        response = {}
+        for endpoint, latencies in self.latencies.items():
+            latencies = np.array(latencies) * 1000
+            response[endpoint] = {"requests": len(latencies),
+                                  "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                                  "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None}
+        batch_sizes = list(self.batcher.batch_sizes)
+        response["batches"] = len(batch_sizes)
+        response["mean_batch_requests"] = float(np.mean(batch_sizes)) if batch_sizes else None
+        return response
+
+    def respond(self, method, path, body=None):
+        """
+        :param method: str,
+            "GET" or "POST"
+        :param path: str,
+            the requested URL path and query string
+        :param body: bytes,
+            the request body, for POST requests
+        :return: tuple,
+            the status code (int) and the JSON response (object)
+        """
+        url = urlparse(path)
+        try:
+            if method == "GET" and url.path == "/predict":
+                params = parse_qs(url.query)
+                seasons = [int(season) for value in params.get("season", []) for season in value.split(",")]
+                if not seasons:
+                    raise RequestError(400, "Pick at least one season, e.g. /predict?season=2024")
+                return 200, self.rankings(seasons, int(params.get("top", ["5"])[0]))
+            if method == "POST" and url.path == "/what-if":
+                try:
+                    queries = json.loads(body or b"")
+                except json.JSONDecodeError:
+                    raise RequestError(400, "The body must be JSON")
+                if not isinstance(queries, (dict, list)):
+                    raise RequestError(400, "The body must be a query (object), or a list of them")
+                single = isinstance(queries, dict)
+                answers = self.what_if([queries] if single else queries)
+                return 200, answers[0] if single else answers
+            if method == "GET" and url.path == "/stats":
+                return 200, self.stats()
+            if method == "GET" and url.path == "/health":
+                return 200, {"status": "ok", "seasons": [self.seasons[0], self.seasons[-1]]}
+            raise RequestError(404, f"No endpoint {method} {url.path}")
+        except RequestError as e:
+            return e.status, {"error": str(e)}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+
+    def handler(self):
+        """
+        :return: class,
+            a request handler bound to this service
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Allows keep-alive connections to be reused
+
+            # The headers and body are sent in separate writes, which Nagle's algorithm would hold
+            # back until the client acknowledges the headers (tens of milliseconds)
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self.answer(None)
+
+            def do_POST(self):
+                self.answer(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+            def answer(self, body):
+                start = time.perf_counter()
+                status, response = service.respond(self.command, self.path, body)
+                payload = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                endpoint = {"/predict": "predict", "/what-if": "what-if"}.get(urlparse(self.path).path)
+                if endpoint and status == 200:
+                    service.latencies[endpoint].append(time.perf_counter() - start)
+
+            def log_message(self, *args):
+                pass # Keeps the console free of per-request logging
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.batcher.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves MVP predictions over HTTP")
+    parser.add_argument("--start", type=int, default=None, help="first season of data (defaults to the earliest)")
+    parser.add_argument("--end", type=int, default=None, help="last season of data (defaults to the latest)")
+    parser.add_argument("--estimator", default="ridge", choices=list(Estimators.ESTIMATORS))
+    parser.add_argument("--params", help="the estimator's parameters, as JSON (defaults to its usual settings)")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--window", type=float, default=0.002, help="seconds a batch waits for more requests")
+    args = parser.parse_args()
+
+    first_yr, last_yr = Utils.unique_yrs()
+    model = Estimators.estimator(args.estimator, json.loads(args.params) if args.params else None)
+    with PredictionService(args.start or first_yr, args.end or last_yr, model, args.port, ModelCache(),
+                           args.window) as service:
+        print(f"Serving MVP predictions for {service.seasons[0]}-{service.seasons[-1]} on {service.url} (Ctrl+C to stop)")
+        try:
+            service.thread.join()
+        except KeyboardInterrupt:
+            pass
+        print(json.dumps(service.stats(), indent=1))
@@ -0,0 +1,315 @@
+import contextlib, cProfile, itertools, json, os, pstats, sys, threading, time, tracemalloc
+
+# Records where a run's time and memory go, as named spans: e.g. the "clean" stage, each season it
+# builds, and each step of that season. The pipeline's modules open spans through the functions at
+# the bottom of this module, which do nothing unless a Profiler is active, so normal runs don't pay for them
+#
+# The resource module (for the process's peak memory) only exists on Unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ACTIVE = None # The Profiler recording the current run, if there is one
+
+class Profiler:
+    """
+    Records the wall time, CPU time and peak memory of each span of a run
+
+    Each span records:
+    - wall: seconds from start to finish
+    - cpu: CPU seconds used during the span. On the main thread that's the whole process's CPU time
+      (so threads it hands work to, e.g. BLAS, are included), on any other thread just that thread's
+    - max_rss_mb: the process's peak resident memory when the span finished. It only ever grows,
+      so the span it first jumps in is the one that raised the peak
+    - peak_mb: the most memory Python had allocated at any point in the span, only when trace_memory is on
+      (tracemalloc slows the run down, so it's off by default)
+
+    Spans in coroutines (e.g. the scrapers' downloads) overlap each other on the same thread, so
+    they're recorded as async spans with wall time only. Work done in worker processes is timed
+    there (see timer/elapsed) and recorded in the main process with record()
+
+    One span name can also be captured in detail, the first time it runs: either profiled with
+    cProfile (saved as a .prof file, e.g. for snakeviz) or with tracemalloc's biggest allocations
+
+    Usage:
+        with Profiler() as profiler:
+            DataCleaner.clean()
+        print(profiler.summary())
+        profiler.save_chrome_trace("trace.json")
+    """
+    def __init__(self, trace_memory=False, capture=None, capture_kind="cprofile", capture_path=None):
+        """
+        :param trace_memory: boolean,
+            whether to trace Python's allocations, for each span's peak_mb
+        :param capture: str,
+            the name of the span to capture in detail (e.g. "backtest"), or None
+        :param capture_kind: str,
+            'cprofile' or 'tracemalloc'
+        :param capture_path: str,
+            file the capture is saved to, defaults to "{capture}.prof" or "{capture}-memory.txt"
+        """
+        if capture_kind not in ("cprofile", "tracemalloc"):
+            raise ValueError(f"Unknown capture kind '{capture_kind}', pick from cprofile, tracemalloc")
+        self.trace_memory = trace_memory
+        self.capture = capture
+        self.capture_kind = capture_kind
+        self.capture_path = capture_path or (f"{capture}.prof" if capture_kind == "cprofile" else f"{capture}-memory.txt")
+        self.captured = False
+        self.spans = []
+        self.lock = threading.Lock()
+        self.local = threading.local() # Each thread's stack of open spans
+        self.ids = itertools.count()
+        self.started = time.perf_counter()
+        self.previous = None
+
+    def __enter__(self):
+        global ACTIVE
+        self.previous, ACTIVE = ACTIVE, self
+        self.started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        return self
+
+    def __exit__(self, *exc):
+        global ACTIVE
+        ACTIVE = self.previous
+        if self.started_tracing:
+            tracemalloc.stop()
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def add(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+    @contextlib.contextmanager
+    def span(self, name, category="stage", **args):
+        """
+        Records the code run inside the with block as a span
+        :param name: str,
+            name of the span, e.g. "season"
+        :param category: str,
+            what the span belongs to, e.g. "clean" or "Per-game"
+        :param args:
+            details shown with the span, e.g. year=2024
+        """
+        stack = self.stack()
+        parent = stack[-1] if stack else None
+        span = {"name": name, "category": category, "args": args, "id": next(self.ids),
+                "parent": parent["id"] if parent else None, "pid": os.getpid(), "thread": threading.get_ident(),
+                "async": False, "peak_mb": None}
+
+        # The traced peak is reset for each span, so a parent's peak is carried up from its children
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            peak = tracemalloc.get_traced_memory()[1]
+            if parent is not None:
+                parent["traced_peak"] = max(parent["traced_peak"], peak)
+            tracemalloc.reset_peak()
+        span["traced_peak"] = 0
+
+        capture = self.start_capture(name)
+        stack.append(span)
+        wall, cpu = timer()
+        try:
+            yield span
+        finally:
+            span["start"] = wall - self.started
+            span["wall"] = time.perf_counter() - wall
+            span["cpu"] = cpu_clock() - cpu
+            stack.pop()
+            if tracing:
+                span["traced_peak"] = max(span["traced_peak"], tracemalloc.get_traced_memory()[1])
+                span["peak_mb"] = span["traced_peak"] / 2**20
+                if parent is not None:
+                    parent["traced_peak"] = max(parent["traced_peak"], span["traced_peak"])
+                tracemalloc.reset_peak()
+            del span["traced_peak"]
+            span["max_rss_mb"] = max_rss_mb()
+            self.stop_capture(capture)
+            self.add(span)
+
+    @contextlib.asynccontextmanager
+    async def async_span(self, name, category="stage", **args):
+        """
+        The coroutine version of span(), recording wall time only
+        """
+        span = {"name": name, "category": category, "args": args, "id": next(self.ids), "parent": None,
+                "pid": os.getpid(), "thread": threading.get_ident(), "async": True, "cpu": None, "peak_mb": None,
+                "max_rss_mb": None}
+        wall = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span["start"] = wall - self.started
+            span["wall"] = time.perf_counter() - wall
+            self.add(span)
+
+    def record(self, name, category, timing, **args):
+        """
+        Records a span timed somewhere else, e.g. in a worker process
+        :param timing: dict,
+            the span's timing, from elapsed()
+        """
+        self.add({"name": name, "category": category, "args": args, "id": next(self.ids), "parent": None,
+                  "pid": timing["pid"], "thread": timing["thread"], "async": False, "peak_mb": None,
+                  "start": timing["start"] - self.started, "wall": timing["wall"], "cpu": timing["cpu"],
+                  "max_rss_mb": timing["max_rss_mb"]})
+
+    def start_capture(self, name):
+        """
+        :return: cProfile.Profile or boolean,
+            the profiler, or whether tracemalloc was started, if this span is being captured, else None
+        """
+        if name != self.capture or self.captured:
+            return None
+        self.captured = True
+        if self.capture_kind == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        return started
+
+    def stop_capture(self, capture):
+        """
+        Saves a finished capture
+        """
+        if capture is None:
+            return
+        if isinstance(capture, cProfile.Profile):
+            capture.disable()
+            capture.dump_stats(self.capture_path)
+            stats = pstats.Stats(capture, stream=sys.stdout)
+            print(f"\nProfile of {self.capture} (saved to {self.capture_path}), by cumulative time:")
+            stats.sort_stats("cumulative").print_stats(15)
+            return
+        snapshot = tracemalloc.take_snapshot()
+        if capture:
+            tracemalloc.stop()
+        with open(self.capture_path, "w") as f:
+            f.write(f"Memory still allocated at the end of {self.capture}, by line:\n")
+            for statistic in snapshot.statistics("lineno")[:25]:
+                f.write(f"{statistic}\n")
+        print(f"\nAllocations of {self.capture} saved to {self.capture_path}")
+
+    def summary(self):
+        """
+        :return: str,
+            a table of each kind of span: how many times it ran, and its total wall and CPU time and peak memory
+        """
+        totals = {}
+        for span in self.spans:
+            total = totals.setdefault((span["category"], span["name"]), {"calls": 0, "wall": 0.0, "cpu": 0.0,
+                                                                         "peak": None, "rss": None})
+            total["calls"] += 1
+            total["wall"] += span["wall"]
+            total["cpu"] += span["cpu"] or 0.0
+            for key, value in (("peak", span["peak_mb"]), ("rss", span["max_rss_mb"])):
+                if value is not None:
+                    total[key] = max(total[key] or 0.0, value)
+
+        def megabytes(value):
+            return f"{value:.1f}" if value is not None else "-"
+
+        lines = [f"{'Category':<14}{'Span':<20}{'Calls':>7}{'Wall s':>10}{'CPU s':>10}{'Peak MB':>10}{'Max RSS MB':>12}"]
+        for (category, name), total in sorted(totals.items(), key=lambda item: -item[1]["wall"]):
+            lines.append(f"{category:<14}{name:<20}{total['calls']:>7}{total['wall']:>10.3f}{total['cpu']:>10.3f}"
+                         f"{megabytes(total['peak']):>10}{megabytes(total['rss']):>12}")
+        return "\n".join(lines)
+
+    def save_json(self, path):
+        """
+        Saves every span, in the order they started
+        :param path: str,
+            the .json file
+        """
+        with open(path, "w") as f:
+            json.dump({"spans": sorted(self.spans, key=lambda span: span["start"])}, f, indent=1, default=str)
+
+    def save_chrome_trace(self, path):
+        """
+        Saves every span in the Trace Event Format, which chrome://tracing and Perfetto can open
+        :param path: str,
+            the .json file
+        """
+        events = []
+        for span in self.spans:
+            event = {"name": span["name"], "cat": span["category"], "pid": span["pid"], "tid": span["thread"],
+                     "ts": span["start"] * 1e6, "args": {**span["args"], "cpu": span["cpu"], "peak_mb": span["peak_mb"],
+                                                         "max_rss_mb": span["max_rss_mb"]}}
+            if span["async"]:
+                # Overlapping coroutines are drawn as async tracks, each span paired by its id
+                events.append({**event, "ph": "b", "id": span["id"]})
+                events.append({**event, "ph": "e", "id": span["id"], "ts": (span["start"] + span["wall"]) * 1e6})
+            else:
+                events.append({**event, "ph": "X", "dur": span["wall"] * 1e6})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+def max_rss_mb():
+    """
+    :return: float,
+        the process's peak resident memory so far, or None where it can't be read
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def span(name, category="stage", **args):
+    """
+    :return: context manager,
+        a span recorded by the active Profiler, or one that does nothing if there isn't one
+    """
+    return ACTIVE.span(name, category, **args) if ACTIVE is not None else contextlib.nullcontext()
+
+def async_span(name, category="stage", **args):
+    """
+    :return: async context manager,
+        a coroutine span recorded by the active Profiler, or one that does nothing if there isn't one
+    """
+    return ACTIVE.async_span(name, category, **args) if ACTIVE is not None else contextlib.nullcontext()
+
+def cpu_clock():
+    """
+    :return: float,
+        CPU seconds used by the process when called from the main thread, otherwise by the calling thread
+    """
+    if threading.current_thread() is threading.main_thread():
+        return time.process_time()
+    return time.thread_time()
+
+def timer():
+    """
+    Starts timing work, e.g. in a worker process, to record with record()
+    :return: tuple,
+        the wall clock and CPU clock now
+    """
+    return time.perf_counter(), cpu_clock()
+
+def elapsed(started):
+    """
+    :param started: tuple,
+        from timer()
+    :return: dict,
+        the work's timing, which can be sent back from a worker process
+    """
+    wall, cpu = started
+    return {"start": wall, "wall": time.perf_counter() - wall, "cpu": cpu_clock() - cpu,
+            "pid": os.getpid(), "thread": threading.get_ident(), "max_rss_mb": max_rss_mb()}
+
+def record(name, category, timing, **args):
+    """
+    Records work timed with timer() and elapsed() on the active Profiler, if there is one
+    """
+    if ACTIVE is not None:
+        ACTIVE.record(name, category, timing, **args)
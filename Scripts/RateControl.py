@@ -0,0 +1,272 @@
+import asyncio, time, random, threading, Profiling
+from collections import namedtuple
+from email.utils import parsedate_to_datetime
+
+# Response codes which mean the host wants us to slow down
+THROTTLE_CODES = (429, 503)
+
+# A response-like object, for fetchers (e.g. Selenium) that don't return an HTTP response
+Page = namedtuple("Page", ["status_code", "headers", "text"])
+
+class ScrapeError(Exception):
+    """
+    Raised when a page can't be retrieved, so nothing is written to the rawHTML cache
+    """
+
+class CircuitOpenError(ScrapeError):
+    """
+    Raised while the circuit breaker is open, i.e. after too many consecutive failures
+    """
+
+class RateBudget:
+    """
+    A requests-per-minute budget shared by every scraper hitting the same host
+
+    Rather than sleeping a fixed amount after each request, every request is given its own
+    time slot, evenly spaced across the minute. Concurrent callers queue up behind each other,
+    so the host sees exactly the budgeted rate no matter how many scrapers are running
+    """
+    def __init__(self, requests_per_minute):
+        """
+        :param requests_per_minute: int,
+            the maximum number of requests to send to the host each minute
+        """
+        self.interval = 60 / requests_per_minute # Seconds between consecutive requests
+        self.next_slot = time.monotonic() # The earliest time the next request may be sent
+        self.lock = threading.Lock() # Slots are also reserved from worker threads (e.g. Selenium)
+
+    def reserve(self):
+        """
+        Reserves the next free time slot
+        :return: float,
+            the number of seconds to wait before the slot starts
+        """
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+            return slot - now
+
+    def wait(self):
+        """
+        Blocks until the caller may send its request
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire(self):
+        """
+        Waits (without blocking the event loop) until the caller may send its request
+        """
+        # reserve() doesn't await, so the slot is claimed before any other task can run
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class AdaptiveRateController(RateBudget):
+    """
+    A RateBudget which backs off when the host throttles us, and works its way back up once it stops
+
+    - The rate rises additively after every good response, and is cut multiplicatively (AIMD)
+      whenever the host throttles us (429/503), honouring any Retry-After header
+    - The rate never rises above max_rpm, which is the starting rate unless a higher one is given.
+      basketball-reference publishes its limit (20 a minute) and blocks clients that go over it,
+      so by default the additive increase only recovers the rate lost to a backoff
+    - Failed requests are retried with jittered exponential backoff
+    - After too many consecutive failures the circuit breaker opens, and every request fails fast
+      until the cooldown has passed. The next request then acts as a trial (half-open), and every
+      other request keeps failing fast until the trial's outcome closes or re-opens the breaker
+    - Only responses that pass validation are ever returned, so bad pages are never cached
+    """
+    def __init__(self, requests_per_minute=20, min_rpm=2, max_rpm=None, increase=1, decrease=0.5,
+                 max_retries=4, backoff_base=2, backoff_cap=60, failure_threshold=5, cooldown=120):
+        """
+        :param requests_per_minute: int,
+            the starting rate
+        :param min_rpm: int,
+            the rate is never cut below this
+        :param max_rpm: int,
+            the rate is never raised above this (defaults to the starting rate, so the rate only
+            rises again after it's been cut). Give a higher one to probe hosts without a published limit
+        :param increase: int,
+            requests per minute added after each good response
+        :param decrease: float,
+            factor the rate is multiplied by when throttled
+        :param max_retries: int,
+            number of retries for each page before giving up
+        :param backoff_base: float,
+            seconds to back off after the first failure, doubling for each further attempt
+        :param backoff_cap: float,
+            the longest single backoff, in seconds
+        :param failure_threshold: int,
+            consecutive failures before the circuit breaker opens
+        :param cooldown: float,
+            seconds the circuit breaker stays open
+        """
+        super().__init__(requests_per_minute)
+        self.rpm = requests_per_minute
+        self.min_rpm = min_rpm
+        self.max_rpm = max_rpm or requests_per_minute
+        self.increase = increase
+        self.decrease = decrease
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0 # Consecutive failures
+        self.open_until = None # Time the circuit breaker closes again, None while closed
+        self.trial_started = None # Time the half-open trial request was let through, None when there isn't one
+
+    def set_rate(self, rpm):
+        self.rpm = min(self.max_rpm, max(self.min_rpm, rpm))
+        self.interval = 60 / self.rpm
+
+    def on_success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_until = None
+            self.trial_started = None
+            self.set_rate(self.rpm + self.increase)
+
+    def on_failure(self, throttled=False, retry_after=None):
+        """
+        Records a failed request
+        :param throttled: bool,
+            whether the host told us to slow down
+        :param retry_after: float,
+            seconds the host asked us to wait before the next request
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.failures += 1
+            self.trial_started = None
+            if throttled:
+                self.set_rate(self.rpm * self.decrease)
+            if retry_after:
+                # Nobody sends anything until the host is ready for us again
+                self.next_slot = max(self.next_slot, now + retry_after)
+            if self.failures >= self.failure_threshold:
+                self.open_until = now + self.cooldown
+
+    def check_circuit(self):
+        """
+        Raises a CircuitOpenError if the circuit breaker is open, or half-open with its trial request
+        still in flight. Otherwise a half-open breaker lets the caller's request through as the trial
+        """
+        with self.lock:
+            if self.open_until is None:
+                return
+            now = time.monotonic()
+
+            # A trial that never reported back (e.g. its task was cancelled) is replaced after a cooldown
+            trial_running = self.trial_started is not None and now < self.trial_started + self.cooldown
+            if now < self.open_until or trial_running:
+                raise CircuitOpenError(f"Circuit breaker open after {self.failures} consecutive failures")
+            self.trial_started = now
+
+    def backoff(self, attempt):
+        """
+        :param attempt: int,
+            the number of the attempt that just failed (0 for the first)
+        :return: float,
+            seconds to wait before retrying, with "full jitter" so retries don't line up
+        """
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def verdict(self, response, validate):
+        """
+        Decides whether a response is good, and records the outcome
+        :param response: response-like object,
+            anything with status_code, headers and text (requests, httpx or a Page)
+        :param validate: function,
+            returns whether the response's text is a genuine page, e.g. that it contains the table
+        :return: str,
+            an error message, or None if the response is good
+        """
+        if response.status_code == 200 and (validate is None or validate(response.text)):
+            self.on_success()
+            return None
+        throttled = response.status_code in THROTTLE_CODES
+        self.on_failure(throttled, retry_after_seconds(response.headers.get("Retry-After")))
+        return f"HTTP {response.status_code}" if response.status_code != 200 else "page failed validation"
+
+    def fetch(self, get, url, validate=None):
+        """
+        Retrieves a URL within the rate budget, retrying until a good response is received
+        :param get: function,
+            takes the URL and returns a response-like object, e.g. requests.Session.get
+        :param url: str,
+            the URL to retrieve
+        :param validate: function,
+            returns whether the response's text is a genuine page
+        :return: response-like object,
+            the good response
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            self.check_circuit()
+            with Profiling.span("rate limit", "network"):
+                self.wait()
+            try:
+                with Profiling.span("request", "network", url=url, attempt=attempt):
+                    response = get(url)
+            except Exception as e: # Network errors, timeouts etc.
+                self.on_failure()
+                error = repr(e)
+            else:
+                error = self.verdict(response, validate)
+                if error is None:
+                    return response
+                if response.status_code == 404:
+                    break # The page doesn't exist, so retrying won't help
+            if attempt < self.max_retries:
+                with Profiling.span("backoff", "network"):
+                    time.sleep(self.backoff(attempt))
+        raise ScrapeError(f"Failed to retrieve {url}: {error}")
+
+    async def fetch_async(self, get, url, validate=None):
+        """
+        The asyncio version of fetch()
+        :param get: coroutine function,
+            takes the URL and returns a response-like object, e.g. httpx.AsyncClient.get
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            self.check_circuit()
+            async with Profiling.async_span("rate limit", "network"):
+                await self.acquire()
+            try:
+                async with Profiling.async_span("request", "network", url=url, attempt=attempt):
+                    response = await get(url)
+            except Exception as e:
+                self.on_failure()
+                error = repr(e)
+            else:
+                error = self.verdict(response, validate)
+                if error is None:
+                    return response
+                if response.status_code == 404:
+                    break
+            if attempt < self.max_retries:
+                async with Profiling.async_span("backoff", "network"):
+                    await asyncio.sleep(self.backoff(attempt))
+        raise ScrapeError(f"Failed to retrieve {url}: {error}")
+
+def retry_after_seconds(value):
+    """
+    :param value: str,
+        a Retry-After header, either a number of seconds or an HTTP date
+    :return: float,
+        seconds to wait, or None if there was no (valid) header
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,79 @@
+import pandas as pd
+
+# The column types of the cleaned datasets. Read from a .csv file, every number is an int64 or float64 and
+# every label a Python string, which takes several times the memory the data needs. compact() stores:
+# - counts as the smallest integer type that holds them (e.g. "G" as int8, "Pts Won" as int16)
+# - every other number (rates, averages, ratios) as float32, which keeps more digits than the website gives
+# - labels as categories, so each player's or team's name is stored once rather than on every row
+# The columnar copies are compacted exactly (floats stay float64), so the model trains on full precision
+# features unless it's asked for the memory-budget mode, which rounds them to float32
+# Columns not listed here are typed by what they hold, so new columns (or leagues) still get compacted
+COUNTS = ["Rk", "Age", "G", "GS", "year", "First", "Pts Won", "Pts Max", "W", "L", "Unnamed: 0",
+          "NPos", "NTm", "MVP"]
+CATEGORIES = ["Player", "Team", "Pos", "Awards"]
+
+# What a missing value means in each column, and the value it's stored as. A shooting percentage is
+# missing when the player took no shots of that type, and the MVP voting columns (the voting table is
+# the only one with win shares) are missing for players who got no votes
+FILLS = {**dict.fromkeys(["FG%", "3P%", "2P%", "eFG%", "FT%"], 0),
+         **dict.fromkeys(["First", "Pts Won", "Pts Max", "Share", "WS", "WS/48"], 0)}
+
+def fill_missing(df):
+    """
+    Fills the missing values that have a meaning (see FILLS). Labels are left missing, e.g. a player who
+    won no awards has no "Awards". Any other missing number means a row didn't find its match in one of
+    the joins (e.g. a team missing from nicknames.csv), which is reported, then filled with 0 so the row
+    can still be trained on
+    :param df: dataframe,
+        the merged dataset
+    :return: dataframe,
+        the dataset with no missing numbers
+    """
+    df = df.fillna({col: value for col, value in FILLS.items() if col in df})
+    numbers = df.select_dtypes(include="number")
+    gaps = numbers.isna().sum()
+    gaps = gaps[gaps > 0]
+    if len(gaps):
+        print("\nMissing values filled with 0: " + ", ".join(f"{col} ({count} rows)" for col, count in gaps.items()))
+        df[gaps.index] = numbers[gaps.index].fillna(0)
+    return df
+
+def compact(df, exact=False):
+    """
+    Stores each column in the smallest type that holds its values, keeping the same columns numeric,
+    so Model.predictors() picks the same features
+    :param df: dataframe,
+        a cleaned dataset
+    :param exact: boolean,
+        keeps every float as float64, so no digits are lost (counts and labels are still compacted)
+    :return: dataframe,
+        the compacted dataset
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            columns[col] = series
+        elif pd.api.types.is_numeric_dtype(series):
+            # A count with a missing or fractional value can't be an integer, so it's kept as a float
+            compacted = pd.to_numeric(series, downcast="integer") if col in COUNTS or series.dtype.kind in "iu" else series
+            columns[col] = compacted if compacted.dtype.kind in "iu" else series.astype("float64" if exact else "float32")
+        elif col in CATEGORIES or series.dtype == object:
+            columns[col] = series.astype("category")
+        else:
+            columns[col] = series
+    compacted = pd.DataFrame(columns, index=df.index)
+
+    numbers = list(df.select_dtypes(include="number"))
+    if list(compacted.select_dtypes(include="number")) != numbers:
+        raise ValueError("Compacting changed which columns are numeric, so the model's features would change")
+    return compacted
+
+def memory_mb(df):
+    """
+    :param df: dataframe,
+        any dataframe
+    :return: float,
+        the memory it takes up, including the strings its object columns point to
+    """
+    return df.memory_usage(deep=True).sum() / 2**20
@@ -0,0 +1,103 @@
+import csv, os, pandas as pd
+
+SCRAPED_DIR = "../csvFiles/scraped"
+
+class SeasonPartitions:
+    """
+    The scraped data of one type (e.g. per-game), saved as a .csv file for each season
+
+    A season's file is written under a temporary name and renamed once it's complete, so a file
+    that exists always holds a whole season. Seasons are only ever added or replaced, never edited,
+    which lets a scrape that stopped part way resume from the seasons it hadn't finished yet, and lets
+    the cleaning stage read the finished seasons while the rest are still being scraped
+
+    Usage:
+        partitions = SeasonPartitions("Per-game")
+        partitions.write(2024, df)
+        partitions.read(2024)
+    """
+    def __init__(self, directory_name, root=SCRAPED_DIR):
+        """
+        :param directory_name: str,
+            the type of data, e.g. "Per-game"
+        :param root: str,
+            directory the partitions of every type of data are kept in
+        """
+        self.directory = f"{root}/{directory_name}"
+
+    def path(self, year):
+        return f"{self.directory}/{year}.csv"
+
+    def years(self):
+        """
+        :return: list,
+            the seasons (int) that have been saved, in order
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(file[:-4]) for file in os.listdir(self.directory)
+                      if file.endswith(".csv") and file[:-4].isdigit())
+
+    def complete(self, year, html_path):
+        """
+        :param year: int,
+            the season
+        :param html_path: str,
+            path of the page the season is parsed from
+        :return: boolean,
+            whether the season is saved, and was parsed from the page as it is now
+        """
+        if not os.path.exists(self.path(year)):
+            return False
+        return not os.path.exists(html_path) or os.path.getmtime(html_path) <= os.path.getmtime(self.path(year))
+
+    def write(self, year, df):
+        """
+        :param year: int,
+            the season
+        :param df: dataframe,
+            the season's data
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        df.to_csv(f"{self.path(year)}.tmp", index=False)
+        os.replace(f"{self.path(year)}.tmp", self.path(year))
+
+    def read(self, year, columns=None):
+        """
+        :param year: int,
+            the season
+        :param columns: list,
+            the columns to read, or None for all of them
+        :return: dataframe,
+            the season's data
+        """
+        df = pd.read_csv(self.path(year), usecols=columns)
+        return df if columns is None else df[columns]
+
+    def combine(self, path, years):
+        """
+        Writes the seasons into a single .csv file, one season at a time, so memory use doesn't grow
+        with the number of seasons. The file is the same as concatenating every season's dataframe
+        :param path: str,
+            path of the combined file
+        :param years: list,
+            the seasons (int) to combine, in order
+        """
+        headers = []
+        for year in years:
+            with open(self.path(year), newline="", encoding="utf-8") as f:
+                headers.append(next(csv.reader(f), []))
+
+        # Seasons missing some columns get them as empty cells, in the order the columns first appear
+        columns = list(dict.fromkeys(col for header in headers for col in header))
+        with open(f"{path}.tmp", "w", newline="", encoding="utf-8") as out:
+            csv.writer(out, lineterminator=os.linesep).writerow(columns)
+            for year, header in zip(years, headers):
+                if header == columns:
+                    # The rows are copied as they are, without being parsed
+                    with open(self.path(year), newline="", encoding="utf-8") as f:
+                        next(f)
+                        out.writelines(f)
+                else:
+                    self.read(year).reindex(columns=columns).to_csv(out, header=False, index=False)
+        os.replace(f"{path}.tmp", path)
@@ -0,0 +1,142 @@
+import json, os, numpy as np, pandas as pd, pyarrow as pa
+from pyarrow import ipc
+
+COLUMNAR_DIR = "../csvFiles/columnar"
+
+def dataset_path(name):
+    """
+    :param name: str,
+        name of the dataset, e.g. "mvp-pg-team"
+    :return: str,
+        path of the dataset's Arrow IPC file
+    """
+    return f"{COLUMNAR_DIR}/{name}.arrow"
+
+def dataset_exists(name):
+    return os.path.exists(dataset_path(name))
+
+def write_dataset(df, name):
+    """
+    Saves a dataframe as a typed, uncompressed Arrow IPC file, which can be memory-mapped
+
+    The rows are stably sorted by season, and the row range of each season is stored in the
+    file's metadata, so seasons can be sliced out (and listed) without reading any data
+    :param df: dataframe,
+        the dataset, with a "year" column
+    :param name: str,
+        name of the dataset, e.g. "mvp-pg-team"
+    """
+    df = df.sort_values("year", kind="stable").reset_index(drop=True)
+    offsets = year_offsets(df["year"].to_numpy())
+
+    # Numeric columns keep NaN as a value (rather than a null), so they can be read back zero-copy.
+    # Categories are stored as dictionary arrays, which are read back as categories
+    arrays = [pa.array(df[col]) if isinstance(df[col].dtype, pd.CategoricalDtype)
+              else pa.array(df[col].to_numpy(), from_pandas=df[col].dtype == object) for col in df.columns]
+    schema = pa.schema([pa.field(str(col), array.type) for col, array in zip(df.columns, arrays)],
+                       metadata={"year_offsets": json.dumps(offsets)})
+    table = pa.Table.from_arrays(arrays, schema=schema)
+
+    os.makedirs(COLUMNAR_DIR, exist_ok=True)
+    with pa.OSFile(dataset_path(name), "wb") as sink, ipc.new_file(sink, schema) as writer:
+        # A single record batch keeps every column contiguous
+        writer.write_table(table, max_chunksize=max(len(table), 1))
+
+def year_offsets(years):
+    """
+    :param years: numpy array,
+        a sorted "year" column
+    :return: dict,
+        the row range [start, stop) (list) of each season (int)
+    """
+    starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]]) if len(years) else np.array([], dtype=int)
+    stops = np.r_[starts[1:], len(years)]
+    return {int(years[start]): [int(start), int(stop)] for start, stop in zip(starts, stops)}
+
+def open_dataset(name):
+    """
+    :param name: str,
+        name of the dataset
+    :return: tuple,
+        the memory-mapped table (pyarrow.Table), and the row range (list) of each season (int)
+    """
+    # The memory map stays open for as long as any array read from it is in use
+    reader = ipc.open_file(pa.memory_map(dataset_path(name), "r"))
+    table = reader.read_all()
+    offsets = json.loads(reader.schema.metadata[b"year_offsets"])
+    return table, {int(year): rows for year, rows in offsets.items()}
+
+def dataset_years(name):
+    """
+    :param name: str,
+        name of the dataset
+    :return: list,
+        the seasons (int) in the dataset, read from the file's metadata alone
+    """
+    with pa.memory_map(dataset_path(name), "r") as source:
+        offsets = json.loads(ipc.open_file(source).schema.metadata[b"year_offsets"])
+    return sorted(int(year) for year in offsets)
+
+def season_slice(table, offsets, years):
+    """
+    :param table: pyarrow.Table,
+        the dataset's table
+    :param offsets: dict,
+        the row range (list) of each season (int)
+    :param years: list,
+        the seasons wanted, or None for all of them
+    :return: pyarrow.Table,
+        the rows of those seasons (zero-copy when the seasons are consecutive)
+    """
+    if years is None:
+        return table
+    ranges = sorted(offsets[year] for year in years if year in offsets)
+    if not ranges:
+        return table.slice(0, 0)
+    if all(stop == next_start for (_, stop), (next_start, _) in zip(ranges, ranges[1:])):
+        return table.slice(ranges[0][0], ranges[-1][1] - ranges[0][0])
+    return pa.concat_tables([table.slice(start, stop - start) for start, stop in ranges])
+
+def read_dataset(name, columns=None, years=None):
+    """
+    :param name: str,
+        name of the dataset
+    :param columns: list,
+        the columns to read, or None for all of them
+    :param years: list,
+        the seasons to read, or None for all of them
+    :return: dataframe,
+        the requested part of the dataset
+    """
+    table, offsets = open_dataset(name)
+    table = season_slice(table, offsets, years)
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas()
+
+def read_columns(name, columns, years=None):
+    """
+    Reads numeric columns straight out of the memory-mapped file, without copying them
+    :param name: str,
+        name of the dataset
+    :param columns: list,
+        the numeric columns to read
+    :param years: list,
+        consecutive seasons to read, or None for all of them
+    :return: dict,
+        a read-only numpy array for each column (str)
+    """
+    table, offsets = open_dataset(name)
+    table = season_slice(table, offsets, years)
+    return {col: column_array(table.column(col)) for col in columns}
+
+def column_array(column):
+    """
+    :param column: pyarrow.ChunkedArray,
+        a numeric column
+    :return: numpy array,
+        a view of the column's memory when it's held in one piece, otherwise a copy
+    """
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+    return column.to_numpy()
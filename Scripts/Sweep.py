@@ -0,0 +1,227 @@
+import argparse, json, os, tempfile, time, numpy as np, pandas as pd, ML, Metrics, Utils
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from Estimators import ESTIMATORS, estimator
+
+# Tried when no grid is given: linear regression and the random forest, around their usual settings
+DEFAULT_GRID = {
+    "ridge": {"alpha": [0.1, 1.0, 10.0, 100.0]},
+    "random-forest": {"n_estimators": [50, 100], "min_samples_split": [5, 10], "random_state": [1]},
+}
+
+def configurations(grid, samples=None, seed=1):
+    """
+    :param grid: dict,
+        the values (list) to try for each parameter (str), for each estimator (str)
+    :param samples: int,
+        the number of random configurations to draw for each estimator, or None to try every combination
+    :param seed: int,
+        seed for the random draws
+    :return: list,
+        an (estimator name, parameters) tuple for each configuration
+    """
+    configs = []
+    for name, space in grid.items():
+        if name not in ESTIMATORS:
+            raise ValueError(f"Unknown estimator '{name}', pick from {', '.join(ESTIMATORS)}")
+        if samples is None:
+            params = ParameterGrid(space)
+        else:
+            params = ParameterSampler(space, n_iter=min(samples, len(ParameterGrid(space))), random_state=seed)
+        configs.extend((name, dict(param)) for param in params)
+    return configs
+
+def timed_fold(model, year, features, share, offsets):
+    """
+    :return: tuple,
+        the predictions for the year (numpy array), and the seconds (float) spent fitting and predicting
+    """
+    start = time.perf_counter()
+    predictions = ML.fit_fold(model, year, features, share, offsets)
+    return predictions, time.perf_counter() - start
+
+def shared_timed_fold(model, year):
+    return timed_fold(model, year, ML.SHARED["features"], ML.SHARED["share"], ML.SHARED["offsets"])
+
+class Sweep:
+    """
+    Backtests many model configurations over the same seasons, as one pool of (configuration, season) tasks
+
+    - The data is loaded, and the year-sorted feature matrix built, once for every configuration.
+      Worker processes memory-map it, and each fold is a slice of it
+    - Tasks are queued season by season, so every configuration progresses at the same pace
+    - Once every configuration still running has finished the first min_folds seasons (and after each
+      season from then on), configurations whose mean AP over those seasons trails the best by more than
+      tolerance are abandoned, and their queued tasks cancelled. The decisions only depend on finished
+      seasons, so they're the same however many workers there are
+
+    Usage:
+        sweep = Sweep(1996, 2024, configurations(DEFAULT_GRID))
+        print(sweep.run())
+    """
+    def __init__(self, start_yr, end_yr, configs, workers=None, min_folds=5, tolerance=None, df=None):
+        """
+        :param start_yr: int,
+            the first season of data used
+        :param end_yr: int,
+            the last season of data used
+        :param configs: list,
+            the (estimator name, parameters) configurations to try
+        :param workers: int,
+            the number of worker processes (1 runs in this process, None uses every core)
+        :param min_folds: int,
+            the number of seasons every configuration is tested on before any can be abandoned
+        :param tolerance: float,
+            how far (in mean AP) a configuration can trail the best before it's abandoned, or None to never abandon
+        :param df: dataframe,
+            the data to use instead of the cleaned dataset
+        """
+        self.data = ML.Model(start_yr, end_yr, None, df=df)
+        self.configs = configs
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(configs) * len(self.data.years[5:])))
+        self.min_folds = min_folds
+        self.tolerance = tolerance
+
+        # We start at the 5th earliest year, so we can have at least 5 years' of data for training
+        self.test_years = self.data.years[5:]
+        self.aps = [{} for _ in configs]
+        self.seconds = [0.0] * len(configs)
+        self.abandoned = {} # The number of seasons each abandoned configuration was judged on
+        self.checked = 0
+
+    def fold_ap(self, year, predictions):
+        """
+        :param year: int,
+            the season predicted
+        :param predictions: numpy array,
+            the predicted "Share" of each of its rows
+        :return: float,
+            the average precision of the predictions
+        """
+        start, stop = self.data.offsets[year]
+        return Metrics.average_precisions(np.zeros(stop - start, dtype="int64"),
+                                          self.data.df["Player"].to_numpy()[start:stop],
+                                          self.data.share[start:stop], predictions).iloc[0]
+
+    def record(self, config, year, predictions, seconds):
+        """
+        Scores a finished task
+        :return: list,
+            the configurations (int) abandoned as a result
+        """
+        if config in self.abandoned:
+            return []
+        self.aps[config][year] = self.fold_ap(year, predictions)
+        self.seconds[config] += seconds
+        return self.abandon()
+
+    def abandon(self):
+        """
+        Abandons losing configurations, for every season all running configurations have now finished
+        :return: list,
+            the configurations (int) abandoned
+        """
+        running = [config for config in range(len(self.configs)) if config not in self.abandoned]
+        newly_abandoned = []
+        while self.tolerance is not None and self.checked < len(self.test_years) and running:
+            if not all(self.test_years[self.checked] in self.aps[config] for config in running):
+                break
+            self.checked += 1
+            if self.checked < self.min_folds or self.checked == len(self.test_years):
+                continue
+            seasons = self.test_years[:self.checked]
+            means = {config: np.mean([self.aps[config][year] for year in seasons]) for config in running}
+            best = max(means.values())
+            for config in running:
+                if means[config] < best - self.tolerance:
+                    self.abandoned[config] = self.checked
+                    newly_abandoned.append(config)
+            running = [config for config in running if config not in self.abandoned]
+        return newly_abandoned
+
+    def run(self):
+        """
+        :return: dataframe,
+            the leaderboard: each configuration's mean AP, the number of seasons it was tested on,
+            whether it was abandoned and its fitting time, best first
+        """
+        tasks = [(config, year) for year in self.test_years for config in range(len(self.configs))]
+        start = time.perf_counter()
+        if self.workers <= 1:
+            for config, year in tasks:
+                if config not in self.abandoned:
+                    model = estimator(*self.configs[config])
+                    self.record(config, year, *timed_fold(model, year, self.data.features, self.data.share,
+                                                          self.data.offsets))
+        else:
+            self.run_parallel(tasks)
+        self.wall_seconds = time.perf_counter() - start
+        return self.leaderboard()
+
+    def run_parallel(self, tasks):
+        """
+        Runs the tasks in a pool of worker processes sharing a memory-mapped copy of the data
+        :param tasks: list,
+            the (configuration, season) tasks, in the order they're queued
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            np.save(f"{directory}/features.npy", self.data.features)
+            np.save(f"{directory}/share.npy", self.data.share)
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=ML.open_shared,
+                                     initargs=(directory, self.data.offsets)) as executor:
+                futures = {executor.submit(shared_timed_fold, estimator(*self.configs[config]), year): (config, year)
+                           for config, year in tasks}
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future.cancelled():
+                            continue
+                        config, year = futures[future]
+                        for loser in self.record(config, year, *future.result()):
+                            # Tasks that haven't started yet are dropped, running ones are ignored when they finish
+                            for other in pending:
+                                if futures[other][0] == loser:
+                                    other.cancel()
+
+    def leaderboard(self):
+        """
+        :return: dataframe,
+            a row for each configuration, finished ones first, each ordered by mean AP
+        """
+        rows = []
+        for config, (name, params) in enumerate(self.configs):
+            # An abandoned configuration is scored on the seasons it was judged on, even if a worker
+            # finished some later ones before it was abandoned
+            seasons = self.test_years[:self.abandoned.get(config, len(self.test_years))]
+            aps = [self.aps[config][year] for year in seasons]
+            rows.append({"Estimator": name, "Params": json.dumps(params, sort_keys=True),
+                         "Mean AP": sum(aps) / len(aps) if aps else np.nan, "Seasons": len(aps),
+                         "Abandoned": config in self.abandoned, "Fit seconds": round(self.seconds[config], 3)})
+        board = pd.DataFrame(rows)
+        return board.sort_values(["Abandoned", "Mean AP"], ascending=[True, False], kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtests a grid of model configurations and ranks them by mean AP")
+    parser.add_argument("--start", type=int, default=None, help="first season of data (defaults to the earliest)")
+    parser.add_argument("--end", type=int, default=None, help="last season of data (defaults to the latest)")
+    parser.add_argument("--grid", help='JSON file of {"estimator": {"parameter": [values]}}, defaults to DEFAULT_GRID')
+    parser.add_argument("--samples", type=int, help="random configurations per estimator, instead of the full grid")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-folds", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=None, help="mean AP a configuration may trail the best by")
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    first_yr, last_yr = Utils.unique_yrs()
+    sweep = Sweep(args.start or first_yr, args.end or last_yr, configurations(grid, args.samples, args.seed),
+                  args.workers, args.min_folds, args.tolerance)
+    with pd.option_context("display.width", 200, "display.max_colwidth", 80):
+        print(sweep.run().to_string())
+    print(f"\n{len(sweep.configs)} configurations x {len(sweep.test_years)} seasons on {sweep.workers} worker(s) "
+          f"in {sweep.wall_seconds:.1f}s")
@@ -0,0 +1,138 @@
+import argparse, os, shutil, numpy as np, pandas as pd
+
+# Generates scraped-looking MVP, per-game and team data at any multiple of the shipped data's size, for
+# benchmarks. The shipped seasons are the template: each copy of them gets its own block of (consecutive)
+# seasons after the real ones, its own players, and slightly different stats, so copies aren't identical.
+# The files have the same columns as the scrapers' output, including what DataCleaner cleans away:
+# traded players' "2TM" rows, the "Rk" column, and the playoff markers on team names
+
+# The per-game columns that are counts or labels rather than measured stats, so they aren't varied
+FIXED_COLUMNS = ["Player", "Age", "Team", "Pos", "G", "GS", "Awards", "year"]
+
+def generate(scale, root, seed=0, traded=0.1, csv_root="../csvFiles"):
+    """
+    Writes synthetic data to {root}/csvFiles, laid out like the repository's csvFiles directory, and creates
+    {root}/Scripts, so DataCleaner and ML can be run on it from there
+    :param scale: int,
+        how many copies of the shipped seasons to generate
+    :param root: str,
+        directory the data is written to
+    :param seed: int,
+        seed for the generated stats and trades, so the same data is generated every time
+    :param traded: float,
+        share of player seasons split into a "2TM" row plus a row for each of two teams
+    :param csv_root: str,
+        directory containing the shipped (clean) .csv files used as the template
+    :return: dict,
+        the number of rows (int) in each file (str)
+    """
+    rng = np.random.default_rng(seed)
+    Per_game = pd.read_csv(f"{csv_root}/Per-game (clean).csv")
+    Teams = pd.read_csv(f"{csv_root}/Team-stats (clean).csv", index_col=0)
+    MVPs = pd.read_csv(f"{csv_root}/MVPs.csv")
+    span = int(Per_game["year"].max() - Per_game["year"].min() + 1)
+
+    pg_copies, team_copies, MVP_copies = [], [], []
+    for copy in range(scale):
+        pg_copies.append(vary_stats(renamed(Per_game, copy, span), rng))
+        team_copies.append(renamed(Teams, copy, span))
+        MVP_copies.append(renamed(MVPs, copy, span))
+    Per_game = split_traded(pd.concat(pg_copies, ignore_index=True), traded, seed)
+    Teams = playoff_markers(pd.concat(team_copies))
+    MVPs = pd.concat(MVP_copies, ignore_index=True)
+
+    os.makedirs(f"{root}/csvFiles", exist_ok=True)
+    os.makedirs(f"{root}/Scripts", exist_ok=True)
+    Per_game.to_csv(f"{root}/csvFiles/Per-game.csv", index=False)
+    Teams.to_csv(f"{root}/csvFiles/Team-stats.csv", index=False)
+    MVPs.to_csv(f"{root}/csvFiles/MVPs.csv", index=False)
+    shutil.copy(f"{csv_root}/nicknames.csv", f"{root}/csvFiles/nicknames.csv")
+    return {"Per-game": len(Per_game), "Team-stats": len(Teams), "MVPs": len(MVPs)}
+
+def renamed(df, copy, span):
+    """
+    :param df: dataframe,
+        shipped data, with a "year" column (and a "Player" column for player data)
+    :param copy: int,
+        which copy this is (0 is the shipped data as it is)
+    :param span: int,
+        the number of seasons in the shipped data
+    :return: dataframe,
+        the data moved to the copy's block of seasons, with each player renamed for the copy (e.g.
+        "Michael Jordan 2"), so every copy has its own players whose careers last as long as the originals'
+    """
+    df = df.assign(year=df["year"] + copy * span)
+    if copy and "Player" in df:
+        df["Player"] = df["Player"] + f" {copy + 1}"
+    return df
+
+def vary_stats(Per_game, rng, noise=0.05):
+    """
+    :param Per_game: dataframe,
+        per-game data
+    :param rng: numpy Generator,
+        source of the random variation
+    :param noise: float,
+        the typical relative change of each stat
+    :return: dataframe,
+        the data with each stat scaled by its own random factor (around 1), rounded like the website's
+        (3 decimal places for percentages, 1 for everything else)
+    """
+    Per_game = Per_game.copy()
+    for col in Per_game.columns.difference(FIXED_COLUMNS):
+        varied = Per_game[col] * rng.lognormal(0, noise, len(Per_game))
+        if col.endswith("%"):
+            varied = varied.clip(upper=1)
+        Per_game[col] = varied.round(3 if col.endswith("%") else 1)
+    return Per_game
+
+def split_traded(Per_game, traded=0.1, seed=0):
+    """
+    Rebuilds scraped-looking per-game data from the clean per-game data, by splitting a share of
+    player seasons into a "2TM" row plus a row for each of two teams (like a traded player's)
+    :param Per_game: dataframe,
+        clean per-game data
+    :param traded: float,
+        share of player seasons that are split
+    :param seed: int,
+        seed for choosing the seasons
+    :return: dataframe,
+        per-game data with an "Rk" column and multiple rows for traded players
+    """
+    rng = np.random.default_rng(seed)
+    split = rng.random(len(Per_game)) < traded
+    totals = Per_game[split].assign(Team="2TM")
+    first_team = Per_game[split].assign(Team=Per_game["Team"][split].sample(frac=1, random_state=seed).to_numpy())
+    second_team = Per_game[split]
+
+    # Each season's rows are in the website's order: the "2TM" row, then the teams in the order played for
+    raw = pd.concat([Per_game[~split].assign(part=0), totals.assign(part=0), first_team.assign(part=1),
+                     second_team.assign(part=2)]).rename_axis("row")
+    raw = raw.sort_values(["row", "part"], kind="stable").drop(columns="part").reset_index(drop=True)
+    raw.insert(0, "Rk", np.arange(1, len(raw) + 1))
+    return raw
+
+def playoff_markers(Teams):
+    """
+    :param Teams: dataframe,
+        clean team data
+    :return: dataframe,
+        the data as it's scraped, with playoff teams' names marked with "*" and their seed,
+        e.g. "Orlando Magic*\xa0(2)". The clean data doesn't say which conference a team was in,
+        so the 16 best teams each season make the playoffs, seeded 1 to 8 in pairs
+    """
+    Teams = Teams.reset_index(drop=True)
+    rank = Teams.groupby("year")["W/L%"].rank(ascending=False, method="first").astype(int)
+    seed = ((rank + 1) // 2).astype(str)
+    Teams["Team"] = Teams["Team"].where(rank > 16, Teams["Team"] + "*\xa0(" + seed + ")")
+    return Teams
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates scraped-looking data at a multiple of the shipped data's size")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--out", required=True, help="directory to write {out}/csvFiles to")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--traded", type=float, default=0.1)
+    args = parser.parse_args()
+    print(generate(args.scale, args.out, args.seed, args.traded))
@@ -0,0 +1,167 @@
+import re
+from ftfy import fix_text
+from lxml import etree, html as lxml_html
+from pandas.io.parsers import TextParser
+
+# A faster alternative to fixing moji-bake in the whole document, building a BeautifulSoup of it,
+# re-serializing the table and handing it to pd.read_html.
+#
+# The page is parsed once with lxml, moji-bake is fixed only in the text of cells that are kept,
+# and the DataFrame is built straight from those cells. Cells are read, and their types inferred,
+# exactly the way pd.read_html does it, so both paths give identical DataFrames
+
+# Same as pandas.io.html: newlines and runs of whitespace become a single space
+WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+# The CSS selectors used by the scrapers are all of the form "tag#id" or "tag.class"
+SIMPLE_CSS = re.compile(r"^(\w+)(?:#([\w-]+)|\.([\w-]+))?$")
+
+def css_to_xpath(css):
+    """
+    :param css: str,
+        a "tag", "tag#id" or "tag.class" CSS selector
+    :return: str,
+        the equivalent XPath expression, matching anywhere below the current element
+    """
+    match = SIMPLE_CSS.match(css)
+    if not match:
+        raise ValueError(f"Unsupported CSS selector: {css}")
+    tag, element_id, css_class = match.groups()
+    if element_id:
+        return f".//{tag}[@id='{element_id}']"
+    if css_class:
+        return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+    return f".//{tag}"
+
+class SoupElement(lxml_html.HtmlElement):
+    """
+    Gives lxml elements the few BeautifulSoup methods the scrapers use, so each scraper's
+    table_selector()/unwanted_elements_sel() overrides work unchanged on either parser
+    """
+    def select(self, css):
+        return self.xpath(css_to_xpath(css))
+
+    def select_one(self, css):
+        found = self.select(css)
+        return found[0] if found else None
+
+    def decompose(self):
+        self.drop_tree()
+
+PARSER = lxml_html.HTMLParser(recover=True)
+PARSER.set_element_class_lookup(etree.ElementDefaultClassLookup(element=SoupElement))
+
+def document(raw_html):
+    """
+    :param raw_html: str,
+        raw HTML of a page, moji-bake and all
+    :return: lxml element,
+        the root of the parsed page
+    """
+    return lxml_html.document_fromstring(raw_html, parser=PARSER)
+
+def cell_text(cell):
+    """
+    :param cell: lxml element,
+        a <td> or <th>
+    :return: str,
+        the cell's text, with moji-bake fixed and whitespace tidied like pd.read_html does
+    """
+    text = cell.text_content()
+
+    # Most cells are plain numbers, which ftfy would leave alone anyway
+    if not (text.isascii() and text.isprintable()):
+        # The text is already unescaped by lxml, so ftfy mustn't unescape it a second time
+        text = fix_text(text, unescape_html=False)
+    return WHITESPACE.sub(" ", text.strip())
+
+def expand_rows(rows):
+    """
+    Turns <tr> elements into lists of cell text, copying cells with a rowspan or colspan
+    into the cells they cover (the same as pd.read_html)
+    :param rows: list,
+        <tr> elements
+    :return: list,
+        a list of cell text (str) for each row
+    """
+    all_texts = []
+    remainder = [] # (index, text, rows left) for cells spanning down from previous rows
+    for tr in rows:
+        texts = []
+        next_remainder = []
+        index = 0
+        for td in tr.xpath("./td|./th"):
+            while remainder and remainder[0][0] <= index:
+                prev_i, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+                index += 1
+            text = cell_text(td)
+            rowspan = int(td.get("rowspan") or 1)
+            colspan = int(td.get("colspan") or 1)
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+
+    while remainder:
+        next_remainder = []
+        texts = []
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+    return all_texts
+
+def table_to_frame(table):
+    """
+    Builds a DataFrame directly from an lxml <table>, as pd.read_html would
+    :param table: lxml element,
+        the <table> (with any unwanted rows already removed)
+    :return: dataframe,
+        the table's data
+    """
+    # Hidden elements aren't part of the table pd.read_html sees
+    for element in table.xpath(".//style"):
+        element.drop_tree()
+    for element in table.xpath(".//*[@style]"):
+        if "display:none" in element.get("style", "").replace(" ", ""):
+            element.drop_tree()
+    for br in table.xpath(".//br"):
+        br.tail = "\n" + (br.tail or "")
+
+    header_rows = []
+    for thead in table.xpath(".//thead"):
+        header_rows.extend(thead.xpath("./tr"))
+        if thead.xpath("./td|./th"):
+            header_rows.append(thead)
+    body_rows = table.xpath(".//tbody//tr") + table.xpath("./tr")
+    footer_rows = table.xpath(".//tfoot//tr")
+
+    # Without a <thead>, rows made up only of <th> cells at the top are the header
+    if not header_rows:
+        while body_rows and all(cell.tag == "th" for cell in body_rows[0].xpath("./td|./th")):
+            header_rows.append(body_rows.pop(0))
+
+    head, body, foot = expand_rows(header_rows), expand_rows(body_rows), expand_rows(footer_rows)
+    header = None
+    if head:
+        body = head + body
+        header = 0 if len(head) == 1 else [i for i, row in enumerate(head) if any(row)]
+    body += foot
+
+    # Pads out "ragged" rows
+    width = max(len(row) for row in body)
+    body = [row + [""] * (width - len(row)) for row in body]
+    with TextParser(body, header=header, thousands=",") as parser:
+        return parser.read()
@@ -2,8 +2,14 @@ import datetime, pandas as pd, os
 from pathlib2 import Path
 
 def unique_yrs():
-    df = pd.read_csv("../csvFiles/mvp-pg-team (clean).csv")
-    years = df["year"].unique().tolist()
+    # Storage loads pyarrow, so it's only imported when it's needed, rather than by everything importing Utils
+    import Storage
+
+    # The columnar dataset lists its seasons in its metadata, so no data has to be loaded
+    if Storage.dataset_exists("mvp-pg-team"):
+        years = Storage.dataset_years("mvp-pg-team")
+    else:
+        years = pd.read_csv("../csvFiles/mvp-pg-team (clean).csv", usecols=["year"])["year"].unique().tolist()
     first_year = min(years)
     last_yr = max(years)
     return first_year, last_yr
@@ -1,20 +1,115 @@
-import requests, pandas as pd, time, Utils
+import requests, pandas as pd, asyncio, httpx, os, Utils, TableParser, Profiling
+from collections import deque
+from RateControl import AdaptiveRateController, ScrapeError, Page
+from BrowserPool import BrowserPool
+from SeasonPartitions import SeasonPartitions
 from ftfy import fix_text
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from pathlib2 import Path
 from bs4 import BeautifulSoup as bs
 from io import StringIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+BASE_URL = 'https://www.basketball-reference.com'
 
 def run():
     start_year, end_year = Utils.year_input("scraping")
     user_years = list(range(start_year, end_year+1))
-    MVP_scrape = MVPScraper(user_years)
-    MVP_scrape.scrape()
-    pg_scrape = PerGameScraper(user_years)
-    pg_scrape.scrape()
-    team_scrape = TeamScraper(user_years)
-    team_scrape.scrape()
+    run_concurrent(user_years)
+
+def run_concurrent(years, requests_per_minute=20, max_connections=10, browsers=2, parse_workers=1,
+                   **scraper_kwargs):
+    """
+    Scrapes MVP, per-game and team data for every year at the same time
+    :param years: list,
+        a list of the years to scrape data from
+    :param requests_per_minute: int,
+        the starting (and highest) request rate shared by all three scrapers
+        (basketball-reference allows 20 a minute)
+    :param max_connections: int,
+        the maximum number of pooled keep-alive connections to the host
+    :param browsers: int,
+        the number of headless browser sessions shared by scrapers that need rendered pages
+    :param parse_workers: int,
+        the number of processes parsing the saved pages (None uses every core)
+    :param scraper_kwargs:
+        passed on to each scraper, e.g. base_url to point at a local FixtureServer
+    """
+    # All three scrapers hit the same host, so they share a single rate controller and browser pool
+    scraper_kwargs.setdefault('rate_controller', AdaptiveRateController(requests_per_minute))
+    with Profiling.span("scrape", seasons=len(years)), BrowserPool(size=browsers) as pool:
+        scraper_kwargs.setdefault('browser_pool', pool)
+        scrapers = [MVPScraper(years, **scraper_kwargs),
+                    PerGameScraper(years, **scraper_kwargs),
+                    TeamScraper(years, **scraper_kwargs)]
+        asyncio.run(scrape_all(scrapers, max_connections, parse_workers))
+
+def scraped(years, **scraper_kwargs):
+    """
+    :param years: list,
+        a list of the years to scrape data from
+    :param scraper_kwargs:
+        passed on to each scraper, e.g. html_root
+    :return: boolean,
+        whether every year's MVP, per-game and team page is saved, and has been parsed as it is now,
+        so scraping them again would change nothing
+    """
+    scrapers = [MVPScraper(years, **scraper_kwargs), PerGameScraper(years, **scraper_kwargs),
+                TeamScraper(years, **scraper_kwargs)]
+    return all(Utils.data_exists(scraper.file_path(year)) and scraper.partitions.complete(year, scraper.file_path(year))
+               for scraper in scrapers for year in years)
+
+async def scrape_all(scrapers, max_connections, parse_workers=1):
+    """
+    Downloads every missing page for all scrapers concurrently, parsing and saving each season
+    as soon as its page is ready, then combines each scraper's seasons into its .csv file
+    :param scrapers: list,
+        the Scraper objects to run
+    :param max_connections: int,
+        the maximum number of pooled keep-alive connections to the host
+    :param parse_workers: int,
+        the number of processes parsing the saved pages (None uses every core)
+    """
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+    # Parsing is CPU-bound, so it's kept off the event loop: in a single worker thread, or a pool of
+    # processes. The downloads carry on while it runs, and a season's dataframe is only held until it's saved
+    if parse_workers == 1:
+        executor = ThreadPoolExecutor(max_workers=1)
+    else:
+        executor = ProcessPoolExecutor(max_workers=parse_workers)
+    with executor:
+        async with httpx.AsyncClient(limits=limits, timeout=30, follow_redirects=True) as client:
+            results = await asyncio.gather(*(scraper.pipeline_async(client, executor) for scraper in scrapers))
+
+    # Seasons that failed weren't saved, so re-running picks up where this run left off
+    failures = [failure for result in results for failure in result]
+    if failures:
+        for directory_name, year, error in failures:
+            print(f"Failed to scrape {directory_name} data for {year}: {error}")
+        raise ScrapeError(f"{len(failures)} season(s) could not be scraped")
+
+    for scraper in scrapers:
+        scraper.csv_saver()
+
+def parse_year(scraper_cls, settings, year):
+    """
+    Parses a single year's saved page inside a worker process (or thread). Scrapers hold unpicklable
+    objects (locks, browsers), so each worker builds its own from the class and settings
+    :param scraper_cls: class,
+        the Scraper subclass doing the parsing
+    :param settings: dict,
+        keyword arguments for the scraper, e.g. html_root and parser
+    :param year: int,
+        integer representing current year of data being parsed
+    :return: tuple,
+        A dataframe containing data for the year, and how long parsing it took (see Profiling.elapsed)
+    """
+    started = Profiling.timer()
+    try:
+        return scraper_cls([year], **settings).dataframe_retriever(year), Profiling.elapsed(started)
+    except Exception as e:
+        # Some parser errors can't be pickled back to the main process, so only their message is sent
+        raise ScrapeError(f"{type(e).__name__}: {e}") from None
 
 class Scraper:
     """
@@ -32,13 +127,38 @@ class Scraper:
 
     Child classes simply override the parent class method, when there are one of these variations
     """
-    def __init__(self, years):
+    def __init__(self, years, base_url=BASE_URL, html_root='../rawHTML', csv_root='../csvFiles',
+                 rate_controller=None, browser_pool=None, parser='soup'):
         """
         A selection of these variables are overridden, depending on the type of data web scraping
         :param years: list,
             a list of the years to scrape data from
+        :param base_url: str,
+            the website to scrape from, e.g. a local FixtureServer's URL when testing
+        :param html_root: str,
+            directory the raw HTML of each page is saved to
+        :param csv_root: str,
+            directory the final .csv file is saved to
+        :param rate_controller: AdaptiveRateController,
+            paces requests to the website, shared between scrapers hitting the same host
+        :param browser_pool: BrowserPool,
+            headless browsers for scrapers that need rendered pages. When not given, a
+            single-browser pool is created the first time a page needs rendering
+        :param parser: str,
+            'soup' fixes moji-bake in the whole page and parses it with BeautifulSoup + pd.read_html,
+            'lxml' parses it once with lxml and only fixes the cells that are kept (see TableParser).
+            Both give identical DataFrames
         """
         self.years = years
+        self.base_url = base_url
+        self.html_root = html_root
+        self.csv_root = csv_root
+        self.rate_controller = rate_controller or AdaptiveRateController()
+        self.session = requests.Session() # Reuses the connection to the website between years
+        self.browser_pool = browser_pool
+        self.owns_pool = False # Whether this scraper created (and so must close) its browser pool
+        self.use_browser = False # Whether pages need rendering in a browser, rather than just fetching
+        self.parser = parser
         self.directory_name = None # The directory name for the current type of data being scraped
         self.URL = None
         self.table_CSS = None # CSS selector for the table containing the desired data
@@ -46,14 +166,13 @@ class Scraper:
         self.unwanted_tr_CSS = None # CSS selector for unwanted table rows
         self.unwanted_column = None # CSS selector for unwanted columns
 
-    def scrape(self):
+    def scrape(self, workers=1):
         """
-        Iterates through each year in the specified range (list), scraping specified data
-        and saving into a DataFrame. Appends all dataframes into a list, then
-        concatenates them and saves to a .csv file
+        Iterates through each year in the specified range (list), scraping specified data.
+        Each year's data is saved as soon as it's parsed, then every year is combined into a .csv file
+        :param workers: int,
+            the number of processes parsing the saved pages (None uses every core)
         """
-        dfs = []
-
         # Sees if directory for data type already exists
         self.directory_exists()
         for year in self.years:
@@ -63,13 +182,146 @@ class Scraper:
             if not data_exists:
 
                 # Scrapes website's HTML containing desired data
-                self.html_saver(year)
+                with Profiling.span("download", self.directory_name, year=year):
+                    self.html_saver(year)
+        self.close()
+
+        # Years that were already parsed from the current pages are skipped
+        stale = [year for year in self.years if not self.partitions.complete(year, self.file_path(year))]
+        for year, df in self.stream_years(workers, stale):
+            with Profiling.span("save", self.directory_name, year=year):
+                self.partitions.write(year, df)
+        self.csv_saver()
+
+    def parse_years(self, workers=1):
+        """
+        Gets a dataframe from each year's saved HTML
+        :param workers: int,
+            the number of processes to parse with (1 parses in this process, None uses every core)
+        :return: list,
+            a dataframe for each year, in year order
+        """
+        return [df for _, df in self.stream_years(workers)]
 
-            # Gets df of data from HTML
-            df = self.dataframe_retriever(year)
-            dfs.append(df)
-        complete_df = pd.concat(dfs)
-        complete_df.to_csv('../csvFiles/{}.csv'.format(self.directory_name), index=False)
+    def stream_years(self, workers=1, years=None):
+        """
+        Parses each year's saved HTML, handing over each year's dataframe as soon as it (and every year
+        before it) is ready. Once the pages are cached this is purely CPU-bound, so the years can be fanned
+        out across a pool of processes. Only a couple of years per worker are parsed ahead of the one
+        being handed over, so memory use doesn't grow with the number of years
+        :param workers: int,
+            the number of processes to parse with (1 parses in this process, None uses every core)
+        :param years: list,
+            the years to parse, or None for all of them
+        :return: generator,
+            a (year (int), dataframe) tuple for each year, in year order. Once every year has been tried,
+            a ScrapeError is raised if any of them failed
+        """
+        years = self.years if years is None else years
+        failures = []
+        if workers == 1:
+            for year in years:
+                try:
+                    with Profiling.span("parse", self.directory_name, year=year):
+                        df = self.dataframe_retriever(year)
+                except Exception as e:
+                    failures.append((year, ScrapeError(f"{type(e).__name__}: {e}")))
+                    continue
+                yield year, df
+        else:
+            settings = self.parse_settings()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Futures are handed over in submission order, so the output doesn't depend on
+                # which worker finishes first
+                queued = iter(years)
+                futures = deque((year, executor.submit(parse_year, type(self), settings, year))
+                                for _, year in zip(range(2 * (workers or os.cpu_count() or 1)), queued))
+                while futures:
+                    year, future = futures.popleft()
+                    next_year = next(queued, None)
+                    if next_year is not None:
+                        futures.append((next_year, executor.submit(parse_year, type(self), settings, next_year)))
+                    if future.exception():
+                        failures.append((year, future.exception()))
+                    else:
+                        df, timing = future.result()
+                        Profiling.record("parse", self.directory_name, timing, year=year)
+                        yield year, df
+
+        # Reports every year that failed, rather than stopping at the first
+        if failures:
+            for year, error in failures:
+                print(f"Failed to parse {self.directory_name} data for {year}: {error}")
+            raise ScrapeError(f"{len(failures)} year(s) of {self.directory_name} data could not be parsed")
+
+    def parse_settings(self):
+        """
+        :return: dict,
+            the settings a worker needs to parse a page the same way as this scraper
+        """
+        return {'html_root': self.html_root, 'parser': self.parser}
+
+    @property
+    def partitions(self):
+        """
+        :return: SeasonPartitions,
+            where each year's parsed data is saved
+        """
+        return SeasonPartitions(self.directory_name, f'{self.csv_root}/scraped')
+
+    def close(self):
+        """
+        Quits any browsers this scraper launched itself
+        """
+        if self.owns_pool:
+            self.browser_pool.close()
+            self.browser_pool = None
+            self.owns_pool = False
+
+    async def pipeline_async(self, client, executor):
+        """
+        Concurrently scrapes every year that hasn't already been parsed from its current page, downloading
+        the pages that aren't saved locally
+        :param client: httpx.AsyncClient,
+            client holding the pool of keep-alive connections
+        :param executor: Executor,
+            pool the pages are parsed in
+        :return: list,
+            a (directory name, year, error) tuple for each year that couldn't be scraped
+        """
+        self.directory_exists()
+        stale = [year for year in self.years if not self.partitions.complete(year, self.file_path(year))]
+        results = await asyncio.gather(*(self.season_saver_async(client, executor, year) for year in stale),
+                                       return_exceptions=True)
+        return [(self.directory_name, year, result) for year, result in zip(stale, results)
+                if isinstance(result, Exception)]
+
+    async def season_saver_async(self, client, executor, year):
+        """
+        Downloads a year's page if it isn't saved locally, then parses it and saves the year's data
+        :param client: httpx.AsyncClient,
+            client holding the pool of keep-alive connections
+        :param executor: Executor,
+            pool the page is parsed in
+        :param year: int,
+            integer representing current year of data being scraped
+        """
+        async with Profiling.async_span("season", self.directory_name, year=year):
+            if not Utils.data_exists(self.file_path(year)):
+                async with Profiling.async_span("download", self.directory_name, year=year):
+                    await self.html_saver_async(client, year)
+            df, timing = await asyncio.get_running_loop().run_in_executor(executor, parse_year, type(self),
+                                                                          self.parse_settings(), year)
+            Profiling.record("parse", self.directory_name, timing, year=year)
+            with Profiling.span("save", self.directory_name, year=year):
+                self.partitions.write(year, df)
+
+    def csv_saver(self):
+        """
+        Combines the saved data for each year into a .csv file
+        """
+        with Profiling.span("combine", self.directory_name):
+            self.partitions.combine('{}/{}.csv'.format(self.csv_root, self.directory_name), self.years)
         print(f"Done processing {self.directory_name} data! \n")
 
     def dataframe_retriever(self, year):
@@ -85,19 +337,32 @@ class Scraper:
         table = self.table_retriever(year)
 
         # Turns table into a dataframe
-        df = pd.read_html(StringIO(str(table)))[0]
+        df = self.frame_from_table(table)
         self.column_modifier(df, year)
         return df
 
+    def frame_from_table(self, table):
+        """
+        :param table: HTML element,
+            table from raw HTML, either a bs4 or an lxml element depending on the parser
+        :return: dataframe,
+            the table's data
+        """
+        if self.parser == 'lxml':
+            with Profiling.span("table_to_frame", self.directory_name):
+                return TableParser.table_to_frame(table)
+        with Profiling.span("read_html", self.directory_name):
+            return pd.read_html(StringIO(str(table)))[0]
+
     def directory_exists(self):
         """
         Checks if directory to hold data already exists, and creates it if not
         """
-        directory_path = Path(f'../rawHTML/{self.directory_name}')
+        directory_path = Path(f'{self.html_root}/{self.directory_name}')
         if directory_path.exists():
             pass
         else:
-            directory_path.mkdir()
+            directory_path.mkdir(parents=True)
 
     def file_path(self, year):
         """
@@ -106,7 +371,7 @@ class Scraper:
         :return: str,
             file path to store data in, based on current year
         """
-        return f'../rawHTML/{self.directory_name}/{year}.html'
+        return f'{self.html_root}/{self.directory_name}/{year}.html'
 
     def table_retriever(self, year):
         """
@@ -119,13 +384,25 @@ class Scraper:
 
         # encoding='utf-8' specifies what to use to encode/decode the file
         with open(self.file_path(year), encoding='utf-8') as f:
+            html = f.read()
+        if self.parser == 'lxml':
+
+            # Moji-bake is fixed later, only in the cells that are kept
+            with Profiling.span("build tree", self.directory_name, year=year):
+                doc = TableParser.document(html)
+            print(f'Processing {year} data...')
+            with Profiling.span("select table", self.directory_name, year=year):
+                return self.table_selector(doc)
 
-            # Fixes any moji-bake
-            fixed = fix_text(f.read())
+        # Fixes any moji-bake
+        with Profiling.span("fix mojibake", self.directory_name, year=year):
+            fixed = fix_text(html)
 
-            # Turn into a soup for parsing
+        # Turn into a soup for parsing
+        with Profiling.span("build soup", self.directory_name, year=year):
             soup = bs(fixed, features='html.parser')
-            print(f'Processing {year} data...')
+        print(f'Processing {year} data...')
+        with Profiling.span("select table", self.directory_name, year=year):
             return self.table_selector(soup)
 
     def html_saver(self, year):
@@ -134,14 +411,33 @@ class Scraper:
         :param year: int,
             integer representing current year of data being scraped
         """
-        webpage = self.webpage_retriever(year)
+        # The rate controller paces requests, and raises rather than returning a bad page,
+        # so throttled or error responses never end up in the cache
+        self.page_saver(year, self.webpage_retriever(year))
 
-        # Pause in-between requests, to not overload target website
-        time.sleep(3)
+    async def html_saver_async(self, client, year):
+        """
+        Retrieves HTML from target website within the shared request budget, and writes to a file
+        :param client: httpx.AsyncClient,
+            client holding the pool of keep-alive connections
+        :param year: int,
+            integer representing current year of data being scraped
+        """
+        self.page_saver(year, await self.webpage_retriever_async(client, year))
 
-        # Opening with 'w+' means a new file will be created/an existing one will be overwritten
-        with open(self.file_path(year), 'w+', encoding='utf-8') as f:
-            f.write(webpage.text)
+    def page_saver(self, year, html):
+        """
+        Writes a page to a file
+        :param year: int,
+            integer representing current year of data being scraped
+        :param html: str,
+            HTML of the webpage
+        """
+        # Opening with 'w+' means a new file will be created/an existing one will be overwritten.
+        # It's written under a temporary name first, so an interrupted run can't leave half a page behind
+        with open(self.file_path(year) + '.tmp', 'w+', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(self.file_path(year) + '.tmp', self.file_path(year))
 
     def tr_remover(self, soup):
         """
@@ -158,7 +454,56 @@ class Scraper:
         return soup.select_one(self.table_CSS) # Uses CSS selectors to retrieve table from raw HTML
 
     def webpage_retriever(self, year):
-        return requests.get(self.URL.format(year))
+        """
+        :param year: int,
+            integer representing current year of data being scraped
+        :return: str,
+            HTML of the webpage
+        """
+        get = self.render if self.use_browser else self.session.get
+        response = self.rate_controller.fetch(get, self.URL.format(year), self.page_is_valid)
+        return response.text
+
+    def render(self, url):
+        """
+        Renders a page in one of the pool's headless browsers
+        :param url: str,
+            URL of the page to render
+        :return: Page,
+            HTML of fully rendered webpage. The browser doesn't expose the status code, so
+            error pages are caught by page_is_valid instead
+        """
+        if self.browser_pool is None:
+            self.browser_pool = BrowserPool(size=1)
+            self.owns_pool = True
+        return Page(200, {}, self.browser_pool.render(url))
+
+    async def webpage_retriever_async(self, client, year):
+        """
+        :param client: httpx.AsyncClient,
+            client holding the pool of keep-alive connections
+        :param year: int,
+            integer representing current year of data being scraped
+        :return: str,
+            HTML of the webpage
+        """
+        if self.use_browser:
+            # Selenium blocks, so it runs in a worker thread and the other scrapers keep going
+            return await asyncio.to_thread(self.webpage_retriever, year)
+        response = await self.rate_controller.fetch_async(client.get, self.URL.format(year), self.page_is_valid)
+        return response.text
+
+    def page_is_valid(self, html):
+        """
+        Checks a page actually contains the desired table, rather than e.g. an error page
+        :param html: str,
+            HTML of the webpage
+        :return: boolean,
+            whether the page is safe to save
+        """
+        # E.g. 'table#divs_standings_{}' -> 'divs_standings_'
+        table_id = self.table_CSS.split('#')[1].split('{')[0]
+        return f'id="{table_id}' in html
 
 
     @staticmethod
@@ -179,17 +524,17 @@ class MVPScraper(Scraper):
     """
     A class for functions that are specific to web scraping MVP data
     """
-    def __init__(self, years):
+    def __init__(self, years, **kwargs):
         """
         overrides variables (that are initialized in the parent class)
         that are required for scraping MVP data
         :param years: list,
             a list of the years to scrape data from
         """
-        super().__init__(years)
+        super().__init__(years, **kwargs)
         self.years = years
         self.directory_name = 'MVPs'
-        self.URL = 'https://www.basketball-reference.com/awards/awards_{}.html'
+        self.URL = self.base_url + '/awards/awards_{}.html'
         self.table_CSS = 'table#mvp'
         self.header_CSS = 'tr.over_header'
 
@@ -199,40 +544,21 @@ class PerGameScraper(Scraper):
     """
     A class for functions that are specific to web scraping Per-game data
     """
-    def __init__(self, years):
+    def __init__(self, years, **kwargs):
         """
         Overrides variables required for scraping Per-game data
         :param years: list,
             a list of the years to scrape data from
         """
-        super().__init__(years)
+        super().__init__(years, **kwargs)
         self.directory_name = 'Per-game'
-        self.URL = 'https://www.basketball-reference.com/leagues/NBA_{}_per_game.html'
+        self.URL = self.base_url + '/leagues/NBA_{}_per_game.html'
         self.table_CSS = 'table#per_game_stats'
         self.header_CSS = 'tr.thead'
         self.unwanted_tr = 'tr.norank'
 
-    def webpage_retriever(self, year):
-        """
-        Scrapes the rendered HTML of the page using Selenium
-        :param year: int,
-            integer representing current year of data being scraped
-        :return: HTML,
-            HTML of fully rendered webpage
-        """
-
-        # Launches a selenium service object to control the chrome webpage
-        service = Service(r"C:\Users\summe\PyCharmProjects\chromedriver-win64\chromedriver.exe")
-        driver = webdriver.Chrome(service=service)
-        driver.get(self.URL.format(year))
-
-        # Scrolls down in the explorer to render lazy HTML content
-        driver.execute_script("window.scrollTo(1, 10000)")
-
-        # Captures the HTML of our page after content is loaded
-        html = driver.page_source
-        driver.quit()
-        return html
+        # The per-game table is only fully rendered once the page's scripts have run
+        self.use_browser = True
 
     def unwanted_elements_sel(self, soup):
         """
@@ -251,15 +577,15 @@ class TeamScraper(Scraper):
     A class for functions that are specific to web scraping team data
     """
 
-    def __init__(self, years):
+    def __init__(self, years, **kwargs):
         """
         Overrides variables required for scraping team data
         :param years: list,
             a list of the years to scrape data from
         """
-        super().__init__(years)
+        super().__init__(years, **kwargs)
         self.directory_name = 'Team-stats'
-        self.URL = 'https://www.basketball-reference.com/leagues/NBA_{}_standings.html'
+        self.URL = self.base_url + '/leagues/NBA_{}_standings.html'
         self.table_CSS = 'table#divs_standings_{}'
         self.header_CSS = 'tr.thead'
         self.unwanted_column = '{} conference'
@@ -315,7 +641,7 @@ class TeamScraper(Scraper):
         tables = self.table_retriever(year)
 
         # Turns tables into dataframes and appends to a list
-        dfs = [pd.read_html(StringIO(str(table)))[0] for table in tables]
+        dfs = [self.frame_from_table(table) for table in tables]
         self.column_modifier(dfs, year)
 
         # Returns concatenated dataframes
@@ -1,9 +1,249 @@
-import DataCleaner, Webscraper, ML
+import argparse, json, sys
 
-if __name__ == "__main__":
-   # Commented out as webscraping functionality is down due to Basket ball reference receiving a large number of requests
-   #Webscraper.run()
-   DataCleaner.clean()
-   ML.predict()
+# Each command imports the modules it needs when it runs, so e.g. "clean" never loads selenium,
+# and "--help" loads nothing heavy at all. Run without a command for the interactive program
+
+def interactive(args):
+    import DataCleaner, ML
+    from ModelCache import ModelCache
+
+    # Commented out as webscraping functionality is down due to Basket ball reference receiving a large number of requests
+    #Webscraper.run()
+    DataCleaner.clean()
+    ML.predict(ModelCache() if args.cache else None)
+
+def scrape(args):
+    import Webscraper
+    settings = {"parser": args.parser}
+    if args.base_url:
+        settings["base_url"] = args.base_url
+    Webscraper.run_concurrent(list(range(args.start, args.end + 1)), args.rpm, args.connections, args.browsers,
+                              args.parse_workers, **settings)
+
+def clean(args):
+    import DataCleaner
+    DataCleaner.clean()
+
+def training_model(args, df=None):
+    """
+    :param args: Namespace,
+        the parsed command line
+    :param df: dataframe,
+        the cleaned dataset, when it's already in memory, otherwise it's loaded
+    :return: Model,
+        the model described by the command line's --start, --end, --estimator, --params, --no-cache, --compact
+        and --candidates
+    """
+    import ML, Estimators, Utils
+    from ModelCache import ModelCache
+    from Candidates import Candidates
+    first_yr, last_yr = Utils.unique_yrs() if df is None else (int(df["year"].min()), int(df["year"].max()))
+    params = json.loads(args.params) if isinstance(args.params, str) else args.params
+    try:
+        model = Estimators.estimator(args.estimator, params)
+    except (ValueError, TypeError) as e:
+        sys.exit(f"Invalid model: {e}")
+    return ML.Model(args.start or first_yr, args.end or last_yr, model, df, cache=None if args.no_cache else ModelCache(),
+                    compact=args.compact, candidates=Candidates(per_season=args.candidates) if args.candidates else None)
+
+def backtest(args):
+    backtest_report(training_model(args), args)
+
+def backtest_report(Predictor, args):
+    """
+    Backtests the model, printing its mean metrics and saving each season's to --metrics
+    :param Predictor: Model,
+        the model to backtest
+    :param args: Namespace,
+        the parsed command line
+    """
+    if Predictor.candidate_recall is not None:
+        candidate_report(Predictor.candidate_recall)
+    mean_ap, aps, predictions_df = Predictor.backtest(args.workers)
+    print(f"\nMean Average Precision: {mean_ap}")
+    for metric, value in Predictor.metrics.drop(columns="AP").mean().items():
+        print(f"Mean {metric}: {value:.4f}")
+    if args.metrics:
+        Predictor.metrics.to_csv(args.metrics)
+
+def candidate_report(recall):
+    """
+    Prints how far the candidates cut each season down, and whether any top-5 vote-getter was dropped
+    :param recall: dataframe,
+        from Candidates.recall()
+    """
+    print(f"\nCandidates: {recall['Candidates'].mean():.0f} of {recall['Players'].mean():.0f} players a season, "
+          f"top-5 recall {recall['Top-5 recall'].mean():.4f}, vote recall {recall['Vote recall'].mean():.4f}")
+    for year, missed in recall.loc[recall["Missed"] != "", "Missed"].items():
+        print(f"Dropped top-5 vote-getters in {year}: {missed}")
+
+def predict(args):
+    ranking_report(training_model(args), args)
+
+def ranking_report(Predictor, args):
+    """
+    Prints the model's predicted MVP ranking for each of --season
+    :param Predictor: Model,
+        the model to predict with
+    :param args: Namespace,
+        the parsed command line
+    """
+    for season in args.season:
+        if season not in Predictor.offsets:
+            sys.exit(f"No data for {season}, clean its data first")
+        print(f"\nPredicted MVP ranking for {season}:")
+        print(Predictor.season_ranking(season, args.top).to_string())
+
+def pipeline(args):
+    """
+    Runs scrape -> clean -> features -> backtest -> predict as a graph of stages (see Pipeline), each handing
+    its output to the next in memory, so e.g. the cleaned dataset is trained on without being read back
+    """
+    import DataCleaner
+    from Pipeline import Pipeline
+    stages = Pipeline(args.stage_workers)
+    after = []
+    if args.scrape:
+        import Webscraper
+        years = list(range(args.scrape[0], args.scrape[1] + 1))
+
+        # The three scrapers already run at the same time, sharing one rate budget, so scraping is a single stage
+        stages.add("scrape", lambda: Webscraper.run_concurrent(years, args.rpm, parser=args.parser),
+                   fresh=lambda: Webscraper.scraped(years))
+        after = ["scrape"]
+    DataCleaner.add_stages(stages, after)
+    stages.add("features", lambda df: training_model(args, df), after=["combine"])
+    stages.add("backtest", lambda Predictor: backtest_report(Predictor, args), after=["features"])
+    if args.season:
+        # The model is fitted by one stage at a time
+        stages.add("predict", lambda Predictor: ranking_report(Predictor, args), after=["backtest"], inputs=["features"])
+    stages.run()
 
+def model_arguments(parser):
+    """
+    Adds the arguments that pick the data and model to train
+    :param parser: ArgumentParser,
+        the command's parser
+    """
+    parser.add_argument("--start", type=int, help="first season of data (defaults to the earliest)")
+    parser.add_argument("--end", type=int, help="last season of data (defaults to the latest)")
+    parser.add_argument("--estimator", default="ridge",
+                        help="ridge, incremental-ridge, random-forest, hist-gradient-boosting or lambda-rank")
+    parser.add_argument("--params", help="the estimator's parameters, as JSON (defaults to its usual settings)")
+    parser.add_argument("--no-cache", action="store_true", help="retrain every season, instead of reusing cached models")
+    parser.add_argument("--compact", action="store_true", help="memory-budget mode: round the features to float32 (they're float64 otherwise)")
+    parser.add_argument("--candidates", type=int, nargs="?", const=40, metavar="N",
+                        help="only train on and score each season's N (default 40) most plausible MVP candidates")
 
+def arguments(argv=None):
+    """
+    Parses the command line. Options can also come from a JSON config file, with a section for
+    each command, e.g. {"backtest": {"estimator": "random-forest", "params": {"n_estimators": 50}}}.
+    Flags given on the command line take priority over the config file
+    :param argv: list,
+        the command line arguments (str), defaults to sys.argv
+    :return: Namespace,
+        the parsed arguments
+    """
+    config_parser = argparse.ArgumentParser(add_help=False)
+    config_parser.add_argument("--config", help="JSON file of options for each command")
+    parser = argparse.ArgumentParser(description="NBA MVP pipeline. Run without a command for the interactive program",
+                                     parents=[config_parser])
+    parser.add_argument("--cache", action="store_true",
+                        help="interactive program: reuse cached models, instead of retraining every season")
+    profiling = parser.add_argument_group("profiling", "record the wall time, CPU time and peak memory of each stage, "
+                                                       "scraper, season and backtest fold")
+    profiling.add_argument("--profile", action="store_true", help="print a summary of where the time went")
+    profiling.add_argument("--trace", help="JSON file to save every recorded span to")
+    profiling.add_argument("--chrome-trace", help="file to save a trace chrome://tracing or Perfetto can open to")
+    profiling.add_argument("--trace-memory", action="store_true",
+                           help="trace Python's allocations for each span's peak memory (slower)")
+    profiling.add_argument("--capture", metavar="SPAN", help="capture one span in detail, e.g. backtest or diagnostics")
+    profiling.add_argument("--capture-kind", default="cprofile", choices=["cprofile", "tracemalloc"])
+    profiling.add_argument("--capture-file", help="file the capture is saved to")
+    commands = parser.add_subparsers(dest="command")
+
+    scrape_parser = commands.add_parser("scrape", help="download and parse seasons from basketball-reference")
+    scrape_parser.add_argument("--start", type=int, required=True)
+    scrape_parser.add_argument("--end", type=int, required=True)
+    scrape_parser.add_argument("--rpm", type=int, default=20, help="starting (and highest) requests per minute")
+    scrape_parser.add_argument("--connections", type=int, default=10)
+    scrape_parser.add_argument("--browsers", type=int, default=2)
+    scrape_parser.add_argument("--parse-workers", type=int, default=1)
+    scrape_parser.add_argument("--parser", default="lxml", choices=["soup", "lxml"])
+    scrape_parser.add_argument("--base-url", help="e.g. a local FixtureServer")
+    scrape_parser.set_defaults(run=scrape)
+
+    clean_parser = commands.add_parser("clean", help="rebuild the cleaned dataset from the scraped data")
+    clean_parser.set_defaults(run=clean)
+
+    backtest_parser = commands.add_parser("backtest", help="walk-forward backtest, printing mean AP")
+    model_arguments(backtest_parser)
+    backtest_parser.add_argument("--workers", type=int, help="processes training seasons (defaults to every core)")
+    backtest_parser.add_argument("--metrics", help=".csv file to save each season's metrics to")
+    backtest_parser.set_defaults(run=backtest)
+
+    predict_parser = commands.add_parser("predict", help="predicted MVP ranking for seasons")
+    model_arguments(predict_parser)
+    predict_parser.add_argument("--season", type=int, nargs="+", required=True)
+    predict_parser.add_argument("--top", type=int, default=5)
+    predict_parser.set_defaults(run=predict)
+
+    pipeline_parser = commands.add_parser("pipeline", help="scrape, clean, backtest and predict in one run, "
+                                                           "handing each stage's output to the next in memory")
+    pipeline_parser.add_argument("--scrape", type=int, nargs=2, metavar=("START", "END"),
+                                 help="seasons to scrape first (seasons already scraped are skipped)")
+    pipeline_parser.add_argument("--rpm", type=int, default=20, help="starting (and highest) requests per minute")
+    pipeline_parser.add_argument("--parser", default="lxml", choices=["soup", "lxml"])
+    pipeline_parser.add_argument("--stage-workers", type=int, default=2, help="the most stages run at once")
+    model_arguments(pipeline_parser)
+    pipeline_parser.add_argument("--workers", type=int, help="processes training seasons (defaults to every core)")
+    pipeline_parser.add_argument("--metrics", help=".csv file to save each season's metrics to")
+    pipeline_parser.add_argument("--season", type=int, nargs="+", help="seasons to print the predicted ranking of")
+    pipeline_parser.add_argument("--top", type=int, default=5)
+    pipeline_parser.set_defaults(run=pipeline)
+
+    parser.set_defaults(run=interactive)
+
+    # The config file is read first, so its options become each command's defaults
+    # (and required options it gives no longer need a flag)
+    config_path, _ = config_parser.parse_known_args(argv)
+    if config_path.config:
+        with open(config_path.config) as f:
+            config = json.load(f)
+        for command, options in config.items():
+            if command not in commands.choices:
+                parser.error(f"unknown command '{command}' in config")
+            options = {name.replace("-", "_"): value for name, value in options.items()}
+            for action in commands.choices[command]._actions:
+                if action.dest in options:
+                    action.required = False
+            commands.choices[command].set_defaults(**options)
+    return parser.parse_args(argv)
+
+def run(args):
+    """
+    Runs the command, profiling it if any of the profiling options were given
+    :param args: Namespace,
+        the parsed command line
+    """
+    if not (args.profile or args.trace or args.chrome_trace or args.trace_memory or args.capture):
+        args.run(args)
+        return
+    import Profiling
+    profiler = Profiling.Profiler(args.trace_memory, args.capture, args.capture_kind, args.capture_file)
+
+    # What was recorded is still saved when the command fails part way, e.g. a scrape that hit the circuit breaker
+    try:
+        with profiler:
+            args.run(args)
+    finally:
+        print(f"\n{profiler.summary()}")
+        if args.trace:
+            profiler.save_json(args.trace)
+        if args.chrome_trace:
+            profiler.save_chrome_trace(args.chrome_trace)
+
+
+if __name__ == "__main__":
+    run(arguments())
@@ -0,0 +1,6 @@
+import os, sys
+
+# The scripts import each other as top-level modules (e.g. "import Utils"), as they do when run from Scripts/
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Scripts")
+CSV_ROOT = os.path.join(os.path.dirname(SCRIPTS), "csvFiles")
+sys.path.insert(0, SCRIPTS)
@@ -0,0 +1,46 @@
+# The row-by-row cleaning functions DataCleaner used before it was vectorized (minus their .csv writes), kept
+# as the reference the vectorized versions are tested (test_DataCleaner.py) and timed (Benchmark.py clean) against.
+# Also the one-season-at-a-time average precision ML used before Metrics (test_Metrics.py)
+
+def tm_clean(df):
+    df["Team"] = (df["Team"].str.replace(r"\*", "", regex=True)
+                  .str.replace(r"\u00A0\(\d{1,2}\)", "",  regex=True))
+    return df
+
+def pg_clean(df):
+    Per_game = df.groupby(["Player", "year"]).apply(row_combiner).reset_index(drop=True)
+    del Per_game["Rk"]
+    return Per_game
+
+def row_combiner(df):
+    if df.shape[0] == 1:
+        return df
+    row = df[df['Team'] == '2TM']
+    row["Team"] = df.iloc[-1]["Team"]
+    return row
+
+def MVP_label(df):
+    MVPs = df.sort_values('Share', ascending=False).groupby('year').first().reset_index()
+    df['MVP'] = df.apply(lambda x: 1 if x['Player'] in MVPs['Player'].unique().tolist() \
+                and x['Age'] in MVPs.loc[(MVPs.Player == x['Player'])]['Age'].unique().tolist() else 0, axis=1)
+    return df
+
+def add_ratios(df):
+    # Only correct when the rows are already sorted by year, as the ratios are assigned by position
+    ratios = df[["PTS", "AST", "STL", "BLK", "3P", "year"]].groupby("year").apply(lambda x: x / x.mean())
+    ratios = ratios.reset_index(drop=True)
+    df[["PTS_R", "AST_R", "STL_R", "BLK_R", "3P_R"]] = ratios[["PTS", "AST", "STL", "BLK", "3P"]]
+    return df
+
+def error_met(df):
+    actual = df.sort_values("Share", ascending=False).head(5)
+    predicted = df.sort_values("Predictions", ascending=False)
+    ps = []
+    found = 0
+    seen = 1
+    for index, row in predicted.iterrows():
+        if row["Player"] in actual["Player"].values:
+            found+=1
+            ps.append(found/seen)
+        seen +=1
+    return sum(ps) / len(ps)
@@ -0,0 +1,87 @@
+import os
+
+# Small pages laid out like basketball-reference's, for the scrapers to parse without the real website.
+# They carry what the parsers have to cope with: moji-bake (UTF-8 names read as Windows-1252, as the
+# website's pages come out), HTML entities, repeated header rows inside the table, over-headers,
+# division rows and the rows each scraper removes
+
+# Players as they should come out, with their stats for each season
+PLAYERS = [("Nikola Jokić", "DEN", "C"), ("Giannis Antetokounmpo", "MIL", "PF"), ("Nenê", "WAS", "C"),
+           ("Luka Doncic", "DAL", "PG"), ("Jayson Tatum", "BOS", "SF"), ("Ömer Aşık", "SAC", "C")]
+EAST = [("Atlantic Division", [("Boston Celtics", 64), ("New York Knicks", 50)]),
+        ("Central Division", [("Milwaukee Bucks", 49), ("Detroit Pistons", 14)])]
+WEST = [("Northwest Division", [("Denver Nuggets", 57), ("Utah Jazz", 31)]),
+        ("Pacific Division", [("Sacramento Kings", 46), ("Golden State Warriors", 46)])]
+
+def mojibake(text):
+    """
+    :return: str,
+        the text as it reads when its UTF-8 bytes are decoded as Windows-1252, e.g. "JokiÄ‡"
+    """
+    return text.encode("utf-8").decode("cp1252")
+
+def page(table):
+    return f'<html><head><title>NBA</title></head><body><div id="content">{table}</div></body></html>'
+
+def mvp_page(year):
+    rows = "".join(f'<tr><th>{rank}</th><td><a href="#">{mojibake(player)}</a></td><td>{24 + rank}</td>'
+                   f"<td>{team}</td><td>{max(0, 80 - 20 * rank)}</td><td>{1000 - 150 * rank}</td><td>1,000</td>"
+                   f"<td>{(1000 - 150 * rank) / 1000:.3f}</td><td>{year % 7 + 10 - rank}.{rank}</td></tr>"
+                   for rank, (player, team, _) in enumerate(PLAYERS[:5], start=1))
+    return page('<table id="mvp"><thead>'
+                '<tr class="over_header"><th colspan="4"></th><th colspan="4">Voting</th><th>Advanced</th></tr>'
+                "<tr><th>Rank</th><th>Player</th><th>Age</th><th>Tm</th><th>First</th><th>Pts Won</th>"
+                "<th>Pts Max</th><th>Share</th><th>WS</th></tr>"
+                f"</thead><tbody>{rows}</tbody></table>")
+
+def per_game_page(year):
+    columns = "<th>Rk</th><th>Player</th><th>Age</th><th>Team</th><th>Pos</th><th>G</th><th>PTS</th><th>Awards</th>"
+    rows, rank = [], 0
+    for i, (player, team, pos) in enumerate(PLAYERS):
+        rank += 1
+        traded = i == 2 # A traded player has a "2TM" row, then a row for each team
+        for row_team in (["2TM", "DEN", team] if traded else [team]):
+            rows.append(f'<tr><th>{rank}</th><td><a href="#">{mojibake(player)}</a></td><td>{22 + i}</td>'
+                        f"<td>{row_team}</td><td>{pos}</td><td>{60 + i}</td><td>{year % 5 + 30 - 3 * i}.{i}</td>"
+                        f"<td>{'MVP-1,AS' if i == 0 else ''}</td></tr>")
+        if i == 3:
+            rows.append(f'<tr class="thead">{columns}</tr>') # The header is repeated every few rows
+    rows.append('<tr class="norank"><th></th><td>League Average</td><td>26.6</td><td></td><td></td>'
+                "<td>45</td><td>8.8</td><td></td></tr>")
+    body = "".join(rows)
+    return page(f'<table id="per_game_stats"><thead><tr>{columns}</tr></thead><tbody>{body}</tbody></table>')
+
+def conference_table(conference, divisions, year):
+    rows, seed = [], 0
+    for division, teams in divisions:
+        rows.append(f'<tr class="thead"><th colspan="8">{division}</th></tr>')
+        for team, wins in teams:
+            seed += 1
+            marker = f"*&nbsp;({seed})" if seed <= 3 else "" # Playoff teams, with their seed
+            wins = wins - year % 3
+            rows.append(f'<tr><th><a href="#">{team}</a>{marker}</th><td>{wins}</td><td>{82 - wins}</td>'
+                        f"<td>{wins / 82:.3f}</td><td>{'—' if seed == 1 else f'{seed}.0'}</td>"
+                        f"<td>11{seed}.4</td><td>10{9 - seed}.1</td><td>{5 - seed}.25</td></tr>")
+    return (f'<table id="divs_standings_{conference[0]}"><thead><tr><th>{conference} Conference</th><th>W</th>'
+            "<th>L</th><th>W/L%</th><th>GB</th><th>PS/G</th><th>PA/G</th><th>SRS</th></tr></thead>"
+            f"<tbody>{''.join(rows)}</tbody></table>")
+
+def team_page(year):
+    return page(conference_table("Eastern", EAST, year) + conference_table("Western", WEST, year))
+
+# The page each scraper's directory holds
+PAGES = {"MVPs": mvp_page, "Per-game": per_game_page, "Team-stats": team_page}
+
+def write_pages(root, years):
+    """
+    Saves every page for each year, laid out like rawHTML/ (<directory name>/<year>.html)
+    :param root: str,
+        directory the pages are saved to
+    :param years: list,
+        the seasons (int) to save
+    """
+    for directory_name, make_page in PAGES.items():
+        os.makedirs(os.path.join(root, directory_name), exist_ok=True)
+        for year in years:
+            with open(os.path.join(root, directory_name, f"{year}.html"), "w", encoding="utf-8") as f:
+                f.write(make_page(year))
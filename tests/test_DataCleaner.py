@@ -0,0 +1,114 @@
+import os, warnings, pandas as pd, pytest
+import DataCleaner, legacy, Synthetic
+from conftest import CSV_ROOT
+
+# The vectorized cleaning functions against the row-by-row versions DataCleaner used before (see legacy.py)
+
+@pytest.fixture(scope="module")
+def Per_game():
+    return pd.read_csv(os.path.join(CSV_ROOT, "Per-game (clean).csv"))
+
+@pytest.fixture(scope="module")
+def merged(Per_game):
+    """
+    :return: dataframe,
+        the shipped per-game data with each player's MVP vote share, in the order the merged dataset
+        has its rows (by team), rather than by year
+    """
+    MVPs = pd.read_csv(os.path.join(CSV_ROOT, "MVPs.csv"), usecols=["Player", "year", "Share"])
+    df = Per_game.merge(MVPs, on=["Player", "year"], how="left").fillna({"Share": 0})
+    return df.sort_values("Team", kind="stable").reset_index(drop=True)
+
+def run_legacy(function, df):
+    # Silences pandas' warnings about the legacy code's chained assignment and apply() on grouping columns
+    with pd.option_context("mode.chained_assignment", None), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return function(df.copy())
+
+def test_pg_clean_matches_legacy(Per_game):
+    # The legacy version takes seconds a season, so a decade of seasons is compared
+    raw = Synthetic.split_traded(Per_game[Per_game["year"] >= 2015].reset_index(drop=True))
+    assert raw["Team"].eq("2TM").any()
+    pd.testing.assert_frame_equal(run_legacy(legacy.pg_clean, raw), DataCleaner.pg_clean(raw.copy()))
+
+def test_pg_clean_keeps_traded_players_averages_under_their_last_team():
+    raw = pd.DataFrame({"Rk": [1, 2, 3, 4, 5], "Player": ["B", "A", "A", "A", "B"], "year": [2024] * 4 + [2025],
+                        "Team": ["BOS", "2TM", "DAL", "PHO", "MIA"], "PTS": [10.0, 20.0, 18.0, 24.0, 12.0]})
+    expected = pd.DataFrame({"Player": ["A", "B", "B"], "year": [2024, 2024, 2025],
+                             "Team": ["PHO", "BOS", "MIA"], "PTS": [20.0, 10.0, 12.0]})
+    pd.testing.assert_frame_equal(DataCleaner.pg_clean(raw), expected)
+    pd.testing.assert_frame_equal(run_legacy(legacy.pg_clean, raw), expected)
+
+def test_tm_clean_matches_legacy():
+    clean = pd.read_csv(os.path.join(CSV_ROOT, "Team-stats (clean).csv"), index_col=0)
+    raw = Synthetic.playoff_markers(clean)
+    assert raw["Team"].str.contains("*", regex=False).any()
+    result = DataCleaner.tm_clean(raw)
+    pd.testing.assert_frame_equal(run_legacy(legacy.tm_clean, raw), result)
+    assert result["Team"].tolist() == clean["Team"].tolist()
+    assert raw["Team"].str.contains("*", regex=False).any() # The input is left as it was
+
+def test_MVP_label_matches_legacy(merged):
+    result = DataCleaner.MVP_label(merged.copy())
+    pd.testing.assert_frame_equal(run_legacy(legacy.MVP_label, merged), result)
+    assert result.groupby("year")["MVP"].sum().eq(1).all()
+
+def test_add_ratios_matches_legacy_on_rows_sorted_by_year(merged):
+    by_year = merged.sort_values("year", kind="stable").reset_index(drop=True)
+    pd.testing.assert_frame_equal(run_legacy(legacy.add_ratios, by_year), DataCleaner.add_ratios(by_year.copy()))
+
+def test_add_ratios_fixes_legacy_ratios_on_unsorted_rows(merged):
+    # The baseline's *_R columns were wrong: the legacy version assigns each year's ratios by position, so on the
+    # merged dataset (sorted by team) nearly every row got another player's. The vectorized version's output
+    # differs from the baseline's there on purpose
+    result = DataCleaner.add_ratios(merged.copy())
+    for stat in ["PTS", "AST", "STL", "BLK", "3P"]:
+        expected = merged[stat] / merged.groupby("year")[stat].transform("mean")
+        pd.testing.assert_series_equal(result[f"{stat}_R"], expected, check_names=False)
+    assert not run_legacy(legacy.add_ratios, merged)["PTS_R"].equals(result["PTS_R"])
+
+@pytest.fixture
+def scraped(tmp_path, monkeypatch):
+    """
+    :return: pathlib.Path,
+        a copy of the repository's layout holding a few seasons of scraped-looking data, whose Scripts
+        directory is the working directory (DataCleaner reads and writes ../csvFiles)
+    """
+    Synthetic.generate(1, tmp_path, csv_root=CSV_ROOT)
+    for name in ["Per-game", "Team-stats", "MVPs"]:
+        path = tmp_path / "csvFiles" / f"{name}.csv"
+        df = pd.read_csv(path)
+        df[df["year"].between(2020, 2024)].to_csv(path, index=False)
+    monkeypatch.chdir(tmp_path / "Scripts")
+    return tmp_path
+
+def built_steps(output):
+    """
+    :return: list,
+        the build steps (str) DataCleaner printed it was building, e.g. "Per-game/2024"
+    """
+    return [line.split()[1] for line in output.splitlines() if line.startswith("Building ")]
+
+def test_clean_only_rebuilds_changed_seasons(scraped, capsys):
+    first = DataCleaner.clean()
+    built = built_steps(capsys.readouterr().out)
+    assert sorted(built) == sorted(f"{stage}/{year}" for stage in ["Per-game", "Team-stats", "merged"]
+                                   for year in range(2020, 2025))
+
+    # Nothing changed, so nothing is rebuilt and the same dataset comes back
+    second = DataCleaner.clean()
+    assert built_steps(capsys.readouterr().out) == []
+    pd.testing.assert_frame_equal(first, second)
+
+    # A change to one season's per-game data rebuilds that season's partition and merged season only
+    path = scraped / "csvFiles" / "Per-game.csv"
+    Per_game = pd.read_csv(path)
+    Per_game.loc[Per_game["year"] == 2022, "PTS"] += 1
+    Per_game.to_csv(path, index=False)
+    third = DataCleaner.clean()
+    output = capsys.readouterr().out
+    assert built_steps(output) == ["Per-game/2022", "merged/2022"]
+    assert "(1 of 5 seasons rebuilt)" in output
+    changed = third["year"] == 2022
+    assert (third.loc[changed, "PTS"].to_numpy() > second.loc[changed, "PTS"].to_numpy()).all()
+    pd.testing.assert_frame_equal(third[~changed], second[~changed])
@@ -0,0 +1,62 @@
+import numpy as np, pytest
+from sklearn.linear_model import Ridge
+from IncrementalRidge import IncrementalRidge
+
+def seasons(seed, columns):
+    """
+    :param seed: int,
+        the random seed
+    :param columns: list,
+        a function (rng, rows) -> numpy array giving each predictor column
+    :return: list,
+        (X, y) (numpy arrays) for each of 8 seasons of different sizes
+    """
+    rng = np.random.default_rng(seed)
+    batches = []
+    for rows in rng.integers(20, 200, size=8):
+        X = np.column_stack([column(rng, rows) for column in columns])
+        y = X @ rng.normal(size=X.shape[1]) + rng.normal(size=rows)
+        batches.append((X, y))
+    return batches
+
+def normal(rng, rows):
+    return rng.normal(size=rows)
+
+COLUMNS = {"normal": [normal] * 5,
+           # A column that never changes, which centering turns into zeros
+           "constant column": [normal, lambda rng, rows: np.full(rows, 3.0), normal],
+           # Large, similar values like "year", next to percentages and season totals
+           "wide scales": [lambda rng, rows: rng.integers(1996, 2025, size=rows).astype("float64"),
+                           lambda rng, rows: rng.uniform(0, 1e-3, size=rows),
+                           lambda rng, rows: rng.normal(1e5, 2e4, size=rows), normal]}
+
+@pytest.mark.parametrize("alpha", [1.0, 1e-3])
+@pytest.mark.parametrize("columns", COLUMNS)
+def test_extending_by_season_matches_ridge_on_the_stacked_seasons(columns, alpha):
+    batches = seasons(0, COLUMNS[columns])
+    model = IncrementalRidge(alpha=alpha)
+    for seen in range(1, len(batches) + 1):
+        model.extend(*batches[seen - 1])
+        model.solve()
+        X = np.vstack([X for X, _ in batches[:seen]])
+        y = np.concatenate([y for _, y in batches[:seen]])
+        expected = Ridge(alpha=alpha).fit(X, y)
+        np.testing.assert_allclose(model.coef_, expected.coef_, rtol=1e-7, atol=1e-10)
+        np.testing.assert_allclose(model.intercept_, expected.intercept_, rtol=1e-7, atol=1e-10)
+        np.testing.assert_allclose(model.predict(X), expected.predict(X), rtol=1e-7, atol=1e-10)
+
+def test_fit_forgets_earlier_seasons():
+    (X_1, y_1), (X_2, y_2) = seasons(1, COLUMNS["normal"])[:2]
+    model = IncrementalRidge().fit(X_1, y_1).fit(X_2, y_2)
+    model.solve()
+    np.testing.assert_allclose(model.coef_, Ridge().fit(X_2, y_2).coef_, rtol=1e-7, atol=1e-10)
+
+def test_empty_seasons_are_skipped():
+    X, y = seasons(2, COLUMNS["normal"])[0]
+    model = IncrementalRidge().extend(X[:0], y[:0]).extend(X, y).extend(X[:0], y[:0])
+    model.solve()
+    np.testing.assert_allclose(model.coef_, Ridge().fit(X, y).coef_, rtol=1e-7, atol=1e-10)
+
+def test_solving_before_any_rows_raises():
+    with pytest.raises(ValueError):
+        IncrementalRidge().extend(np.empty((0, 3)), np.empty(0)).solve()
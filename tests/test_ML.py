@@ -0,0 +1,41 @@
+import os, numpy as np, pandas as pd, pytest
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+import ML
+from conftest import CSV_ROOT
+
+MODELS = {"ridge": Ridge(alpha=1.0),
+          "random-forest": RandomForestRegressor(n_estimators=10, min_samples_split=5, random_state=1)}
+
+@pytest.fixture(scope="module")
+def merged():
+    """
+    :return: dataframe,
+        the shipped per-game data for 2014-2024 with each player's MVP vote share, in the order the
+        merged dataset has its rows (by team), rather than by year
+    """
+    Per_game = pd.read_csv(os.path.join(CSV_ROOT, "Per-game (clean).csv"))
+    MVPs = pd.read_csv(os.path.join(CSV_ROOT, "MVPs.csv"), usecols=["Player", "year", "Share"])
+    df = Per_game[Per_game["year"].between(2014, 2024)].merge(MVPs, on=["Player", "year"], how="left")
+    return df.fillna(0).sort_values("Team", kind="stable").reset_index(drop=True)
+
+@pytest.mark.parametrize("name", MODELS)
+def test_folds_train_on_the_rows_in_their_original_order(merged, name):
+    # Each fold is fitted the way the backtest did before the rows were sorted by year: on a mask of the merged data
+    Predictor = ML.Model(2014, 2024, clone(MODELS[name]), df=merged)
+    for year in Predictor.years[5:]:
+        train, test = merged[merged["year"] < year], merged[merged["year"] == year]
+        model = clone(MODELS[name]).fit(train[Predictor.predictors].to_numpy(), train["Share"].to_numpy())
+        expected = model.predict(test[Predictor.predictors].to_numpy())
+        # Ridge's solver sums the rows in a different memory layout, so its predictions can differ in the last bits
+        np.testing.assert_allclose(Predictor.train_fold(year), expected, rtol=1e-9, atol=1e-12)
+
+# Pinned, as sliced folds give the same predictions as masked ones (see above), so these must not change
+@pytest.mark.parametrize("name, mean_ap", [("ridge", 0.7498185268837442), ("random-forest", 0.6867972804164926)])
+def test_backtest_mean_ap(merged, name, mean_ap):
+    Predictor = ML.Model(2014, 2024, clone(MODELS[name]), df=merged)
+    in_process = Predictor.backtest(workers=1)[0]
+    print(name, repr(in_process))
+    assert Predictor.backtest(workers=2)[0] == in_process
+    assert in_process == pytest.approx(mean_ap, abs=1e-12)
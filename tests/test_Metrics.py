@@ -0,0 +1,81 @@
+import warnings, numpy as np, pandas as pd, pytest
+from scipy.stats import spearmanr
+from sklearn.metrics import ndcg_score
+import Metrics, legacy
+
+# Hand-built seasons, each given as (player, actual vote share, predicted share) rows
+SEASONS = {
+    # No ties
+    2001: [("A", 0.90, 0.50), ("B", 0.40, 0.70), ("C", 0.20, 0.10), ("D", 0.10, 0.30), ("E", 0.05, 0.20),
+           ("F", 0.00, 0.60), ("G", 0.00, 0.00), ("H", 0.00, 0.05)],
+    # Ties in the vote share, at the top and across the top-5 cut-off, and in the predictions
+    2002: [("A", 0.50, 0.40), ("B", 0.50, 0.40), ("C", 0.30, 0.10), ("D", 0.20, 0.40), ("E", 0.10, 0.05),
+           ("F", 0.10, 0.20), ("G", 0.00, 0.20), ("H", 0.00, 0.00), ("I", 0.00, 0.00)],
+    # Nobody got a vote
+    2003: [("A", 0.0, 0.30), ("B", 0.0, 0.10), ("C", 0.0, 0.20), ("D", 0.0, 0.05), ("E", 0.0, 0.25),
+           ("F", 0.0, 0.15), ("G", 0.0, 0.00)],
+}
+
+@pytest.fixture(scope="module")
+def rows():
+    """
+    :return: dataframe,
+        every season's rows, shuffled together as the merged dataset's rows are (by team, not by year)
+    """
+    df = pd.DataFrame([(year, *row) for year, season in SEASONS.items() for row in season],
+                      columns=["year", "Player", "Share", "Predictions"])
+    return df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+def arrays(df):
+    return (df["year"].to_numpy(), df["Player"].to_numpy(), df["Share"].to_numpy(dtype="float64"),
+            df["Predictions"].to_numpy(dtype="float64"))
+
+def seasons(df):
+    # Each season's rows, in the order they were given
+    return [(year, season.reset_index(drop=True)) for year, season in df.groupby("year", sort=True)]
+
+def test_average_precisions_match_the_season_by_season_loop(rows):
+    aps = Metrics.average_precisions(*arrays(rows))
+    assert aps.index.tolist() == sorted(SEASONS)
+    for year, season in seasons(rows):
+        assert aps[year] == pytest.approx(legacy.error_met(season), abs=1e-12)
+
+def test_season_metrics_ap_and_top_1(rows):
+    metrics = Metrics.season_metrics(*arrays(rows))
+    pd.testing.assert_series_equal(metrics["AP"], Metrics.average_precisions(*arrays(rows)), check_names=False,
+                                   check_index=False)
+    for year, season in seasons(rows):
+        # Of tied highest predictions (2002), the first given is the one predicted to win
+        predicted_winner = season.iloc[season["Predictions"].to_numpy().argmax()]
+        assert metrics.loc[year, "Top-1"] == int(predicted_winner["Share"] == season["Share"].max())
+    assert metrics.loc[2001, "Top-1"] == 0
+
+def test_season_metrics_ndcg_matches_sklearn(rows):
+    metrics = Metrics.season_metrics(*arrays(rows))
+    for year, season in seasons(rows):
+        if not season["Share"].any():
+            # There's no gain to be had in a season without votes, which sklearn scores as 0
+            assert np.isnan(metrics.loc[year, "NDCG@5"])
+            continue
+
+        # Tied predictions are ranked in the order they were given, which sklearn needs spelling out
+        predictions = season["Predictions"].to_numpy() - 1e-9 * np.arange(len(season))
+        expected = ndcg_score([season["Share"].to_numpy()], [predictions], k=5)
+        assert metrics.loc[year, "NDCG@5"] == pytest.approx(expected, abs=1e-12)
+
+def test_season_metrics_spearman_matches_scipy(rows):
+    metrics = Metrics.season_metrics(*arrays(rows))
+    for year, season in seasons(rows):
+        with warnings.catch_warnings():
+            # scipy warns that the season without votes is constant, and gives NaN, as season_metrics does
+            warnings.simplefilter("ignore")
+            expected = spearmanr(season["Share"], season["Predictions"]).statistic
+        if np.isnan(expected):
+            assert np.isnan(metrics.loc[year, "Spearman"])
+        else:
+            assert metrics.loc[year, "Spearman"] == pytest.approx(expected, abs=1e-12)
+
+def test_season_ranks_keep_the_given_order_for_ties():
+    years = np.array([2002, 2001, 2002, 2002, 2001])
+    values = np.array([0.5, 0.1, 0.5, 0.7, 0.1])
+    np.testing.assert_array_equal(Metrics.season_ranks(years, values), [2, 1, 3, 1, 2])
@@ -0,0 +1,84 @@
+import time, numpy as np, pandas as pd, pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+import ML
+from ModelCache import ModelCache
+
+@pytest.fixture
+def df():
+    """
+    :return: dataframe,
+        random player seasons for 2000-2011
+    """
+    rng = np.random.default_rng(0)
+    rows = 12 * 30
+    return pd.DataFrame({"Player": [f"P{i}" for i in range(rows)], "year": np.repeat(np.arange(2000, 2012), 30),
+                         "PTS": rng.normal(15, 5, rows), "AST": rng.normal(4, 2, rows),
+                         "TRB": rng.normal(6, 3, rows), "Share": rng.uniform(0, 1, rows) ** 8})
+
+def backtest(df, model, directory, end=2010):
+    """
+    :return: tuple,
+        how many test seasons were loaded from the cache (int), and how many were trained (int)
+    """
+    cache = ModelCache(directory)
+    ML.Model(int(df["year"].min()), end, model, df=df, cache=cache).backtest(workers=1)
+    return cache.hits, cache.misses
+
+def test_unchanged_backtest_is_loaded_from_the_cache(df, tmp_path):
+    assert backtest(df, Ridge(), tmp_path) == (0, 6)
+    assert backtest(df, Ridge(), tmp_path) == (6, 0)
+
+def test_changing_a_season_only_retrains_the_folds_that_use_it(df, tmp_path):
+    backtest(df, Ridge(), tmp_path)
+    df.loc[df["year"] == 2008, "PTS"] += 1
+    # Each fold trains on the seasons before its test year, and predicts the test year itself
+    assert backtest(df, Ridge(), tmp_path) == (3, 3)
+
+def test_adding_a_season_keeps_the_earlier_folds(df, tmp_path):
+    backtest(df[df["year"] <= 2010], Ridge(), tmp_path)
+    assert backtest(df, Ridge(), tmp_path, end=2011) == (6, 1)
+
+def test_changing_the_first_season_retrains_every_fold(df, tmp_path):
+    backtest(df[df["year"] <= 2010], Ridge(), tmp_path)
+    assert backtest(df[df["year"].between(2001, 2010)], Ridge(), tmp_path) == (0, 5)
+
+def test_changing_the_predictors_retrains_every_fold(df, tmp_path):
+    backtest(df, Ridge(), tmp_path)
+    assert backtest(df.drop(columns="TRB"), Ridge(), tmp_path) == (0, 6)
+
+def test_changing_a_parameter_retrains_every_fold(df, tmp_path):
+    backtest(df, Ridge(), tmp_path)
+    assert backtest(df, Ridge(alpha=2.0), tmp_path) == (0, 6)
+
+def test_n_jobs_and_verbose_dont_retrain(df, tmp_path):
+    backtest(df, RandomForestRegressor(n_estimators=5, random_state=1, n_jobs=1), tmp_path)
+    assert backtest(df, RandomForestRegressor(n_estimators=5, random_state=1, n_jobs=2, verbose=1), tmp_path) == (6, 0)
+
+def test_least_recently_used_fold_is_evicted_first(tmp_path):
+    predictions = np.zeros(100)
+    cache = ModelCache(tmp_path)
+    cache.store("a", predictions)
+    fold_size = (tmp_path / "a.npy").stat().st_size
+    cache.max_bytes = 2 * fold_size
+
+    # File times are only as fine as the kernel's clock tick, so each use is spaced out
+    time.sleep(0.05)
+    cache.store("b", predictions)
+    time.sleep(0.05)
+    assert cache.load_predictions("a") is not None
+    time.sleep(0.05)
+    cache.store("c", predictions)
+    assert cache.load_predictions("b") is None
+    assert cache.load_predictions("a") is not None
+    assert cache.load_predictions("c") is not None
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.npy", "c.npy"]
+
+def test_evicting_a_fold_removes_its_model_too(tmp_path):
+    cache = ModelCache(tmp_path)
+    cache.store("a", np.zeros(100), Ridge().fit([[0], [1]], [0, 1]))
+    time.sleep(0.05)
+    cache.max_bytes = 1
+    # "b" alone is over the cap as well, but "a" goes first
+    cache.store("b", np.zeros(100))
+    assert cache.load_model("a") is None and cache.load_predictions("a") is None
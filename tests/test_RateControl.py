@@ -0,0 +1,146 @@
+import asyncio, time, httpx, pytest, requests
+from FixtureServer import FixtureServer
+from RateControl import AdaptiveRateController, CircuitOpenError, ScrapeError
+from Webscraper import MVPScraper
+
+# A page the MVP scraper accepts, and one it doesn't (e.g. a "we're down for maintenance" page)
+MVP_PAGE = '<html><body><table id="mvp"><tr><td>Nikola Jokić</td></tr></table></body></html>'
+ERROR_PAGE = "<html><body>Down for maintenance</body></html>"
+
+def page_url(server, year=2024):
+    return f"{server.url}/awards/awards_{year}.html"
+
+@pytest.fixture
+def html_root(tmp_path):
+    """
+    :return: pathlib.Path,
+        a directory holding a saved MVP page for 2024, for a FixtureServer to serve
+    """
+    (tmp_path / "served" / "MVPs").mkdir(parents=True)
+    (tmp_path / "served" / "MVPs" / "2024.html").write_text(MVP_PAGE, encoding="utf-8")
+    return tmp_path / "served"
+
+def controller(**kwargs):
+    """
+    :return: AdaptiveRateController,
+        a controller fast enough to test with: no pacing between requests and no backoff between retries
+    """
+    settings = dict(requests_per_minute=6000, max_retries=0, backoff_base=0, failure_threshold=100)
+    settings.update(kwargs)
+    return AdaptiveRateController(**settings)
+
+def test_rate_rises_additively_up_to_max_rpm(html_root):
+    rate = controller(requests_per_minute=6000, max_rpm=6300, increase=100)
+    with FixtureServer(html_root) as server, requests.Session() as session:
+        for expected in (6100, 6200, 6300, 6300):
+            rate.fetch(session.get, page_url(server))
+            assert rate.rpm == expected
+
+def test_rate_never_rises_above_the_starting_rate_by_default(html_root):
+    rate = controller()
+    with FixtureServer(html_root) as server, requests.Session() as session:
+        rate.fetch(session.get, page_url(server))
+    assert rate.rpm == 6000
+
+def test_throttling_cuts_rate_multiplicatively(html_root):
+    rate = controller(decrease=0.5, min_rpm=1000)
+    with FixtureServer(html_root, max_requests=1) as server, requests.Session() as session:
+        rate.fetch(session.get, page_url(server))
+        for expected in (3000, 1500, 1000):
+            with pytest.raises(ScrapeError, match="HTTP 429"):
+                rate.fetch(session.get, page_url(server))
+            assert rate.rpm == expected
+            rate.next_slot = time.monotonic() # Only checking the rate here, not the pacing
+    assert rate.interval == pytest.approx(60 / 1000)
+
+def test_retry_after_is_honoured(html_root):
+    rate = controller(max_retries=1)
+    with FixtureServer(html_root, max_requests=1, window=0.3, retry_after=0.6) as server, requests.Session() as session:
+        rate.fetch(session.get, page_url(server))
+        rate.fetch(session.get, page_url(server))
+    statuses = [status for _, _, status in server.requests]
+    assert statuses == [200, 429, 200]
+
+    # The window had passed long before the host said it was ready again, so only Retry-After held the retry back
+    throttled_at, retried_at = server.requests[1][0], server.requests[2][0]
+    assert retried_at - throttled_at >= 0.6
+
+def test_retry_after_is_honoured_async(html_root):
+    rate = controller(max_retries=1)
+
+    async def fetch_twice(url):
+        async with httpx.AsyncClient() as client:
+            for _ in range(2):
+                await rate.fetch_async(client.get, url)
+
+    with FixtureServer(html_root, max_requests=1, window=0.3, retry_after=0.6) as server:
+        asyncio.run(fetch_twice(page_url(server)))
+    assert [status for _, _, status in server.requests] == [200, 429, 200]
+    assert server.requests[2][0] - server.requests[1][0] >= 0.6
+
+def test_circuit_breaker_opens_then_half_opens(html_root):
+    rate = controller(failure_threshold=2, cooldown=0.3)
+    with FixtureServer(html_root, error_rate=1.0) as server, requests.Session() as session:
+        for _ in range(2):
+            with pytest.raises(ScrapeError, match="HTTP 503"):
+                rate.fetch(session.get, page_url(server))
+
+        # While it's open, requests fail without reaching the host
+        with pytest.raises(CircuitOpenError):
+            rate.fetch(session.get, page_url(server))
+        assert len(server.requests) == 2
+
+        # Once the cooldown has passed, one trial request is let through. It fails, so the breaker opens again
+        time.sleep(0.3)
+        with pytest.raises(ScrapeError, match="HTTP 503"):
+            rate.fetch(session.get, page_url(server))
+        assert len(server.requests) == 3
+        with pytest.raises(CircuitOpenError):
+            rate.fetch(session.get, page_url(server))
+
+        # Callers arriving together once it's half-open don't burst through: one is the trial, the rest fail
+        # fast until it's reported back. The trial succeeds, which closes it
+        time.sleep(0.3)
+        server.error_rate = 0.0
+
+        async def fetch_together(url, callers):
+            async with httpx.AsyncClient() as client:
+                return await asyncio.gather(*(rate.fetch_async(client.get, url) for _ in range(callers)),
+                                            return_exceptions=True)
+
+        results = asyncio.run(fetch_together(page_url(server), 5))
+        assert sum(not isinstance(result, Exception) for result in results) == 1
+        assert sum(isinstance(result, CircuitOpenError) for result in results) == 4
+        assert len(server.requests) == 4
+        assert rate.failures == 0 and rate.open_until is None and rate.trial_started is None
+        rate.fetch(session.get, page_url(server))
+    assert len(server.requests) == 5
+
+def test_failed_requests_are_retried(html_root):
+    rate = controller(max_retries=20)
+    with FixtureServer(html_root, error_rate=0.5, seed=1) as server, requests.Session() as session:
+        assert rate.fetch(session.get, page_url(server)).text == MVP_PAGE
+    assert [status for _, _, status in server.requests][-1] == 200
+    assert 503 in [status for _, _, status in server.requests]
+
+@pytest.mark.parametrize("error_rate, page", [(1.0, MVP_PAGE), (0.0, ERROR_PAGE)])
+def test_bad_pages_are_never_cached(html_root, tmp_path, error_rate, page):
+    (html_root / "MVPs" / "2024.html").write_text(page, encoding="utf-8")
+    with FixtureServer(html_root, error_rate=error_rate) as server:
+        scraper = MVPScraper([2024], base_url=server.url, html_root=str(tmp_path / "cache"),
+                             rate_controller=controller(max_retries=2))
+        scraper.directory_exists()
+        with pytest.raises(ScrapeError):
+            scraper.html_saver(2024)
+        scraper.close()
+    assert len(server.requests) == 3 # Every retry was sent, and none was accepted
+    assert list((tmp_path / "cache" / "MVPs").iterdir()) == []
+
+def test_good_pages_are_cached(html_root, tmp_path):
+    with FixtureServer(html_root, error_rate=0.5, seed=1) as server:
+        scraper = MVPScraper([2024], base_url=server.url, html_root=str(tmp_path / "cache"),
+                             rate_controller=controller(max_retries=20))
+        scraper.directory_exists()
+        scraper.html_saver(2024)
+        scraper.close()
+    assert (tmp_path / "cache" / "MVPs" / "2024.html").read_text(encoding="utf-8") == MVP_PAGE
@@ -0,0 +1,57 @@
+import pandas as pd, pytest
+from io import StringIO
+import pages, TableParser
+from Webscraper import MVPScraper, PerGameScraper, TeamScraper
+
+YEARS = [2023, 2024]
+
+@pytest.fixture(scope="module")
+def html_root(tmp_path_factory):
+    root = tmp_path_factory.mktemp("rawHTML")
+    pages.write_pages(root, YEARS)
+    return str(root)
+
+@pytest.mark.parametrize("scraper_cls", [MVPScraper, PerGameScraper, TeamScraper])
+@pytest.mark.parametrize("year", YEARS)
+def test_lxml_engine_matches_soup_engine(html_root, scraper_cls, year):
+    soup = scraper_cls([year], html_root=html_root, parser="soup").dataframe_retriever(year)
+    lxml = scraper_cls([year], html_root=html_root, parser="lxml").dataframe_retriever(year)
+    pd.testing.assert_frame_equal(soup, lxml)
+
+def test_moji_bake_is_fixed(html_root):
+    players = PerGameScraper([2024], html_root=html_root, parser="lxml").dataframe_retriever(2024)["Player"]
+    assert {"Nikola Jokić", "Nenê", "Ömer Aşık"} <= set(players)
+
+def test_unwanted_rows_are_removed(html_root):
+    Per_game = PerGameScraper([2024], html_root=html_root, parser="lxml").dataframe_retriever(2024)
+    assert len(Per_game) == len(pages.PLAYERS) + 2 # Every player, plus the traded player's rows for each team
+    assert Per_game["Rk"].dtype.kind == "i" # No repeated header row was read as data
+    assert "League Average" not in set(Per_game["Player"])
+
+    MVPs = MVPScraper([2024], html_root=html_root, parser="lxml").dataframe_retriever(2024)
+    assert list(MVPs.columns[:3]) == ["Rank", "Player", "Age"] # The over-header is gone
+
+    Teams = TeamScraper([2024], html_root=html_root, parser="lxml").dataframe_retriever(2024)
+    assert len(Teams) == sum(len(teams) for _, teams in pages.EAST + pages.WEST) # No division rows
+    assert "Boston Celtics*\xa0(1)" in set(Teams["Team"])
+
+# Table features the scrapers' pages don't all have, which pd.read_html handles a particular way
+TABLES = {
+    "spans": "<table><thead><tr><th rowspan='2'>Player</th><th colspan='2'>Shooting</th></tr>"
+             "<tr><th>FG%</th><th>3P%</th></tr></thead>"
+             "<tbody><tr><td>A</td><td colspan='2'>.500</td></tr><tr><td rowspan='2'>B</td><td>.4</td><td>.3</td></tr>"
+             "<tr><td>.2</td><td>.1</td></tr></tbody></table>",
+    "no thead": "<table><tr><th>Player</th><th>PTS</th></tr><tr><td>A</td><td>1,234</td></tr>"
+                "<tr><td>B</td><td>12</td></tr></table>",
+    "hidden and breaks": "<table><thead><tr><th>Player</th><th>Note</th><th style='display: none'>Hidden</th></tr></thead>"
+                         "<tbody><tr><td>A<br>Jr.</td><td>  two   spaces </td><td style='display:none'>x</td></tr>"
+                         "<tr><td>B</td><td></td><td style='display:none'>y</td></tr></tbody></table>",
+    "footer and ragged": "<table><thead><tr><th>Player</th><th>G</th><th>PTS</th></tr></thead>"
+                         "<tbody><tr><td>A</td><td>82</td></tr><tr><td>B</td><td>70</td><td>30.1</td></tr></tbody>"
+                         "<tfoot><tr><td>Total</td><td>152</td><td>30.1</td></tr></tfoot></table>",
+}
+
+@pytest.mark.parametrize("name", TABLES)
+def test_table_to_frame_matches_read_html(name):
+    table = TableParser.document(f"<html><body>{TABLES[name]}</body></html>").select_one("table")
+    pd.testing.assert_frame_equal(pd.read_html(StringIO(TABLES[name]))[0], TableParser.table_to_frame(table))
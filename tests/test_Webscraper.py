@@ -0,0 +1,60 @@
+import asyncio, os, pandas as pd, requests
+import pages, Webscraper
+from FixtureServer import FixtureServer
+from RateControl import AdaptiveRateController
+from Webscraper import MVPScraper, PerGameScraper, TeamScraper
+
+YEARS = [2021, 2022, 2023, 2024]
+
+class FetchingPool:
+    """
+    Stands in for BrowserPool: the fixture pages are already rendered, so PerGameScraper's pages are fetched
+    over plain HTTP. They still go through the same path as rendered pages (a worker thread, sharing the budget)
+    """
+    def __init__(self):
+        self.rendered = []
+
+    def render(self, url):
+        self.rendered.append(url)
+        return requests.get(url).text
+
+def test_scrape_all_shares_one_budget_and_saves_every_year(tmp_path):
+    pages.write_pages(tmp_path / "served", YEARS)
+    rate = AdaptiveRateController(requests_per_minute=600)
+    pool = FetchingPool()
+    with FixtureServer(tmp_path / "served") as server:
+        settings = dict(base_url=server.url, html_root=str(tmp_path / "rawHTML"), csv_root=str(tmp_path),
+                        rate_controller=rate, browser_pool=pool, parser="lxml")
+        scrapers = [scraper_cls(YEARS, **settings) for scraper_cls in (MVPScraper, PerGameScraper, TeamScraper)]
+        asyncio.run(Webscraper.scrape_all(scrapers, max_connections=10))
+
+    # Every page was asked for once, and the per-game pages went through the "browser"
+    assert sorted(path for _, path, _ in server.requests) == sorted(scraper.URL.format(year)[len(server.url):]
+                                                                    for scraper in scrapers for year in YEARS)
+    assert all(status == 200 for _, _, status in server.requests)
+    assert len(pool.rendered) == len(YEARS)
+
+    # However the three scrapers' requests are interleaved, k of them never arrive faster than the shared budget
+    # allows (with a little slack, as each request's trip to the server takes a different time)
+    arrivals = sorted(arrival for arrival, _, _ in server.requests)
+    interval = 60 / 600
+    for k in range(1, len(arrivals)):
+        fastest = min(later - earlier for earlier, later in zip(arrivals, arrivals[k:]))
+        assert fastest >= k * interval - 0.03
+
+    for scraper in scrapers:
+        for year in YEARS:
+            assert os.path.exists(scraper.file_path(year))
+            assert scraper.partitions.complete(year, scraper.file_path(year))
+        combined = pd.read_csv(tmp_path / f"{scraper.directory_name}.csv")
+        assert sorted(combined["year"].unique()) == YEARS
+
+def test_scrape_all_skips_seasons_already_scraped(tmp_path):
+    pages.write_pages(tmp_path / "served", YEARS)
+    with FixtureServer(tmp_path / "served") as server:
+        settings = dict(base_url=server.url, html_root=str(tmp_path / "rawHTML"), csv_root=str(tmp_path),
+                        rate_controller=AdaptiveRateController(requests_per_minute=6000), parser="lxml")
+        asyncio.run(Webscraper.scrape_all([MVPScraper(YEARS[:2], **settings)], max_connections=10))
+        asyncio.run(Webscraper.scrape_all([MVPScraper(YEARS, **settings)], max_connections=10))
+    assert len(server.requests) == len(YEARS)
+    assert sorted(pd.read_csv(tmp_path / "MVPs.csv")["year"].unique()) == YEARS
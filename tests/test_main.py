@@ -0,0 +1,20 @@
+import json, pytest
+import main
+
+def write_config(tmp_path, config):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(config))
+    return str(path)
+
+def test_config_options_become_the_commands_defaults(tmp_path):
+    config = write_config(tmp_path, {"scrape": {"start": 2020, "end": 2024, "parse-workers": 2}})
+    args = main.arguments(["--config", config, "scrape"])
+    assert (args.start, args.end, args.parse_workers) == (2020, 2024, 2)
+    assert main.arguments(["--config", config, "scrape", "--end", "2022"]).end == 2022
+
+def test_unknown_command_in_config_is_a_usage_error(tmp_path, capsys):
+    config = write_config(tmp_path, {"backtest": {"end": 2024}, "bactest": {"workers": 2}})
+    with pytest.raises(SystemExit) as exit:
+        main.arguments(["--config", config, "backtest"])
+    assert exit.value.code == 2
+    assert "unknown command 'bactest' in config" in capsys.readouterr().err